@@ -0,0 +1,113 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction, DEFAULT_DB_ALIAS
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = getattr(settings, 'ACTIVITY_LOG_BUFFER_SIZE', 500)
+
+_state = threading.local()
+
+
+class _Batch:
+    """ActivityLog rows waiting to be written with a single bulk_create."""
+
+    def __init__(self, batches=None, key=None):
+        self.entries = []
+        self.committed = False
+        # Map of the transaction batches this one is registered in (see _transaction_batch)
+        self.batches = batches
+        self.key = key
+
+    def add(self, entry):
+        self.entries.append(entry)
+        if len(self.entries) >= BUFFER_SIZE:
+            # Size-triggered flush: inside a transaction the INSERT is part of it
+            self.flush()
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        if not entries:
+            return
+        from .models import ActivityLog
+        try:
+            ActivityLog.objects.bulk_create(entries, batch_size=BUFFER_SIZE)
+        except Exception:
+            logger.exception('Failed to write %s activity log entries', len(entries))
+
+    def commit(self):
+        self.committed = True
+        if self.batches is not None and self.batches.get(self.key) is self:
+            del self.batches[self.key]
+        self.flush()
+
+
+def _scope_depth():
+    return getattr(_state, 'depth', 0)
+
+
+def _transaction_batch(connection):
+    """
+    Batch bound to the current (save)point of the transaction.
+
+    Batches are kept per connection (connections are per thread) in a map keyed by the
+    savepoint ids, together with the connection's on_commit list they were registered
+    in. Django replaces that list on commit and on rollback of the transaction or of a
+    savepoint, so a map built for another list is stale and starts over: a rolled-back
+    batch is never reused, and a lookup stays O(1) however many callbacks are queued.
+    """
+    hooks, batches = getattr(connection, '_activity_log_batches', (None, None))
+    if hooks is not connection.run_on_commit:
+        hooks, batches = connection.run_on_commit, {}
+        connection._activity_log_batches = (hooks, batches)
+    key = tuple(connection.savepoint_ids)
+    batch = batches.get(key)
+    if batch is None or batch.committed:
+        batch = batches[key] = _Batch(batches, key)
+        transaction.on_commit(batch.commit, using=connection.alias, robust=True)
+    return batch
+
+
+def add(entry):
+    """
+    Queue an unsaved ActivityLog instance.
+
+    - inside atomic(): written with the transaction commit (dropped on rollback)
+    - inside a request / buffered_activity_logs(): written at the end of the scope
+    - otherwise (shell, scripts): written immediately
+    """
+    connection = transaction.get_connection(DEFAULT_DB_ALIAS)
+    if connection.in_atomic_block:
+        _transaction_batch(connection).add(entry)
+    elif _scope_depth():
+        _state.request_batch.add(entry)
+    else:
+        entry.save()
+
+
+def begin_scope():
+    if not _scope_depth():
+        _state.request_batch = _Batch()
+    _state.depth = _scope_depth() + 1
+
+
+def end_scope():
+    _state.depth = max(_scope_depth() - 1, 0)
+    if not _state.depth:
+        batch = getattr(_state, 'request_batch', None)
+        _state.request_batch = None
+        if batch is not None:
+            batch.flush()
+
+
+@contextmanager
+def buffered_activity_logs():
+    """Collect activity logs written outside a request (imports, commands) into one bulk insert."""
+    begin_scope()
+    try:
+        yield
+    finally:
+        end_scope()
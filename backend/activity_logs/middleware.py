@@ -1,6 +1,17 @@
+import json
+import logging
 import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from . import buffer as log_buffer
+from .query_stats import RequestQueries, registry
 
 _thread_locals = threading.local()
+logger = logging.getLogger(__name__)
 
 def get_current_request():
     return getattr(_thread_locals, 'request', None)
@@ -9,7 +20,17 @@ def get_current_user():
     request = get_current_request()
     if request:
         return getattr(request, 'user', None)
-    return None
+    return getattr(_thread_locals, 'user', None)
+
+@contextmanager
+def acting_user(user):
+    """Outside a request (background jobs): attribute saves and activity logs to `user`."""
+    previous = getattr(_thread_locals, 'user', None)
+    _thread_locals.user = user
+    try:
+        yield user
+    finally:
+        _thread_locals.user = previous
 
 class ActivityLogMiddleware:
     def __init__(self, get_response):
@@ -17,7 +38,83 @@ class ActivityLogMiddleware:
 
     def __call__(self, request):
         _thread_locals.request = request
-        response = self.get_response(request)
-        if hasattr(_thread_locals, 'request'):
-            del _thread_locals.request
+        # Activity logs of this request are buffered and bulk inserted at the end
+        log_buffer.begin_scope()
+        try:
+            response = self.get_response(request)
+        finally:
+            log_buffer.end_scope()
+            if hasattr(_thread_locals, 'request'):
+                del _thread_locals.request
         return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Records query count, SQL time, Python time and repeated statements per request,
+    aggregated by view action (e.g. 'UserViewSet.list', 'StructureViewSet.tree').
+
+    A ViewSet may declare `query_budget` (int, or dict of action -> int); otherwise
+    settings.QUERY_BUDGET_DEFAULT is used. Requests over budget log a structured
+    warning naming the most repeated statement (usually an N+1).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_BUDGET_ENABLED', True)
+        self.default_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        queries = RequestQueries()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        total_time = time.perf_counter() - start
+
+        label = getattr(request, '_query_budget_label', None)
+        if label:
+            budget = getattr(request, '_query_budget', None)
+            registry.record(label, queries, total_time, budget)
+            if budget is not None and queries.count > budget:
+                self.warn(request, label, budget, queries, total_time)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is None:
+            return None
+        method = request.method.lower()
+        actions = getattr(view_func, 'actions', None) or {}
+        action = actions.get(method, method)
+        request._query_budget_label = f'{view_class.__name__}.{action}'
+
+        budget = getattr(view_class, 'query_budget', None)
+        if isinstance(budget, dict):
+            budget = budget.get(action)
+        request._query_budget = budget if budget is not None else self.default_budget
+        return None
+
+    def warn(self, request, label, budget, queries, total_time):
+        repeated = queries.repeated(limit=3)
+        payload = {
+            'event': 'query_budget_exceeded',
+            'action': label,
+            'path': request.path,
+            'method': request.method,
+            'budget': budget,
+            'queries': queries.count,
+            'sql_time_ms': round(queries.sql_time * 1000, 2),
+            'total_time_ms': round(total_time * 1000, 2),
+            'repeated': repeated,
+        }
+        worst = repeated[0]['sql'] if repeated else None
+        logger.warning(
+            'Query budget exceeded for %s: %s queries (budget %s), most repeated: %s | %s',
+            label, queries.count, budget, worst, json.dumps(payload, default=str),
+            extra={'query_budget': payload},
+        )
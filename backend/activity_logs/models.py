@@ -95,6 +95,10 @@ class ActivityLog(models.Model):
         verbose_name = _('Activity log')
         verbose_name_plural = _('Activity logs')
         ordering = ('-action_time',)
+        indexes = [
+            # Keyset pagination seeks on (action_time, id)
+            models.Index(fields=['action_time', 'id'], name='activitylog_time_id_idx'),
+        ]
 
     def __str__(self):
         return f'{self.actor} {self.action_flag} {self.object_repr}'
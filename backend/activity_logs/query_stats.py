@@ -0,0 +1,165 @@
+import hashlib
+import os
+import re
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Collapse "IN (%s, %s, %s)" lists so batches of different sizes share a fingerprint
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_SPACES_RE = re.compile(r'\s+')
+
+CACHE_PREFIX = 'query_stats'
+WORKERS_KEY = f'{CACHE_PREFIX}:workers'
+# Workers listed in the report at once; a slot expires with its worker's stats
+MAX_WORKERS = getattr(settings, 'QUERY_STATS_MAX_WORKERS', 64)
+FLUSH_INTERVAL = getattr(settings, 'QUERY_STATS_FLUSH_INTERVAL', 30)
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def fingerprint(sql):
+    normalized = _IN_LIST_RE.sub('IN (...)', _SPACES_RE.sub(' ', sql.strip()))
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:12], normalized
+
+
+class RequestQueries:
+    """Collects the queries of one request (used as a connection execute_wrapper)."""
+
+    def __init__(self):
+        self.count = 0
+        self.sql_time = 0.0
+        self.statements = {}  # fingerprint -> [count, total_time, sql]
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.sql_time += elapsed
+            key, normalized = fingerprint(sql)
+            entry = self.statements.get(key)
+            if entry is None:
+                self.statements[key] = [1, elapsed, normalized[:500]]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def repeated(self, limit=5):
+        """Statements executed more than once, most frequent first."""
+        items = [
+            {'fingerprint': key, 'count': count, 'time_ms': round(total * 1000, 2), 'sql': sql}
+            for key, (count, total, sql) in self.statements.items() if count > 1
+        ]
+        items.sort(key=lambda item: item['count'], reverse=True)
+        return items[:limit]
+
+
+class QueryStatsRegistry:
+    """
+    Per-process aggregates by view action (e.g. 'UserViewSet.list').
+    Flushed periodically to the shared cache so the admin report sees every worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._actions = {}
+        self._last_flush = time.monotonic()
+        self.worker_key = f'{CACHE_PREFIX}:{socket.gethostname()}:{os.getpid()}'
+        self._slot_key = None
+
+    def record(self, label, queries, total_time, budget):
+        python_time = max(total_time - queries.sql_time, 0.0)
+        repeated = queries.repeated(limit=1)
+        with self._lock:
+            stats = self._actions.get(label)
+            if stats is None:
+                stats = self._actions[label] = {
+                    'action': label, 'requests': 0, 'queries': 0, 'max_queries': 0,
+                    'sql_time_ms': 0.0, 'python_time_ms': 0.0, 'over_budget': 0,
+                    'budget': budget, 'worst_statement': None,
+                }
+            stats['requests'] += 1
+            stats['queries'] += queries.count
+            stats['max_queries'] = max(stats['max_queries'], queries.count)
+            stats['sql_time_ms'] += queries.sql_time * 1000
+            stats['python_time_ms'] += python_time * 1000
+            stats['budget'] = budget
+            if budget is not None and queries.count > budget:
+                stats['over_budget'] += 1
+            if repeated and (stats['worst_statement'] is None
+                             or repeated[0]['count'] > stats['worst_statement']['count']):
+                stats['worst_statement'] = repeated[0]
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {label: dict(stats) for label, stats in self._actions.items()}
+
+    def maybe_flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        try:
+            cache.set(self.worker_key, self.snapshot(), CACHE_TIMEOUT)
+            self.register()
+        except Exception:
+            # Stats must never break a request
+            pass
+
+    def register(self):
+        """
+        List this worker for build_report in one of MAX_WORKERS slots, claimed with an
+        atomic add and refreshed on every flush. A dead worker's slot expires with its
+        stats and is reused, so the report never scans more than MAX_WORKERS keys.
+        """
+        if self._slot_key is not None and cache.get(self._slot_key) == self.worker_key:
+            cache.set(self._slot_key, self.worker_key, CACHE_TIMEOUT)
+            return
+        self._slot_key = None
+        for slot_key in worker_slots():
+            if cache.add(slot_key, self.worker_key, CACHE_TIMEOUT):
+                self._slot_key = slot_key
+                return
+
+
+registry = QueryStatsRegistry()
+
+
+def worker_slots():
+    return [f'{WORKERS_KEY}:{slot}' for slot in range(MAX_WORKERS)]
+
+
+def build_report(limit=20, order_by='max_queries'):
+    """Merge the stats of every worker and return the worst offenders first."""
+    registry.maybe_flush(force=True)
+    merged = {}
+    for worker_key in set(cache.get_many(worker_slots()).values()):
+        for label, stats in (cache.get(worker_key) or {}).items():
+            total = merged.get(label)
+            if total is None:
+                merged[label] = dict(stats)
+                continue
+            for key in ('requests', 'queries', 'sql_time_ms', 'python_time_ms', 'over_budget'):
+                total[key] += stats[key]
+            total['max_queries'] = max(total['max_queries'], stats['max_queries'])
+            worst = stats.get('worst_statement')
+            if worst and (total['worst_statement'] is None or worst['count'] > total['worst_statement']['count']):
+                total['worst_statement'] = worst
+
+    report = []
+    for stats in merged.values():
+        requests = stats['requests'] or 1
+        stats['avg_queries'] = round(stats['queries'] / requests, 2)
+        stats['avg_sql_time_ms'] = round(stats['sql_time_ms'] / requests, 2)
+        stats['avg_python_time_ms'] = round(stats['python_time_ms'] / requests, 2)
+        stats['sql_time_ms'] = round(stats['sql_time_ms'], 2)
+        stats['python_time_ms'] = round(stats['python_time_ms'], 2)
+        report.append(stats)
+    report.sort(key=lambda stats: stats.get(order_by) or 0, reverse=True)
+    return report[:limit]
@@ -1,17 +1,18 @@
 import json
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.forms.models import model_to_dict
 from django.core.serializers.json import DjangoJSONEncoder
 
 from apps.runtime import RuntimeState
 from .models import ActivityLog
+from . import buffer as log_buffer
+from .tracking import take_snapshot, refresh_snapshot, get_changes
 from .middleware import get_current_request, get_current_user
 from users.models import User as CustomUser
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 
 # List of models to ignore (optional)
-IGNORE_MODELS = ['ActivityLog', 'Session', 'LogEntry']
+IGNORE_MODELS = ['ActivityLog', 'Session', 'LogEntry', 'StructureClosure']
 
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -56,8 +57,9 @@ def log_save(sender, instance, created, **kwargs):
     # Let's attach a 'pre_save' handler to stash the old instance.
     
     final_changes = getattr(instance, '_activity_log_changes', None)
-    
-    ActivityLog.objects.create(
+
+    # Queued and written with one bulk_create on commit / end of request (see buffer.py)
+    log_buffer.add(ActivityLog(
         actor=user if user and user.is_authenticated else None,
         action_flag=action_flag,
         app_label=sender._meta.app_label,
@@ -67,33 +69,30 @@ def log_save(sender, instance, created, **kwargs):
         changes=final_changes,
         ip_address=get_client_ip(request) if request else None,
         user_agent=request.META.get('HTTP_USER_AGENT', '')[:255] if request else None
-    )
+    ))
+
+@receiver(post_init)
+def snapshot_loaded_state(sender, instance, **kwargs):
+    if sender.__name__ in IGNORE_MODELS:
+        return
+    take_snapshot(instance)
 
-from django.db.models.signals import pre_save
 @receiver(pre_save)
-def capture_old_state(sender, instance, **kwargs):
+def capture_old_state(sender, instance, update_fields=None, **kwargs):
     if sender.__name__ in IGNORE_MODELS:
         return
-    
-    if instance.pk:
-        try:
-            old_instance = sender.objects.get(pk=instance.pk)
-            old_dict = model_to_dict(old_instance)
-            new_dict = model_to_dict(instance)
-            
-            changes = {}
-            for key, value in new_dict.items():
-                if key in old_dict and old_dict[key] != value:
-                    # Convert to string or simplify for JSON
-                    old_val = str(old_dict[key])
-                    new_val = str(value)
-                    changes[key] = {'old': old_val, 'new': new_val}
-            
-            instance._activity_log_changes = changes
-        except sender.DoesNotExist:
-            instance._activity_log_changes = None
-    else:
+
+    if instance._state.adding:
         instance._activity_log_changes = None # New object
+    else:
+        # Diff against the values captured at load time, no extra SELECT
+        instance._activity_log_changes = get_changes(instance, update_fields)
+
+@receiver(post_save)
+def refresh_old_state(sender, instance, update_fields=None, **kwargs):
+    if sender.__name__ in IGNORE_MODELS:
+        return
+    refresh_snapshot(instance, update_fields)
 
 @receiver(post_delete)
 def log_delete(sender, instance, **kwargs):
@@ -103,7 +102,7 @@ def log_delete(sender, instance, **kwargs):
     request = get_current_request()
     user = get_current_user()
 
-    ActivityLog.objects.create(
+    log_buffer.add(ActivityLog(
         actor=user if user and user.is_authenticated else None,
         action_flag=ActivityLog.DELETE,
         app_label=sender._meta.app_label,
@@ -113,4 +112,30 @@ def log_delete(sender, instance, **kwargs):
         changes=None, # Or maybe dump the object?
         ip_address=get_client_ip(request) if request else None,
         user_agent=request.META.get('HTTP_USER_AGENT', '')[:255] if request else None
-    )
+    ))
+
+
+def log_bulk_change(model, instances, action_flag, changes=None):
+    """
+    Log entries for objects written with bulk_create / bulk_update / update(), which
+    skip post_save. changes: {pk: changes} of the updated objects.
+    """
+    if model.__name__ in IGNORE_MODELS or RuntimeState.disable_activity_logs:
+        return
+    request = get_current_request()
+    user = get_current_user()
+    actor = user if user and user.is_authenticated else None
+    ip_address = get_client_ip(request) if request else None
+    user_agent = request.META.get('HTTP_USER_AGENT', '')[:255] if request else None
+    for instance in instances:
+        log_buffer.add(ActivityLog(
+            actor=actor,
+            action_flag=action_flag,
+            app_label=model._meta.app_label,
+            model_name=model._meta.model_name,
+            object_id=str(instance.pk),
+            object_repr=str(instance),
+            changes=(changes or {}).get(instance.pk),
+            ip_address=ip_address,
+            user_agent=user_agent
+        ))
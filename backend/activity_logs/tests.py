@@ -0,0 +1,137 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from crm.models import Customer
+from users.models import User
+from .buffer import buffered_activity_logs
+from .models import ActivityLog
+
+
+class ActivityLogBufferTests(TestCase):
+    def test_logs_are_written_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for index in range(5):
+                Customer.objects.create(name=f"Customer {index}")
+            self.assertEqual(ActivityLog.objects.count(), 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(ActivityLog.objects.filter(model_name='customer').count(), 5)
+        self.assertEqual(len(queries), 1)
+
+    def test_rolled_back_savepoint_drops_its_logs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Customer.objects.create(name="Kept")
+            try:
+                with transaction.atomic():
+                    Customer.objects.create(name="Dropped")
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(
+            list(ActivityLog.objects.values_list('object_repr', flat=True)),
+            [str(Customer.objects.get(name="Kept"))],
+        )
+
+
+class ActivityLogScopeTests(TransactionTestCase):
+    def test_scope_flushes_once_at_exit(self):
+        with buffered_activity_logs():
+            for index in range(3):
+                Customer.objects.create(name=f"Customer {index}")
+            self.assertEqual(ActivityLog.objects.count(), 0)
+        self.assertEqual(ActivityLog.objects.count(), 3)
+
+    def test_batches_end_with_their_transaction(self):
+        connection = transaction.get_connection()
+        for index in range(3):
+            with transaction.atomic():
+                Customer.objects.create(name=f"Customer {index}")
+        try:
+            with transaction.atomic():
+                Customer.objects.create(name="Dropped")
+                raise ValueError
+        except ValueError:
+            pass
+        with transaction.atomic():
+            for index in range(3):
+                # Callbacks of other receivers in between: still one batch
+                transaction.on_commit(lambda: None)
+                Customer.objects.create(name=f"Next {index}")
+            self.assertEqual(len(connection.run_on_commit), 4)
+        self.assertEqual(connection.run_on_commit, [])
+        # The batch removed itself from the per-connection map when it committed
+        self.assertEqual(connection._activity_log_batches[1], {})
+        self.assertEqual(ActivityLog.objects.count(), 6)
+        self.assertFalse(ActivityLog.objects.filter(object_repr__contains="Dropped").exists())
+
+    def test_without_scope_logs_immediately(self):
+        Customer.objects.create(name="Customer")
+        self.assertEqual(ActivityLog.objects.count(), 1)
+
+
+class ChangeTrackingTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer = Customer.objects.create(name="Old name", code="C1")
+
+    def save_and_get_changes(self, instance, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                instance.save(**kwargs)
+        self.assertFalse(any(q['sql'].startswith('SELECT') for q in queries))
+        return ActivityLog.objects.filter(action_flag=ActivityLog.UPDATE).latest('id').changes
+
+    def test_diff_comes_from_loaded_snapshot(self):
+        customer = Customer.objects.get(pk=self.customer.pk)
+        customer.name = "New name"
+        self.assertEqual(
+            self.save_and_get_changes(customer),
+            {'name': {'old': "Old name", 'new': "New name"}},
+        )
+
+    def test_update_fields_limits_the_diff(self):
+        customer = Customer.objects.get(pk=self.customer.pk)
+        customer.name = "New name"
+        customer.code = "C2"
+        self.assertEqual(self.save_and_get_changes(customer, update_fields=['code']), {'code': {'old': "C1", 'new': "C2"}})
+        # name was not saved, it is still reported on the next save
+        self.assertEqual(self.save_and_get_changes(customer), {'name': {'old': "Old name", 'new': "New name"}})
+
+    def test_deferred_fields_are_skipped(self):
+        customer = Customer.objects.only('id', 'name', 'code').get(pk=self.customer.pk)
+        customer.code = "C3"
+        self.assertEqual(self.save_and_get_changes(customer, update_fields=['code']), {'code': {'old': "C1", 'new': "C3"}})
+
+
+class ActivityLogPaginationTests(TestCase):
+    def test_cursor_keeps_microseconds(self):
+        admin = User.objects.create(username="admin", is_superuser=True, is_staff=True)
+        start = timezone.now().replace(microsecond=0)
+        # 100µs apart: a millisecond cursor would skip rows
+        logs = ActivityLog.objects.bulk_create(
+            ActivityLog(action_flag=ActivityLog.CREATE, action_time=start + timedelta(microseconds=100 * index))
+            for index in range(10)
+        )
+        expected = [log.pk for log in sorted(logs, key=lambda log: log.action_time, reverse=True)]
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        for ordering, ids in (('-action_time', expected), ('action_time', expected[::-1])):
+            pages, cursor = [], None
+            while True:
+                query = {'page_size': 3, 'ordering': ordering}
+                if cursor:
+                    query['cursor'] = cursor
+                data = client.get('/activity_logs/logs/', query).data['data']
+                pages.extend(item['id'] for item in data['results'])
+                cursor = data['next_cursor']
+                if not cursor:
+                    break
+            self.assertEqual(pages, ids)
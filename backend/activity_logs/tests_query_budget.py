@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import viewsets
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+
+from codings.views import CodingViewSet
+from crm.models import Customer
+from users.models import User
+from .middleware import QueryBudgetMiddleware
+from .query_stats import MAX_WORKERS, QueryStatsRegistry, RequestQueries, build_report, worker_slots
+
+
+class RepeatedQueriesViewSet(viewsets.ViewSet):
+    authentication_classes = []
+    permission_classes = []
+    query_budget = {'list': 2}
+
+    def list(self, request):
+        for pk in range(3):
+            Customer.objects.filter(pk=pk).exists()
+        return Response([])
+
+
+def run(view, request):
+    """Middleware around a single view, like the handler does."""
+    middleware = None
+
+    def get_response(request):
+        middleware.process_view(request, view, (), {})
+        return view(request)
+
+    middleware = QueryBudgetMiddleware(get_response)
+    middleware(request)
+    return request
+
+
+def repeated_queries(count):
+    queries = RequestQueries()
+    for _ in range(count):
+        queries(lambda *args: None, 'SELECT 1', (), False, {})
+    return queries
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_over_budget_warning_names_repeated_statement(self):
+        view = RepeatedQueriesViewSet.as_view({'get': 'list'})
+        with self.assertLogs('activity_logs.middleware', 'WARNING') as logs:
+            request = run(view, APIRequestFactory().get('/'))
+        self.assertEqual((request._query_budget_label, request._query_budget), ('RepeatedQueriesViewSet.list', 2))
+        self.assertIn('3 queries (budget 2)', logs.output[0])
+        self.assertIn('FROM "crm_customer"', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_DEFAULT=7)
+    def test_budget_per_action(self):
+        middleware = QueryBudgetMiddleware(None)
+        for method, actions, budget in (('get', {'get': 'tree'}, 10), ('post', {'post': 'create'}, 7)):
+            request = getattr(APIRequestFactory(), method)('/')
+            middleware.process_view(request, CodingViewSet.as_view(actions), (), {})
+            self.assertEqual(request._query_budget, budget)
+
+    def test_flush_merges_workers(self):
+        other = QueryStatsRegistry()
+        other.worker_key += ':other'
+        view = RepeatedQueriesViewSet.as_view({'get': 'list'})
+        with self.assertLogs('activity_logs.middleware', 'WARNING'):
+            run(view, APIRequestFactory().get('/'))
+            run(view, APIRequestFactory().get('/'))
+        other.record('RepeatedQueriesViewSet.list', repeated_queries(3), 0.01, 2)
+        other.maybe_flush(force=True)
+
+        stats = {row['action']: row for row in build_report()}['RepeatedQueriesViewSet.list']
+        self.assertGreaterEqual(stats['requests'], 3)
+        self.assertGreaterEqual(stats['over_budget'], 3)
+        self.assertEqual(stats['worst_statement']['count'], 3)
+
+    def test_expired_worker_slot_is_reused(self):
+        first, second = QueryStatsRegistry(), QueryStatsRegistry()
+        second.worker_key += ':restarted'
+        first.maybe_flush(force=True)
+        slot = first._slot_key
+        # The first worker died and its slot expired
+        cache.delete(slot)
+        second.maybe_flush(force=True)
+        self.assertEqual(second._slot_key, slot)
+        self.assertEqual(len(worker_slots()), MAX_WORKERS)
+
+    def test_report_is_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="employee"))
+        self.assertEqual(client.get('/activity_logs/query-report/').status_code, 403)
+
+        client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        response = client.get('/activity_logs/query-report/', {'order_by': 'requests', 'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.data), 5)
+
@@ -0,0 +1,81 @@
+import copy
+
+
+class _Deferred:
+    """Marks a field that was not loaded (only()/defer()); pickles back to the singleton."""
+
+    def __repr__(self):
+        return '<DEFERRED>'
+
+    def __reduce__(self):
+        return 'DEFERRED'
+
+
+DEFERRED = _Deferred()
+
+SNAPSHOT_ATTR = '_activity_snapshot'
+
+_fields_cache = {}
+
+
+def tracked_fields(model):
+    """(name, attname) of the fields that take part in the diff, same set as model_to_dict."""
+    fields = _fields_cache.get(model)
+    if fields is None:
+        fields = _fields_cache[model] = tuple(
+            (field.name, field.attname)
+            for field in model._meta.concrete_fields
+            if field.editable
+        )
+    return fields
+
+
+def _value(values, attname):
+    value = values.get(attname, DEFERRED)
+    if type(value) in (dict, list):
+        # JSON values may be mutated in place, keep our own copy
+        return copy.deepcopy(value)
+    return value
+
+
+def take_snapshot(instance):
+    """Store the current field values as a compact tuple ordered like tracked_fields()."""
+    values = instance.__dict__
+    instance.__dict__[SNAPSHOT_ATTR] = tuple(
+        _value(values, attname) for _, attname in tracked_fields(type(instance))
+    )
+
+
+def refresh_snapshot(instance, update_fields=None):
+    """Make the saved values the new baseline, only update_fields when they were given."""
+    snapshot = instance.__dict__.get(SNAPSHOT_ATTR)
+    if update_fields is None or snapshot is None:
+        take_snapshot(instance)
+        return
+    values = instance.__dict__
+    instance.__dict__[SNAPSHOT_ATTR] = tuple(
+        _value(values, attname) if name in update_fields or attname in update_fields else old
+        for (name, attname), old in zip(tracked_fields(type(instance)), snapshot)
+    )
+
+
+def get_changes(instance, update_fields=None):
+    """
+    {field: {'old', 'new'}} between the snapshot and the current values, without a query.
+    Fields that were deferred when the instance was loaded are skipped.
+    """
+    snapshot = instance.__dict__.get(SNAPSHOT_ATTR)
+    if snapshot is None:
+        return None
+    values = instance.__dict__
+    changes = {}
+    for (name, attname), old in zip(tracked_fields(type(instance)), snapshot):
+        if old is DEFERRED:
+            continue
+        if update_fields is not None and name not in update_fields and attname not in update_fields:
+            continue
+        new = values.get(attname, DEFERRED)
+        if new is DEFERRED or new == old:
+            continue
+        changes[name] = {'old': str(old), 'new': str(new)}
+    return changes
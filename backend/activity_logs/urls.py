@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ActivityLogViewSet
+from .views import ActivityLogViewSet, QueryReportView
 
 router = DefaultRouter()
 router.register(r'logs', ActivityLogViewSet)
 
 urlpatterns = [
+    path('query-report/', QueryReportView.as_view(), name='query-report'),
     path('', include(router.urls)),
 ]
@@ -1,7 +1,11 @@
 from rest_framework import viewsets, permissions, filters
+from rest_framework.views import APIView
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import ActivityLog
 from .serializers import ActivityLogSerializer
+from api.pagination import KeysetPagination
+from .query_stats import build_report
 
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ActivityLog.objects.all().select_related('actor')
@@ -12,6 +16,7 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['object_repr', 'changes', 'ip_address']
     ordering_fields = ['action_time', 'actor']
     ordering = ['-action_time']
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -24,4 +29,23 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         # للمستخدمين العاديين، يتم إرجاع سجلاتهم فقط تلقائياً وبأمان
         return queryset.filter(actor=user)
     # def create(self,requset):
-    #     self.request.META.__dict__
\ No newline at end of file
+    #     self.request.META.__dict__
+
+
+class QueryReportView(APIView):
+    """
+    تقرير أسوأ الواجهات من حيث عدد الاستعلامات (للمسؤولين فقط)
+    ?limit=20&order_by=max_queries|avg_queries|over_budget|sql_time_ms|python_time_ms
+    """
+    permission_classes = [permissions.IsAdminUser]
+    order_fields = ('max_queries', 'avg_queries', 'over_budget', 'sql_time_ms', 'python_time_ms', 'requests')
+
+    def get(self, request):
+        order_by = request.query_params.get('order_by', 'max_queries')
+        if order_by not in self.order_fields:
+            order_by = 'max_queries'
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 20
+        return Response(build_report(limit=limit, order_by=order_by))
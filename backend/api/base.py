@@ -2,20 +2,29 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from .utils import standard_response
 from .codes import *
+from .pagination import KeysetPagination
+from .bulk import BulkModelMixin
 from django.db.models import ProtectedError
 
-class UnifiedModelViewSet(viewsets.ModelViewSet):
+class UnifiedModelViewSet(BulkModelMixin, viewsets.ModelViewSet):
     """
     A ViewSet that provides standardized responses for create, update, and destroy actions.
     Subclasses should define:
     - created_code
     - updated_code
     - deleted_code
+
+    List endpoints support opt-in keyset pagination: send `page_size` and/or
+    `cursor` (the `next_cursor` of the previous page) to get paginated results.
+
+    Lists of payloads / ids can be created, updated and deleted in one request on
+    `<prefix>/bulk/` (see api.bulk).
     """
     created_code = ACTION_SUCCESS
     updated_code = ACTION_SUCCESS
     deleted_code = ACTION_SUCCESS
     frozen_code = ACTION_SUCCESS
+    pagination_class = KeysetPagination
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -0,0 +1,382 @@
+"""
+Bulk endpoints of UnifiedModelViewSet, all on <prefix>/bulk/:
+
+    POST    [{...}, {...}]                   create
+    PUT     [{"id": 1, ...}, ...]            update
+    PATCH   [{"id": 1, "order": 2}, ...]     partial update
+    DELETE  {"ids": [1, 2, 3]}               hard delete, freeze (is_active=False) when protected
+
+Every item is validated before anything is written and the writes share one transaction:
+one invalid item and nothing is saved. The answer is one standard_response with a result
+per item.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.db.models import ProtectedError
+from django.db.models.deletion import Collector
+from django.utils.translation import gettext as _
+from rest_framework import mixins, status
+from rest_framework.decorators import action
+from rest_framework.serializers import ModelSerializer
+
+from activity_logs.middleware import get_current_user
+from activity_logs.models import ActivityLog
+from activity_logs.signals import log_bulk_change
+from activity_logs.tracking import get_changes, refresh_snapshot
+from apps.services.fk_resolver import ForeignKeyResolver, ResolvedQuerySet
+from apps.services.import_service import ImportService, has_stock_save
+from apps.signals import bulk_saved
+from .codes import PROTECTED_ERROR, VALIDATION_ERROR
+from .utils import standard_response
+
+
+class BulkFailed(Exception):
+    """Raised inside the bulk transaction to roll it back, carries the per item results."""
+
+    def __init__(self, results, code=VALIDATION_ERROR, message=None):
+        super().__init__(code)
+        self.results = results
+        self.code = code
+        self.message = message
+
+
+class BulkModelMixin:
+    """
+    bulk_create / bulk_update / bulk_partial_update / bulk_destroy for model viewsets.
+
+    Rows are written with bulk_create / bulk_update when the serializer and the model use
+    the stock create()/update()/save(), otherwise perform_create / perform_update run per
+    item (still one request, one transaction).
+    - bulk_update_fields: fields that are plain columns for this viewset and can always go
+      through bulk_update, even with a custom save() (e.g. ('order',) to reorder a tree).
+    - freeze_protected: False to refuse protected deletes instead of freezing them.
+    """
+    bulk_update_fields = ()
+    freeze_protected = True
+
+    @property
+    def bulk_model(self):
+        return self.get_queryset().model
+
+    @property
+    def bulk_batch_size(self):
+        return getattr(settings, 'BULK_BATCH_SIZE', 500)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request, *args, **kwargs):
+        try:
+            items = self.get_bulk_items(request.data)
+            serializers = self.get_bulk_serializers(items)
+            with transaction.atomic():
+                self.bulk_perform_create(serializers)
+        except BulkFailed as error:
+            return self.bulk_failed(error)
+
+        results = [
+            {'index': index, 'id': serializer.instance.pk, 'status': 'created', 'data': serializer.data}
+            for index, serializer in enumerate(serializers)
+        ]
+        return standard_response(self.created_code, {'count': len(results), 'results': results},
+                                 status_code=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.put
+    def bulk_update(self, request, *args, **kwargs):
+        return self._bulk_update(request, partial=False)
+
+    @bulk_create.mapping.patch
+    def bulk_partial_update(self, request, *args, **kwargs):
+        return self._bulk_update(request, partial=True)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request, *args, **kwargs):
+        try:
+            ids = self.get_bulk_ids(request.data)
+            instances = self.get_bulk_objects(ids)
+            with transaction.atomic():
+                statuses = self.bulk_perform_destroy(instances)
+        except BulkFailed as error:
+            return self.bulk_failed(error)
+
+        results = [{'index': index, 'id': instance.pk, 'status': statuses[instance.pk]}
+                   for index, instance in enumerate(instances)]
+        deleted = any(result['status'] == 'deleted' for result in results)
+        return standard_response(self.deleted_code if deleted else self.frozen_code,
+                                 {'count': len(results), 'results': results})
+
+    def _bulk_update(self, request, partial):
+        try:
+            items = self.get_bulk_items(request.data)
+            instances = self.get_bulk_objects([item.get('id') for item in items])
+            serializers = self.get_bulk_serializers(items, instances, partial=partial)
+            with transaction.atomic():
+                self.bulk_perform_update(serializers)
+        except BulkFailed as error:
+            return self.bulk_failed(error)
+
+        results = [
+            {'index': index, 'id': serializer.instance.pk, 'status': 'updated', 'data': serializer.data}
+            for index, serializer in enumerate(serializers)
+        ]
+        return standard_response(self.updated_code, {'count': len(results), 'results': results})
+
+    def bulk_failed(self, error):
+        return standard_response(error.code, {'results': error.results}, success=False,
+                                 status_code=status.HTTP_400_BAD_REQUEST, message=error.message)
+
+    # -- Request parsing / validation -----------------------------------------------------
+
+    def get_bulk_items(self, data):
+        """The list of payloads, copied (references are rewritten to pks while validating)."""
+        self._check_size(data)
+        errors = {index: {'non_field_errors': [_("Expected an object.")]}
+                  for index, item in enumerate(data) if not isinstance(item, dict)}
+        if errors:
+            raise BulkFailed(self._results(len(data), errors))
+        return [dict(item) for item in data]
+
+    def get_bulk_ids(self, data):
+        if isinstance(data, dict):
+            data = data.get('ids')
+        self._check_size(data)
+        return data
+
+    def _check_size(self, data):
+        if not isinstance(data, list) or not data:
+            raise BulkFailed([], message=_("Send a non empty list."))
+        limit = getattr(settings, 'BULK_MAX_ITEMS', 1000)
+        if len(data) > limit:
+            raise BulkFailed([], message=_("At most %(limit)s items per request.") % {'limit': limit})
+
+    def get_bulk_objects(self, ids):
+        """The objects of `ids` in order, with one query through the viewset queryset (visibility rules)."""
+        pk_field = self.bulk_model._meta.pk
+        keys = []
+        for value in ids:
+            try:
+                keys.append(pk_field.to_python(value) if value is not None else None)
+            except (ValidationError, TypeError, ValueError):
+                keys.append(None)
+        queryset = self.filter_queryset(self.get_queryset())
+        found = {instance.pk: instance for instance in queryset.filter(pk__in={key for key in keys if key is not None})}
+
+        errors, seen = {}, set()
+        for index, key in enumerate(keys):
+            if key is None or key not in found:
+                errors[index] = {'id': [_("Not found.")]}
+            elif key in seen:
+                errors[index] = {'id': [_("This value is repeated in the request.")]}
+            seen.add(key)
+        if errors:
+            raise BulkFailed(self._results(len(ids), errors))
+        return [found[key] for key in keys]
+
+    def get_bulk_serializers(self, items, instances=None, partial=False):
+        """Validated serializers, related objects of all items fetched with one IN query per field."""
+        serializer_class = self.get_serializer_class()
+        resolved, errors = ForeignKeyResolver(serializer_class, lookups={}).resolve(items)
+        for index, item_errors in self._duplicate_errors(items).items():
+            errors.setdefault(index, {}).update(item_errors)
+
+        serializers = []
+        for index, item in enumerate(items):
+            instance = instances[index] if instances else None
+            serializer = self.get_serializer(instance, data=item, partial=partial)
+            for name, objects in resolved.items():
+                field = serializer.fields.get(name)
+                if field is not None:
+                    field.queryset = ResolvedQuerySet(field.queryset.model, objects)
+            if index not in errors and not serializer.is_valid():
+                errors[index] = serializer.errors
+            serializers.append(serializer)
+        if errors:
+            raise BulkFailed(self._results(len(items), errors))
+        return serializers
+
+    def _duplicate_errors(self, items):
+        """Unique columns repeated inside the request, the DB validators only see saved rows."""
+        errors = {}
+        for field in self.bulk_model._meta.concrete_fields:
+            if not field.unique or field.primary_key:
+                continue
+            seen = set()
+            for index, item in enumerate(items):
+                value = item.get(field.name)
+                if value is None or value == '':
+                    continue
+                key = str(value).strip()
+                if key in seen:
+                    errors.setdefault(index, {})[field.name] = [_("This value is repeated in the request.")]
+                seen.add(key)
+        return errors
+
+    @staticmethod
+    def _results(count, errors):
+        return [
+            {'index': index, 'status': 'invalid', 'errors': errors[index]} if index in errors
+            else {'index': index, 'status': 'valid'}
+            for index in range(count)
+        ]
+
+    # -- Writes -----------------------------------------------------------------------------
+
+    def bulk_perform_create(self, serializers):
+        model = self.bulk_model
+        service = ImportService(model, self.get_serializer_class(), batch_size=self.bulk_batch_size)
+        if service.mode != ImportService.BULK or type(self).perform_create is not mixins.CreateModelMixin.perform_create:
+            for serializer in serializers:
+                self.perform_create(serializer)
+            return
+        instances = service.bulk_create([serializer.validated_data for serializer in serializers])
+        for serializer, instance in zip(serializers, instances):
+            serializer.instance = instance
+        log_bulk_change(model, instances, ActivityLog.CREATE)
+
+    def can_bulk_update(self, fields):
+        if type(self).perform_update is not mixins.UpdateModelMixin.perform_update:
+            return False
+        if fields <= set(self.bulk_update_fields):
+            return True
+        serializer_class = self.get_serializer_class()
+        return serializer_class.update is ModelSerializer.update and has_stock_save(self.bulk_model)
+
+    def bulk_perform_update(self, serializers):
+        model = self.bulk_model
+        fields = set().union(*(serializer.validated_data for serializer in serializers))
+        if not self.can_bulk_update(fields):
+            for serializer in serializers:
+                self.perform_update(serializer)
+            return
+
+        many_to_many = {field.name for field in model._meta.many_to_many}
+        update_fields = fields - many_to_many
+        # What save() would stamp: auto_now columns and BaseModel.updated_by
+        auto_now = [field for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)]
+        update_fields.update(field.name for field in auto_now)
+        user = get_current_user()
+        audited = user is not None and user.is_authenticated and any(
+            field.name == 'updated_by' for field in model._meta.concrete_fields
+        )
+        if audited:
+            update_fields.add('updated_by')
+
+        instances, changes = [], {}
+        for serializer in serializers:
+            instance = serializer.instance
+            for name, value in serializer.validated_data.items():
+                if name not in many_to_many:
+                    setattr(instance, name, value)
+            changes[instance.pk] = get_changes(instance, fields - many_to_many)
+            for field in auto_now:
+                field.pre_save(instance, add=False)
+            if audited:
+                instance.updated_by = user
+            instances.append(instance)
+
+        model.objects.bulk_update(instances, sorted(update_fields), batch_size=self.bulk_batch_size)
+        for serializer in serializers:
+            for name in many_to_many & set(serializer.validated_data):
+                getattr(serializer.instance, name).set(serializer.validated_data[name])
+            refresh_snapshot(serializer.instance, update_fields)
+            if getattr(serializer.instance, '_prefetched_objects_cache', None):
+                serializer.instance._prefetched_objects_cache = {}
+        bulk_saved.send(sender=model, instances=instances)
+        log_bulk_change(model, instances, ActivityLog.UPDATE, changes)
+
+    def bulk_perform_destroy(self, instances):
+        """
+        Hard delete, chunk by chunk. A chunk is collected once: the ProtectedError of that
+        collect names every referencing row, so the protected objects are split off and
+        frozen together instead of paying one failed DELETE per object.
+        Returns {pk: 'deleted' | 'frozen'}.
+        """
+        statuses, protected = {}, []
+        for start in range(0, len(instances), self.bulk_batch_size):
+            chunk = instances[start:start + self.bulk_batch_size]
+            deleted, blocked = self._delete_chunk(chunk)
+            statuses.update((instance.pk, 'deleted') for instance in deleted)
+            protected.extend(instance for instance in chunk if instance.pk in blocked)
+
+        if protected:
+            can_freeze = self.freeze_protected and any(
+                field.name == 'is_active' for field in self.bulk_model._meta.concrete_fields
+            )
+            if not can_freeze:
+                blocked = {instance.pk for instance in protected}
+                raise BulkFailed([
+                    {'index': index, 'id': instance.pk, 'status': 'protected' if instance.pk in blocked else 'valid'}
+                    for index, instance in enumerate(instances)
+                ], code=PROTECTED_ERROR)
+            self._freeze(protected)
+            statuses.update((instance.pk, 'frozen') for instance in protected)
+        return statuses
+
+    def _delete_chunk(self, chunk):
+        if type(self).perform_destroy is not mixins.DestroyModelMixin.perform_destroy:
+            return self._delete_one_by_one(chunk, set())
+        using = router.db_for_write(self.bulk_model)
+        collector = Collector(using=using)
+        try:
+            collector.collect(chunk)
+        except ProtectedError as error:
+            blocked = self._protected_pks(chunk, error.protected_objects)
+            chunk = [instance for instance in chunk if instance.pk not in blocked]
+            collector = Collector(using=using)
+            try:
+                collector.collect(chunk)
+            except ProtectedError:
+                # Protected further down a cascade, one object at a time for this chunk
+                return self._delete_one_by_one(chunk, blocked)
+        else:
+            blocked = set()
+        collector.delete()
+        return chunk, blocked
+
+    def _protected_pks(self, chunk, protected_objects):
+        """pks of the chunk that the protecting rows point to directly."""
+        pks = {instance.pk for instance in chunk}
+        targets = {self.bulk_model, *self.bulk_model._meta.get_parent_list()}
+        blocked = set()
+        for obj in protected_objects:
+            for field in obj._meta.concrete_fields:
+                if field.many_to_one and field.remote_field.model in targets:
+                    value = getattr(obj, field.attname)
+                    if value in pks:
+                        blocked.add(value)
+        return blocked
+
+    def _delete_one_by_one(self, chunk, blocked):
+        deleted = []
+        for instance in chunk:
+            try:
+                with transaction.atomic():
+                    self.perform_destroy(instance)
+            except ProtectedError:
+                blocked.add(instance.pk)
+            else:
+                deleted.append(instance)
+        return deleted, blocked
+
+    def _freeze(self, instances):
+        """Soft delete with one UPDATE, what destroy() does per object on ProtectedError."""
+        model = self.bulk_model
+        values = {'is_active': False}
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                values[field.name] = field.pre_save(instances[0], add=False)
+        user = get_current_user()
+        if user is not None and user.is_authenticated and any(
+            field.name == 'updated_by' for field in model._meta.concrete_fields
+        ):
+            values['updated_by'] = user
+
+        changes = {}
+        for instance in instances:
+            instance.is_active = False
+            changes[instance.pk] = get_changes(instance, ['is_active'])
+            for name, value in values.items():
+                setattr(instance, name, value)
+            refresh_snapshot(instance, list(values))
+        model._base_manager.filter(pk__in=[instance.pk for instance in instances]).update(**values)
+        bulk_saved.send(sender=model, instances=instances)
+        log_bulk_change(model, instances, ActivityLog.UPDATE, changes)
@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+
+class LocalLRU:
+    """
+    Small thread-safe, per-process LRU used in front of the shared (Redis) cache.
+    Entries may optionally expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def get_generation(namespace):
+    """
+    Current generation number of a cache namespace.
+    Keys built with the generation become unreachable as soon as it is bumped,
+    which invalidates every process at once without scanning Redis.
+    """
+    key = f'{namespace}:generation'
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, 1, timeout=None)
+        generation = cache.get(key, 1)
+    return generation
+
+
+def bump_generation(namespace):
+    key = f'{namespace}:generation'
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing (first run or evicted): start a fresh generation
+        cache.add(key, 1, timeout=None)
+        return cache.incr(key)
@@ -0,0 +1,15 @@
+# api/celery.py
+# Optional Celery app (background export/import jobs), start a worker with:
+#   celery -A api.celery worker
+# and the periodic tasks of CELERY_BEAT_SCHEDULE (token purge) with:
+#   celery -A api.celery beat
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+
+app = Celery('api')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
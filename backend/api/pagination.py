@@ -0,0 +1,206 @@
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+
+from .codes import ACTION_SUCCESS
+from .utils import standard_response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (seek) pagination.
+
+    Pagination is only applied when the client sends `cursor` or `page_size`,
+    otherwise the endpoint keeps returning the full list as before.
+    Pages are fetched with `WHERE (ordering_field, id) > (last values)` on the
+    ordering resolved by OrderingFilter / `ordering` / Meta.ordering, so page N
+    costs the same as page 1 (no OFFSET, no COUNT).
+    """
+    page_size = 50
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(queryset)
+        self.nullable = self._is_nullable(queryset.model, self.field)
+
+        queryset = queryset.order_by(*self._order_by())
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            queryset = queryset.filter(self._seek(*cursor))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return standard_response(ACTION_SUCCESS, {
+            'results': data,
+            'next_cursor': self.get_next_cursor(),
+            'page_size': self.page_size,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'status': {'type': 'string'},
+                'code': {'type': 'string'},
+                'data': {
+                    'type': 'object',
+                    'properties': {
+                        'results': schema,
+                        'next_cursor': {'type': 'string', 'nullable': True},
+                        'page_size': {'type': 'integer'},
+                    },
+                },
+            },
+        }
+
+    # ---------------- ordering ----------------
+
+    def get_ordering(self, queryset):
+        """
+        First ordering term of the queryset (after OrderingFilter) -> (field, descending).
+        `pk` is always used as the tie breaker.
+        """
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        for term in ordering:
+            if isinstance(term, str) and term not in ('?',):
+                descending = term.startswith('-')
+                field = term.lstrip('-')
+                return ('pk' if field == 'id' else field), descending
+        return 'pk', False
+
+    def _order_by(self):
+        if self.field == 'pk':
+            return ['-pk' if self.descending else 'pk']
+        if self.nullable:
+            value = F(self.field).desc(nulls_last=True) if self.descending else F(self.field).asc(nulls_last=True)
+        else:
+            value = f'-{self.field}' if self.descending else self.field
+        return [value, '-pk' if self.descending else 'pk']
+
+    def _seek(self, value, pk):
+        after = 'lt' if self.descending else 'gt'
+        if self.field == 'pk':
+            return Q(**{f'pk__{after}': pk})
+        if value is None:
+            # Cursor is already inside the trailing NULL block
+            return Q(**{f'{self.field}__isnull': True, f'pk__{after}': pk})
+        condition = Q(**{f'{self.field}__{after}': value}) | Q(**{self.field: value, f'pk__{after}': pk})
+        if self.nullable:
+            condition |= Q(**{f'{self.field}__isnull': True})
+        return condition
+
+    @staticmethod
+    def _is_nullable(model, path):
+        if path == 'pk':
+            return False
+        parts = path.split('__')
+        try:
+            for index, part in enumerate(parts):
+                field = model._meta.get_field(part)
+                if index < len(parts) - 1:
+                    # A nullable (or reverse) relation on the way yields NULLs too
+                    if not field.is_relation or not field.concrete or field.null:
+                        return True
+                    model = field.related_model
+        except FieldDoesNotExist:
+            return True
+        return bool(getattr(field, 'null', True))
+
+    @staticmethod
+    def _get_value(obj, path):
+        if path == 'pk':
+            return obj.pk
+        *parents, last = path.split('__')
+        for part in parents:
+            obj = getattr(obj, part, None)
+            if obj is None:
+                return None
+        try:
+            field = obj._meta.get_field(last)
+            if field.is_relation and field.concrete:
+                return getattr(obj, field.attname)
+        except (AttributeError, FieldDoesNotExist):
+            pass
+        return getattr(obj, last, None)
+
+    # ---------------- cursor ----------------
+
+    def get_next_cursor(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        return self.encode_cursor(self._get_value(last, self.field), last.pk)
+
+    # DjangoJSONEncoder cuts datetimes/times to milliseconds: the seek would then skip or
+    # repeat rows closer together than that. They are kept whole, tagged with their type.
+    cursor_types = {'datetime': datetime.datetime, 'time': datetime.time}
+
+    @classmethod
+    def encode_cursor(cls, value, pk):
+        for name, kind in cls.cursor_types.items():
+            if isinstance(value, kind):
+                value = {name: value.isoformat()}
+                break
+        payload = json.dumps([value, pk], cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, model):
+        """(value, pk) of the cursor, converted to the field types: a tampered cursor is a 404, not a 500."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if isinstance(value, dict):
+                (name, text), = value.items()
+                value = self.cursor_types[name].fromisoformat(text)
+            pk = model._meta.pk.to_python(pk)
+            field = self._get_field(model, self.field)
+            if value is not None and hasattr(field, 'to_python'):
+                value = field.to_python(value)
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    @staticmethod
+    def _get_field(model, path):
+        """Model field at the end of an ordering path, None for pk or what is not a field."""
+        if path == 'pk':
+            return model._meta.pk
+        try:
+            for part in path.split('__'):
+                field = model._meta.get_field(part)
+                model = field.related_model
+        except (FieldDoesNotExist, AttributeError):
+            return None
+        return field
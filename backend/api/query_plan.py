@@ -0,0 +1,141 @@
+import threading
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+
+
+class QueryPlan:
+    """
+    select_related / prefetch_related / only() lookups needed to render a serializer
+    without per-row queries.
+    `only` is None when the serializer reads something that is not a concrete column
+    (SerializerMethodField, properties, __str__ ...), in that case no field is deferred.
+    """
+    __slots__ = ('select_related', 'prefetch_related', 'only')
+
+    def __init__(self, select_related=(), prefetch_related=(), only=None):
+        self.select_related = tuple(sorted(select_related))
+        self.prefetch_related = tuple(sorted(prefetch_related))
+        self.only = tuple(sorted(only)) if only is not None else None
+
+    def apply(self, queryset, defer=False):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if defer and self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+    def __repr__(self):
+        return (f'<QueryPlan select={self.select_related} '
+                f'prefetch={self.prefetch_related} only={self.only}>')
+
+
+class QueryPlanner:
+    """
+    Walks the (possibly nested) fields of a serializer and maps their dotted
+    `source=` paths onto the model relations they traverse.
+    """
+
+    def __init__(self, serializer_class, model):
+        self.serializer_class = serializer_class
+        self.model = model
+        self.select = set()
+        self.prefetch = set()
+        self.only = set()
+        self.only_ok = True
+
+    def build(self):
+        self._walk(self.serializer_class().fields, self.model, prefix='', in_prefetch=False)
+        return QueryPlan(self.select, self.prefetch, self.only if self.only_ok else None)
+
+    def _join(self, prefix, name):
+        return f'{prefix}__{name}' if prefix else name
+
+    def _add_relation(self, path, in_prefetch):
+        # Relations below a prefetch can't be select_related from the root queryset
+        (self.prefetch if in_prefetch else self.select).add(path)
+
+    def _walk(self, fields, model, prefix, in_prefetch):
+        for field in fields.values():
+            if field.write_only:
+                continue
+            if field.source == '*':
+                # SerializerMethodField / whole-object fields: unknown attribute access
+                self.only_ok = False
+                continue
+            self._walk_field(field, model, prefix, in_prefetch)
+
+    def _walk_field(self, field, model, prefix, in_prefetch):
+        attrs = field.source.split('.')
+        path = prefix
+        for index, attr in enumerate(attrs):
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # Property, method or unknown attribute
+                self.only_ok = False
+                return
+            path = self._join(path, attr)
+            is_last = index == len(attrs) - 1
+
+            if model_field.is_relation and model_field.related_model is None:
+                # GenericForeignKey: can't be planned statically
+                self.only_ok = False
+                return
+
+            if not model_field.is_relation:
+                if is_last:
+                    self._add_only(path, in_prefetch)
+                else:
+                    self.only_ok = False
+                return
+
+            many = model_field.many_to_many or model_field.one_to_many
+            if many:
+                self.prefetch.add(path)
+                in_prefetch = True
+            elif not is_last or not isinstance(field, PrimaryKeyRelatedField):
+                self._add_relation(path, in_prefetch)
+                self._add_only(path, in_prefetch)
+            else:
+                # PrimaryKeyRelatedField only needs the FK column
+                self._add_only(path, in_prefetch)
+            model = model_field.related_model
+
+        self._walk_related(field, model, path, in_prefetch)
+
+    def _walk_related(self, field, model, path, in_prefetch):
+        """Recurse into nested serializers that render the relation reached by `path`."""
+        if isinstance(field, serializers.ListSerializer):
+            self._walk(field.child.fields, model, path, in_prefetch=True)
+        elif isinstance(field, serializers.BaseSerializer):
+            self._walk(field.fields, model, path, in_prefetch)
+        elif isinstance(field, ManyRelatedField):
+            if not isinstance(field.child_relation, PrimaryKeyRelatedField):
+                self.only_ok = False
+        elif isinstance(field, RelatedField) and not isinstance(field, PrimaryKeyRelatedField):
+            # StringRelatedField & co. render str(obj)
+            self.only_ok = False
+
+    def _add_only(self, path, in_prefetch):
+        # only() applies to the root queryset, prefetched models are loaded in full
+        if not in_prefetch:
+            self.only.add(path)
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def get_query_plan(serializer_class, model):
+    """Build (once per serializer class and model) and return the QueryPlan."""
+    key = (serializer_class, model)
+    plan = _plans.get(key)
+    if plan is None:
+        plan = QueryPlanner(serializer_class, model).build()
+        with _plans_lock:
+            _plans[key] = plan
+    return plan
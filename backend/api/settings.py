@@ -87,6 +87,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'activity_logs.middleware.ActivityLogMiddleware',
+    'activity_logs.middleware.QueryBudgetMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -156,6 +157,13 @@ CHANNEL_LAYERS = {
 }
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
 CELERY_RESULT_BACKEND = 'redis://127.0.0.1:6379/0'
+# celery -A api.celery beat: periodic maintenance tasks
+CELERY_BEAT_SCHEDULE = {
+    'purge-expired-tokens': {
+        'task': 'users.purge_expired_tokens',
+        'schedule': 60 * 60 * 24,
+    },
+}
 
 
 
@@ -171,11 +179,8 @@ SESSION_CACHE_ALIAS = "default"
 REST_FRAMEWORK = {
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.SessionAuthentication', 
         'users.authentication.VersionedJWTAuthentication',
-        
-        
+        'rest_framework.authentication.SessionAuthentication',
     ),
     
     'DEFAULT_PERMISSION_CLASSES': (
@@ -215,6 +220,42 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
 }
+# Seconds a process trusts its local copy of a user's token_version/is_active (users/token_state.py)
+TOKEN_STATE_LOCAL_TTL = 0.5
+# Access tokens carry a permission bitmap, data visibility and structure ids (users/token_claims.py),
+# requests are then authorized from the token until a role/structure change bumps the claims version
+TOKEN_CLAIMS_ENABLED = False
+# -----------------------------
+# Query budget (N+1 detector)
+# -----------------------------
+# Default max queries per request, a ViewSet may override it with `query_budget`
+QUERY_BUDGET_ENABLED = True
+QUERY_BUDGET_DEFAULT = 50
+QUERY_STATS_FLUSH_INTERVAL = 30
+QUERY_STATS_MAX_WORKERS = 64
+# Activity logs are written in bulk, a buffer is flushed early once it holds this many rows
+ACTIVITY_LOG_BUFFER_SIZE = 500
+# Rows fetched per server-side cursor round trip by streaming CSV/NDJSON exports
+EXPORT_STREAM_CHUNK_SIZE = 2000
+# Background export jobs: Celery when CELERY_BROKER_URL is reachable, else a local thread pool.
+# EXPORT_JOB_EXECUTOR = 'export.services.jobs.ThreadPoolJobExecutor'
+EXPORT_JOB_WORKERS = 2
+# Seconds a job may stay pending/running before it is considered dead and marked failed
+EXPORT_JOB_TIMEOUT = 60 * 60
+# Rows per bulk_create statement in bulk imports (apps/services/import_service.py)
+IMPORT_BATCH_SIZE = 1000
+# Background import jobs, same executor choice as exports. Progress is pushed over CHANNEL_LAYERS.
+# IMPORT_JOB_EXECUTOR = 'apps.services.import_jobs.ThreadPoolImportExecutor'
+IMPORT_JOB_WORKERS = 2
+# RULES of large imports are checked in a process pool once this many rows were read
+IMPORT_PARALLEL_MIN_ROWS = 5000
+# IMPORT_VALIDATION_WORKERS = 4  (default: CPU count)
+# Bulk endpoints of UnifiedModelViewSet (<prefix>/bulk/): items per request / per statement
+BULK_MAX_ITEMS = 1000
+BULK_BATCH_SIZE = 500
+# Seconds dashboard statistics (api/stats.py) are cached, writes invalidate them earlier
+STATISTICS_CACHE_TIMEOUT = 60
+
 CSRF_TRUSTED_ORIGINS = [
     'https://127.0.0.1',
     'https://localhost',
@@ -242,6 +283,11 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# ModelBackend with permissions served from the cached per-user index (users/permission_index.py)
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedPermissionBackend',
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .cache import bump_generation, get_generation
+
+
+def conditional_counts(queryset, counters, group_by=None):
+    """
+    Dashboard counters with one query: `counters` maps a name to a Q (None counts every
+    row) and each becomes a Count(filter=...) of the same SELECT.
+    With `group_by` a row per value is returned instead: [{group_by: value, name: count}].
+    """
+    aggregates = {
+        name: Count('pk', filter=condition) if condition is not None else Count('pk')
+        for name, condition in counters.items()
+    }
+    if group_by is None:
+        return queryset.aggregate(**aggregates)
+    return list(queryset.order_by(group_by).values(group_by).annotate(**aggregates))
+
+
+class CachedStatistics:
+    """
+    A statistics function whose result is cached for a short time (STATISTICS_CACHE_TIMEOUT).
+    Its signal receivers call invalidate(), which rotates the namespace generation so every
+    cached argument set is dropped at once.
+    """
+
+    def __init__(self, name, compute, timeout=None):
+        self.namespace = f'statistics:{name}'
+        self.compute = compute
+        self.timeout = timeout
+        self.__doc__ = compute.__doc__
+
+    def __call__(self, *args):
+        key = ':'.join([self.namespace, str(get_generation(self.namespace)), *map(str, args)])
+        value = cache.get(key)
+        if value is None:
+            value = self.compute(*args)
+            timeout = self.timeout or getattr(settings, 'STATISTICS_CACHE_TIMEOUT', 60)
+            cache.set(key, value, timeout)
+        return value
+
+    def invalidate(self):
+        bump_generation(self.namespace)
+
+
+def cached_statistics(name, timeout=None):
+    """Decorator: f() -> CachedStatistics, call it like f and invalidate with f.invalidate()."""
+    def decorator(compute):
+        return CachedStatistics(name, compute, timeout)
+    return decorator
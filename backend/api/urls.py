@@ -23,13 +23,13 @@ from rest_framework_simplejwt.views import (
 )
 from django.views.decorators.csrf import csrf_exempt
 
-from users.views import MyTokenObtainPairView
+from users.views import MyTokenObtainPairView, MyTokenRefreshView
 urlpatterns = [
     path('admin/', admin.site.urls),
     # JWT token endpoints
     #path('token/', csrf_exempt(TokenObtainPairView.as_view()), name='token_obtain_pair'),
     path('token/', csrf_exempt(MyTokenObtainPairView.as_view()), name='token_obtain_pair'),
-    path('token/refresh/',csrf_exempt(TokenRefreshView.as_view()), name='token_refresh'),
+    path('token/refresh/',csrf_exempt(MyTokenRefreshView.as_view()), name='token_refresh'),
     path('clients/', include('clients.urls')),
     path('users/', include('users.urls')),
     path('apps/', include('apps.urls')),
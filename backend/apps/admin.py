@@ -1,4 +1,4 @@
-from .models import AppType,App,AppVersion,Model
+from .models import AppType,App,AppVersion,Model,ImportJob
 from django.contrib import admin
 
 @admin.register(AppType)
@@ -17,3 +17,7 @@ class AppVersionAdmin(admin.ModelAdmin):
 class ModelAdmin(admin.ModelAdmin):
     pass    
 
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    pass
@@ -8,44 +8,82 @@ class BaseRulesSerializer(serializers.ModelSerializer):
     RULES = {
         "field_name": [(validator_fn, arg1, arg2), (validator_fn2, )]
     }
+    RULES are compiled once per class (compile_rules) into chains of bound checks.
     """
     RULES = {} 
+    COMPILED_RULES = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.COMPILED_RULES = compile_rules(cls.RULES)
 
     def validate(self, attrs):
         errors = {}
 
+        # Fields already checked on the raw rows of an import batch (apps/validation/parallel.py)
+        checked = self.context.get('rules_checked', ())
+
         # Validate defined RULES
-        for field, rules in self.RULES.items():
-            # If field is not in attrs, check instance for partial updates or default
-            value = attrs.get(field)
-            
-            # Check if this is a partial update and field is missing
-            if self.partial and field not in attrs:
-                 # Should we validate existing value? 
-                 # Usually validation runs on incoming data. 
-                 # If 'required' is a rule, it should fail if missing in creation.
-                 # But if partial update, we might skip if not provided.
-                 # Let's assume rules apply to present data or required checks.
-                 # If value is missing and required rule exists, we should check it.
-                 pass
-
-            for rule in rules:
-                fn = rule[0]
-                args = rule[1:]
-                try:
-                    fn(value, *args)
-                except serializers.ValidationError as e:
-                    # Capturing the error message
-                    detail = e.detail
-                    if isinstance(detail, list):
-                        errors[field] = detail
-                    elif isinstance(detail, dict):
-                         errors[field] = [str(val) for val in detail.values()]
-                    else:
-                        errors[field] = [str(detail)]
-                    break  # Stop at first error for this field
+        # Partial updates: a missing field is checked as None, like before
+        for field, checks in self.COMPILED_RULES:
+            if field in checked:
+                continue
+            messages = run_checks(checks, attrs.get(field))
+            if messages:
+                errors[field] = messages
 
         if errors:
             raise serializers.ValidationError(errors)
 
         return attrs
+
+    @classmethod
+    def validate_many(cls, rows, fields=None):
+        """
+        RULES of many rows at once, column by column (imports).
+        rows: dicts of field -> value, fields: limit to these fields.
+        Returns {row index: {field: [message, ...]}}.
+        """
+        errors = {}
+        for field, checks in cls.COMPILED_RULES:
+            if fields is not None and field not in fields:
+                continue
+            for index, row in enumerate(rows):
+                messages = run_checks(checks, row.get(field))
+                if messages:
+                    errors.setdefault(index, {})[field] = messages
+        return errors
+
+
+def compile_rules(rules):
+    """RULES dict -> ((field, (check, ...)), ...), rule arguments bound once."""
+    return tuple(
+        (field, tuple(bind_rule(rule[0], rule[1:]) for rule in field_rules))
+        for field, field_rules in rules.items()
+    )
+
+
+def bind_rule(fn, args):
+    """check(value) calling fn(value, *args), the validator itself when there are no args."""
+    if not args:
+        return fn
+
+    def check(value):
+        return fn(value, *args)
+    return check
+
+
+def run_checks(checks, value):
+    """Run the checks of one field, returns the messages of the first failing one or None."""
+    try:
+        for check in checks:
+            check(value)
+    except serializers.ValidationError as e:
+        # Capturing the error message
+        detail = e.detail
+        if isinstance(detail, list):
+            return detail
+        elif isinstance(detail, dict):
+            return [str(val) for val in detail.values()]
+        return [str(detail)]
+    return None
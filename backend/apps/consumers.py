@@ -0,0 +1,52 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import ImportJob
+
+
+class ImportJobConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws/imports/<pk>/?token=<access token>
+    يرسل حالة مهمة الاستيراد عند الاتصال ثم بعد كل دفعة (publish_progress).
+    """
+
+    async def connect(self):
+        job = await self.get_job()
+        if job is None:
+            await self.close()
+            return
+        self.group_name = job.group_name
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await self.send_json(await self.serialize(job))
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def import_progress(self, event):
+        await self.send_json(event['job'])
+
+    @database_sync_to_async
+    def get_job(self):
+        from users.authentication import VersionedJWTAuthentication
+        token = parse_qs(self.scope.get('query_string', b'').decode()).get('token', [None])[0]
+        if not token:
+            return None
+        authentication = VersionedJWTAuthentication()
+        try:
+            user = authentication.get_user(authentication.get_validated_token(token))
+        except AuthenticationFailed:
+            return None
+        jobs = ImportJob.objects.all()
+        if not user.is_staff:
+            jobs = jobs.filter(created_by=user)
+        return jobs.filter(pk=self.scope['url_route']['kwargs']['pk']).first()
+
+    @database_sync_to_async
+    def serialize(self, job):
+        from .serializers import ImportJobSerializer
+        return ImportJobSerializer(job).data
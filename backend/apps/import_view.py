@@ -5,6 +5,10 @@ from django.apps import apps
 from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied, ValidationError
+from django.shortcuts import get_object_or_404
+from .models import ImportJob
+from .serializers import ImportJobSerializer
+from .services.import_jobs import enqueue_import
 from .services.import_service import ImportService
 from django.utils.translation import gettext as _
 
@@ -49,19 +53,34 @@ class DataImportView(APIView):
             # We can try to import the serializer dynamically if we follow a naming convention (ModelNameSerializer).
             serializer_class = self._get_serializer_class(app_label, model_name)
             
-            service = ImportService(model, serializer_class)
-            result = service.handle_import(file_obj)
-            
-            if result['status'] == 'failed':
-                 return Response(result, status=status.HTTP_400_BAD_REQUEST)
-            elif result['status'] == 'error':
-                 return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            return Response(result, status=status.HTTP_200_OK)
+            return self.run_import(model, serializer_class, file_obj, self._get_import_options(request))
 
         except Exception as e:
             return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    def run_import(self, model, serializer_class, file_obj, options):
+        service = ImportService(model, serializer_class, **options)
+        result = service.handle_import(file_obj)
+
+        if result['status'] == 'failed':
+             return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        elif result['status'] == 'error':
+             return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response(result, status=status.HTTP_200_OK)
+
+    def _get_import_options(self, request):
+        """Optional: mode=bulk|row, unique_fields=code,email (upsert key), batch_size"""
+        unique_fields = request.data.get('unique_fields') or None
+        if isinstance(unique_fields, str):
+            unique_fields = [name.strip() for name in unique_fields.split(',') if name.strip()]
+        batch_size = request.data.get('batch_size')
+        return {
+            'mode': request.data.get('mode') or None,
+            'batch_size': int(batch_size) if batch_size else None,
+            'unique_fields': unique_fields,
+        }
+
     def _get_serializer_class(self, app_label, model_name):
         """
         Attempt to load ModelNameSerializer from app.serializers
@@ -93,3 +112,33 @@ class DataImportView(APIView):
         # Fallback: Maybe 'api.serializers'?
         # Or raise error that we can't sanitize input without a serializer
         raise ValidationError(_(f"Could not find serializer for {model_name}. Ensure {model_name}CreateSerializer or {model_name}Serializer exists in {app_label}.serializers"))
+
+
+class ImportJobListCreateView(DataImportView):
+    """
+    الاستيراد في الخلفية
+    POST: نفس مدخلات DataImportView، يعيد المهمة فوراً (202) والتقدم عبر
+    ImportJobDetailView أو ws/imports/<id>/
+    GET: مهام المستخدم الحالي
+    """
+
+    def get(self, request):
+        jobs = ImportJob.objects.filter(created_by=request.user).order_by('-created_at')[:50]
+        return Response(ImportJobSerializer(jobs, many=True).data)
+
+    def run_import(self, model, serializer_class, file_obj, options):
+        # Fail fast on options the worker would reject
+        ImportService(model, serializer_class, **options)
+        job = enqueue_import(model, serializer_class, file_obj, options)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ImportJobDetailView(APIView):
+    """حالة مهمة الاستيراد: الصفوف المعالجة / المستوردة / الخاطئة"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        jobs = ImportJob.objects.all()
+        if not request.user.is_staff:
+            jobs = jobs.filter(created_by=request.user)
+        return Response(ImportJobSerializer(get_object_or_404(jobs, pk=pk)).data)
@@ -0,0 +1,89 @@
+# apps/management/commands/benchmark_rules.py
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+
+from apps.baseserializer import BaseRulesSerializer
+from apps.validation.validators import required, min_len, max_len, email, phone, arabic_only, alphanumeric
+from crm.models import Customer
+
+
+class BenchmarkSerializer(BaseRulesSerializer):
+    RULES = {
+        "name": [(required,), (min_len, 3), (arabic_only,)],
+        "email": [(email,)],
+        "phone": [(phone,)],
+        "code": [(alphanumeric,), (max_len, 20)],
+    }
+
+    class Meta:
+        model = Customer
+        fields = ["name", "email", "phone", "code"]
+
+
+def interpreted(rules, attrs):
+    """RULES walked as a dict on every call (the previous BaseRulesSerializer.validate)."""
+    errors = {}
+    for field, field_rules in rules.items():
+        value = attrs.get(field)
+        for rule in field_rules:
+            fn = rule[0]
+            args = rule[1:]
+            try:
+                fn(value, *args)
+            except serializers.ValidationError as e:
+                errors[field] = e.detail
+                break
+    return errors
+
+
+class Command(BaseCommand):
+    help = "قياس سرعة قواعد التحقق RULES: تفسير القاموس / سلاسل مترجمة لكل صف / validate_many"
+
+    VALID = {
+        'name': ["محمد أحمد", "علي حسن", "فاطمة علي", "عبدالله صالح"],
+        'email': ["a@example.com", "info@company.ye", None],
+        'phone': ["+967777123456", "777123456", None],
+        'code': ["C100", "ABC123", None],
+    }
+    INVALID = {'name': "Sara", 'email': "not-an-email", 'phone': "12", 'code': "bad code"}
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--invalid', type=float, default=0.05, help="نسبة الصفوف الخاطئة")
+
+    def handle(self, *args, **options):
+        serializer = BenchmarkSerializer()
+        for count in options['rows']:
+            rows = self.make_rows(count, options['invalid'])
+            timings = [
+                ("interpreted", lambda: [interpreted(BenchmarkSerializer.RULES, row) for row in rows]),
+                ("compiled validate()", lambda: [self.validate(serializer, row) for row in rows]),
+                ("validate_many()", lambda: BenchmarkSerializer.validate_many(rows)),
+            ]
+            for label, run in timings:
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{count:>7} rows  {label:<20} {elapsed:7.3f}s  {count / elapsed:10.0f} rows/s")
+
+    @staticmethod
+    def validate(serializer, row):
+        try:
+            serializer.validate(row)
+        except serializers.ValidationError as e:
+            return e.detail
+
+    def make_rows(self, count, invalid=0.05):
+        rng = random.Random(count)
+        rows = []
+        for _ in range(count):
+            row = {field: rng.choice(values) for field, values in self.VALID.items()}
+            if rng.random() < invalid:
+                field = rng.choice(list(self.INVALID))
+                row[field] = self.INVALID[field]
+            rows.append(row)
+        return rows
@@ -4,6 +4,7 @@ from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes.models import ContentType
 from django.utils.timezone import now as DateTime
 from codings.models import CodingCategory
+from .basemodel import BaseModel
 
 #---------------------- App ------------------------------
 
@@ -80,3 +81,58 @@ class Model(ContentType):
     @property
     def app(self):
         return App.objects.get(pk=self.app_label)
+
+
+#---------------------- Import jobs ------------------------------
+
+class ImportJob(BaseModel):
+    """
+    مهمة استيراد في الخلفية (انظر apps/services/import_jobs.py)
+    التقدم يُرسل عبر CHANNEL_LAYERS إلى المجموعة group_name.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    )
+    # Only the first errors are kept, the counters cover all rows
+    MAX_ERRORS = 1000
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING, verbose_name=_("Status"))
+    app_label = models.CharField(max_length=100, verbose_name=_("App name"))
+    model_name = models.CharField(max_length=100, verbose_name=_("Model"))
+    serializer = models.CharField(max_length=255, verbose_name=_("Serializer"))
+    params = models.JSONField(default=dict, blank=True, verbose_name=_("Parameters"))
+    file = models.FileField(upload_to='imports/', verbose_name=_("File"))
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name=_("Total rows"))
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name=_("Processed rows"))
+    success_rows = models.PositiveIntegerField(default=0, verbose_name=_("Imported rows"))
+    error_rows = models.PositiveIntegerField(default=0, verbose_name=_("Rows with errors"))
+    errors = models.JSONField(default=list, blank=True, verbose_name=_("Errors"))
+    error = models.TextField(null=True, blank=True, verbose_name=_("Error"))
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Started at"))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Finished at"))
+
+    class Meta:
+        verbose_name = _("Import job")
+        verbose_name_plural = _("Import jobs")
+
+    def __str__(self):
+        return f"{self.app_label}.{self.model_name} - {self.status}"
+
+    @property
+    def group_name(self):
+        return f"import_job_{self.pk}"
+
+    @property
+    def progress(self):
+        if self.status in (self.DONE, self.FAILED):
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(round(self.processed_rows * 100 / self.total_rows), 99)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import ImportJobConsumer
+
+websocket_urlpatterns = [
+    path('ws/imports/<int:pk>/', ImportJobConsumer.as_asgi()),
+]
@@ -22,4 +22,14 @@ class AppVersionSerializer(BaseRulesSerializer):
     
     class Meta:
         model = AppVersion
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.ReadOnlyField()
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'status', 'app_label', 'model_name', 'params', 'total_rows', 'processed_rows',
+            'success_rows', 'error_rows', 'progress', 'errors', 'error', 'created_at', 'started_at', 'finished_at',
+        ]
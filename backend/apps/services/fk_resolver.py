@@ -0,0 +1,102 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext as _
+from rest_framework.relations import PrimaryKeyRelatedField
+
+_AMBIGUOUS = object()
+
+
+class ResolvedQuerySet:
+    """
+    Stands in for the queryset of a PrimaryKeyRelatedField while a batch is validated:
+    get(pk=...) is answered from the instances fetched by ForeignKeyResolver.
+    """
+
+    def __init__(self, model, instances):
+        self.model = model
+        self.instances = instances
+
+    def get(self, pk):
+        try:
+            return self.instances[pk]
+        except (KeyError, TypeError):
+            raise self.model.DoesNotExist()
+
+
+class ForeignKeyResolver:
+    """
+    Resolves the FK columns of a whole batch with one IN query per related field.
+
+    A column may hold the pk or, for fields declared in `lookups` (serializer
+    Meta.import_lookups, e.g. {'customer': 'name'}), a natural key of the related row.
+    Pass lookups={} to accept pks only.
+    Rows are rewritten to pks; unknown or ambiguous references become row errors.
+    """
+
+    def __init__(self, serializer_class, lookups=None):
+        if lookups is None:
+            meta = getattr(serializer_class, 'Meta', None)
+            lookups = getattr(meta, 'import_lookups', None) or {}
+        self.fields = {}
+        for name, field in serializer_class().fields.items():
+            if isinstance(field, PrimaryKeyRelatedField) and not field.read_only and field.queryset is not None:
+                self.fields[name] = (field.queryset, lookups.get(name, 'pk'))
+
+    def resolve(self, rows):
+        """
+        Returns (resolved, errors):
+        resolved = {field: {pk: instance}} for ResolvedQuerySet,
+        errors = {row index: {field: [message]}}.
+        """
+        resolved, errors = {}, {}
+        for name, (queryset, lookup) in self.fields.items():
+            values = {self._key(row.get(name)) for row in rows if not self._is_empty(row.get(name))}
+            pk_field = queryset.model._meta.pk
+            by_pk, by_lookup = self._fetch(queryset, lookup, values, pk_field)
+            resolved[name] = by_pk
+
+            for index, row in enumerate(rows):
+                value = row.get(name)
+                if self._is_empty(value):
+                    continue
+                key = self._key(value)
+                instance = by_lookup.get(key)
+                if instance is None:
+                    instance = by_pk.get(self._to_pk(pk_field, key))
+                if instance is _AMBIGUOUS:
+                    errors.setdefault(index, {})[name] = [_("More than one record matches \"%s\".") % value]
+                elif instance is None:
+                    errors.setdefault(index, {})[name] = [_("No record matches \"%s\".") % value]
+                else:
+                    row[name] = instance.pk
+        return resolved, errors
+
+    def _fetch(self, queryset, lookup, values, pk_field):
+        by_pk, by_lookup = {}, {}
+        if not values:
+            return by_pk, by_lookup
+        pks = {self._to_pk(pk_field, value) for value in values} - {None}
+        condition = Q(pk__in=pks)
+        if lookup != 'pk':
+            condition |= Q(**{f'{lookup}__in': values})
+        for instance in queryset.filter(condition):
+            by_pk[instance.pk] = instance
+            if lookup != 'pk':
+                key = self._key(getattr(instance, lookup))
+                by_lookup[key] = _AMBIGUOUS if key in by_lookup else instance
+        return by_pk, by_lookup
+
+    @staticmethod
+    def _to_pk(pk_field, value):
+        try:
+            return pk_field.to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _key(value):
+        return str(value).strip()
+
+    @staticmethod
+    def _is_empty(value):
+        return value is None or value == ''
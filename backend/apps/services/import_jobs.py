@@ -0,0 +1,114 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from activity_logs.middleware import acting_user
+from export.services.jobs import CeleryJobExecutor, InlineJobExecutor, ThreadPoolJobExecutor, get_executor
+from ..models import ImportJob
+from .import_service import ImportService
+
+logger = logging.getLogger(__name__)
+
+# ImportService options stored on the job
+JOB_PARAMS = ('mode', 'unique_fields', 'batch_size')
+
+
+def enqueue_import(model, serializer_class, file_obj, params):
+    """Store the upload with a pending job and hand it to the executor after commit."""
+    params = {key: params[key] for key in JOB_PARAMS if params.get(key) not in (None, '', [])}
+    job = ImportJob(
+        app_label=model._meta.app_label,
+        model_name=model.__name__,
+        serializer=f"{serializer_class.__module__}.{serializer_class.__qualname__}",
+        params=params,
+    )
+    job.file.save(file_obj.name, file_obj, save=False)
+    job.save()
+    transaction.on_commit(lambda: get_import_executor().submit(job.pk))
+    return job
+
+
+def run_import_job(job_id):
+    """Run the import of a job, pushing progress after every batch."""
+    claimed = ImportJob.objects.filter(pk=job_id, status=ImportJob.PENDING).update(
+        status=ImportJob.RUNNING, started_at=timezone.now(),
+    )
+    if not claimed:
+        return
+    job = ImportJob.objects.get(pk=job_id)
+    jobs = ImportJob.objects.filter(pk=job_id)
+
+    def report(processed, saved, error_rows, **fields):
+        job.processed_rows, job.success_rows, job.error_rows = processed, saved, error_rows
+        for name, value in fields.items():
+            setattr(job, name, value)
+        jobs.update(processed_rows=processed, success_rows=saved, error_rows=error_rows, **fields)
+        publish_progress(job)
+
+    try:
+        model = apps.get_model(job.app_label, job.model_name)
+        service = ImportService(model, import_string(job.serializer), **job.params)
+        user = get_user_model().objects.filter(pk=job.created_by_id).first()
+        with job.file.open('rb') as file_obj:
+            total = service.estimate_rows(file_obj)
+            job.total_rows = total
+            jobs.update(total_rows=total)
+            publish_progress(job)
+            with acting_user(user):
+                result = service.handle_import(file_obj, progress=report)
+    except Exception as e:
+        logger.exception("Import job %s failed", job_id)
+        result = {'status': 'error', 'errors': [{'line': '-', 'field': 'global', 'message': str(e)}]}
+
+    if result['status'] == 'success':
+        report(result['total'], result['success'], 0,
+               status=ImportJob.DONE, total_rows=result['total'], finished_at=timezone.now())
+    else:
+        errors = result['errors']
+        error_rows = len({error['line'] for error in errors if error['line'] != '-'})
+        report(result.get('total', job.processed_rows), 0, error_rows,
+               status=ImportJob.FAILED, errors=errors[:ImportJob.MAX_ERRORS],
+               error=errors[0]['message'] if result['status'] == 'error' else None,
+               finished_at=timezone.now())
+
+
+def publish_progress(job):
+    """Push the job state to its channel group (no-op without channels)."""
+    try:
+        from channels.layers import get_channel_layer
+    except ImportError:
+        return
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    from ..serializers import ImportJobSerializer
+    try:
+        async_to_sync(layer.group_send)(job.group_name, {
+            'type': 'import.progress',
+            'job': ImportJobSerializer(job).data,
+        })
+    except Exception:
+        # A broken channel layer must not break the import
+        logger.warning("Could not publish progress of import job %s", job.pk, exc_info=True)
+
+
+class InlineImportExecutor(InlineJobExecutor):
+    run_job = staticmethod(run_import_job)
+
+
+class ThreadPoolImportExecutor(ThreadPoolJobExecutor):
+    run_job = staticmethod(run_import_job)
+    workers_setting = 'IMPORT_JOB_WORKERS'
+
+
+class CeleryImportExecutor(CeleryJobExecutor):
+    task = 'apps.tasks.run_import_job_task'
+
+
+def get_import_executor():
+    return get_executor('IMPORT_JOB_EXECUTOR', ThreadPoolImportExecutor, CeleryImportExecutor)
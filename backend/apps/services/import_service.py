@@ -1,13 +1,58 @@
+import codecs
 import csv
-import pandas as pd
-from django.db import transaction
+from django.conf import settings
+from django.db import models, transaction
 from django.core.files.base import ContentFile
-from rest_framework.serializers import ValidationError
+from rest_framework.serializers import ModelSerializer, ValidationError
+from rest_framework.validators import UniqueValidator, UniqueTogetherValidator
+
+from activity_logs import buffer as log_buffer
+from activity_logs.middleware import get_current_request, get_current_user
+from activity_logs.models import ActivityLog
+from apps.basemodel import BaseModel
+from apps.runtime import RuntimeState
+from apps.signals import bulk_saved
+from apps.validation.parallel import RulesValidator
+from .fk_resolver import ForeignKeyResolver, ResolvedQuerySet
+
+
+def has_stock_save(model):
+    """True when bulk_create/bulk_update may stand in for model.save() (stock save, no MTI)."""
+    if model._meta.parents:
+        # Multi-table inheritance can't be bulk created
+        return False
+    return model.save in (models.Model.save, BaseModel.save)
+
+
+class ImportFailed(Exception):
+    """Raised inside the import transaction to roll back when a row is invalid."""
+
 
 class ImportService:
-    def __init__(self, model, serializer_class=None):
+    """
+    Two save modes:
+    - bulk: rows validated once, written per batch with bulk_create (optionally upsert
+      on a natural key) and one aggregated ActivityLog entry.
+    - row: serializer.save() per row, for serializers with their own create()
+      (e.g. password hashing) or models with custom save() logic.
+    """
+    BULK = 'bulk'
+    ROW = 'row'
+
+    def __init__(self, model, serializer_class=None, mode=None, batch_size=None, unique_fields=None, update_fields=None,
+                 lookups=None):
         self.model = model
         self.serializer_class = serializer_class or self._resolve_serializer()
+        self.mode = mode or (self.BULK if self.supports_bulk() else self.ROW)
+        self.batch_size = batch_size or getattr(settings, 'IMPORT_BATCH_SIZE', 1000)
+        meta = getattr(self.serializer_class, 'Meta', None)
+        # Natural key for upsert, declared per call or on the serializer Meta
+        self.unique_fields = list(unique_fields or getattr(meta, 'import_unique_fields', None) or [])
+        self.update_fields = update_fields
+        self.resolver = ForeignKeyResolver(self.serializer_class, lookups)
+        self.rules_validator = RulesValidator(self.serializer_class)
+        if self.mode == self.BULK and not self.supports_bulk():
+            raise ValueError(f"Bulk import is not supported for {self.model.__name__}")
 
     def _resolve_serializer(self):
         # Try to find a serializer from the model
@@ -16,42 +61,77 @@ class ImportService:
         # Fallback logic if needed, or raise error
         raise ValueError(f"No serializer found for model {self.model.__name__}")
 
-    def handle_import(self, file_obj):
+    def supports_bulk(self):
+        """bulk_create skips Serializer.create() and Model.save(), so both must be the stock ones."""
+        if getattr(self.serializer_class, 'create', None) is not ModelSerializer.create:
+            return False
+        return has_stock_save(self.model)
+
+    def handle_import(self, file_obj, progress=None):
         """
         Main entry point.
         Returns: { 'success': int, 'errors': list, 'total': int }
+        progress(processed_rows, saved_rows, error_rows) is called after every batch.
+
+        Rows are streamed from the upload, validated once and saved batch by batch inside
+        one transaction. After the first invalid row nothing more is written (validation
+        continues to report every error) and the transaction is rolled back.
         """
         rows = self._parse_file(file_obj)
-        total_rows = len(rows)
+        try:
+            return self._import_rows(rows, progress)
+        finally:
+            self.rules_validator.close()
+
+    def _import_rows(self, rows, progress):
+        total_rows = 0
         errors = []
-        validated_data_list = []
-
-        # 1. Validation Phase
-        for index, row in enumerate(rows):
-            # Row index starts at 1 usually for users (header is 0)
-            line_number = index + 2 
-            
-            serializer = self.serializer_class(data=row)
-            if serializer.is_valid():
-                validated_data_list.append(serializer.validated_data)
-            else:
-                # Format errors
-                row_errors = serializer.errors
-                formatted_errors = self._format_errors(row_errors, line_number)
-                errors.extend(formatted_errors)
-
-        # 2. Atomic Save Phase
-        if errors:
+        error_rows = 0
+        saved = 0
+
+        try:
+            with transaction.atomic():
+                line_number = 1  # header
+                for chunk in self._chunks(rows):
+                    # FK columns of the whole chunk: one IN query per related field
+                    resolved, reference_errors = self.resolver.resolve(chunk)
+                    # RULES of plain fields, column by column (process pool for big batches)
+                    rule_errors = self.rules_validator.validate(chunk)
+                    batch = []
+                    for index, row in enumerate(chunk):
+                        line_number += 1
+                        total_rows += 1
+
+                        row_errors = reference_errors.get(index)
+                        if not row_errors:
+                            serializer = self._get_serializer(row, resolved)
+                            if not serializer.is_valid():
+                                row_errors = serializer.errors
+                            else:
+                                # validate() only runs once the fields are valid, same order here
+                                row_errors = rule_errors.get(index)
+                        if row_errors:
+                            errors.extend(self._format_errors(row_errors, line_number))
+                            error_rows += 1
+                        elif not errors:
+                            batch.append(serializer)
+
+                    if not errors:
+                        saved += self._save_batch(batch)
+                    if progress:
+                        progress(total_rows, saved, error_rows)
+
+                if errors:
+                    raise ImportFailed()
+                if self.mode == self.BULK:
+                    self._log_import(saved)
+        except ImportFailed:
             return {
                 'success': 0,
                 'errors': errors,
                 'total': total_rows,
                 'status': 'failed'
             }
-        
-        try:
-            with transaction.atomic():
-                self._bulk_save(validated_data_list)
         except Exception as e:
              return {
                 'success': 0,
@@ -61,33 +141,110 @@ class ImportService:
             }
 
         return {
-            'success': len(validated_data_list),
+            'success': saved,
             'errors': [],
             'total': total_rows,
-            'status': 'success'
+            'status': 'success',
+            'mode': self.mode,
         }
 
+    def _save_batch(self, serializers):
+        if not serializers:
+            return 0
+        if self.mode == self.BULK:
+            return len(self.bulk_create([serializer.validated_data for serializer in serializers]))
+        return self._bulk_save(serializers)
+
+    def estimate_rows(self, file_obj):
+        """Cheap row count for progress reporting (newlines for CSV, sheet dimension for xlsx)."""
+        name = file_obj.name.lower()
+        try:
+            if name.endswith('.csv'):
+                count = last = 0
+                for chunk in file_obj.chunks():
+                    count += chunk.count(b'\n')
+                    last = chunk[-1:]
+                return max(count - (last == b'\n'), 0)
+            if name.endswith('.xlsx'):
+                import openpyxl
+                workbook = openpyxl.load_workbook(file_obj, read_only=True)
+                try:
+                    max_row = workbook.active.max_row
+                finally:
+                    workbook.close()
+                return max(max_row - 1, 0) if max_row else None
+            return None
+        finally:
+            file_obj.seek(0)
+
+    def _chunks(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _get_serializer(self, row, resolved=None):
+        serializer = self.serializer_class(data=row, context={'rules_checked': self.rules_validator.fields})
+        for name, instances in (resolved or {}).items():
+            # Related rows were fetched for the whole batch, no query per row
+            field = serializer.fields[name]
+            field.queryset = ResolvedQuerySet(field.queryset.model, instances)
+        if self.mode == self.BULK and self.unique_fields:
+            # Existing natural keys are updated by the upsert, not rejected as duplicates
+            for name in self.unique_fields:
+                field = serializer.fields.get(name)
+                if field is not None:
+                    field.validators = [v for v in field.validators if not isinstance(v, UniqueValidator)]
+            serializer.validators = [
+                v for v in serializer.get_validators()
+                if not (isinstance(v, UniqueTogetherValidator) and set(v.fields) <= set(self.unique_fields))
+            ]
+        return serializer
+
     def _parse_file(self, file_obj):
-        name = file_obj.name
+        """Lazy row iterator over the upload (bounded memory, nothing is read up front)."""
+        name = file_obj.name.lower()
         if name.endswith('.csv'):
             return self._parse_csv(file_obj)
-        elif name.endswith('.xlsx') or name.endswith('.xls'):
+        elif name.endswith('.xlsx'):
             return self._parse_excel(file_obj)
+        elif name.endswith('.xls'):
+            return self._parse_xls(file_obj)
         else:
             raise ValidationError("Unsupported file format. Please upload .csv or .xlsx")
 
     def _parse_csv(self, file_obj):
-        # Decode if necessary
-        file_data = file_obj.read().decode('utf-8-sig')
-        reader = csv.DictReader(file_data.splitlines())
-        return list(reader)
+        # File iteration reads the upload chunk by chunk and yields byte lines
+        lines = codecs.iterdecode(file_obj, 'utf-8-sig')
+        yield from csv.DictReader(lines)
 
     def _parse_excel(self, file_obj):
-        # Use pandas for robustness with Excel
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_obj, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(name).strip() if name is not None else '' for name in header]
+            for values in rows:
+                if all(value is None or value == '' for value in values):
+                    continue
+                yield {column: value for column, value in zip(columns, values) if column}
+        finally:
+            workbook.close()
+
+    def _parse_xls(self, file_obj):
+        # Legacy .xls is not supported by openpyxl, pandas (xlrd) reads it whole
+        import pandas as pd
         df = pd.read_excel(file_obj)
         # Convert NaN to None or empty string as appropriate for DRF
         df = df.where(pd.notnull(df), None)
-        return df.to_dict('records')
+        yield from df.to_dict('records')
 
     def _format_errors(self, errors, line_number):
         """
@@ -103,23 +260,71 @@ class ImportService:
                 })
         return error_list
 
-    def _bulk_save(self, validated_data_list):
-        # We start with simple save in loop to trigger signals/save methods (like creating user profile etc)
-        # Bulk_create doesn't trigger signals. User requested "full validation" and generic use.
-        # Ideally, we loop and save.
-        for data in validated_data_list:
-            # Check if we should update or create?
-            # For now, simplistic "create only" or "upsert"?
-            # Prompt says "Import settings... dynamically defined", but let's default to Create.
-            # If serializer defines .create(), it will work.
-            
-            # Use serializer.save() to leverage serializer's create/update logic
-            # Use a dummy instance if needed? No, passing data to serializer(data=...) creates unbounded.
-            # We already validated. Re-instantiate to save?
-            
-            # Re-instantiating serializer for saving is safer to ensure all context (like hashing password) is handled by serializer.create()
-            # If we just took validated_data and Model.objects.create(**data), we skip Serializer.create() custom logic (like set_password).
-            
-            serializer = self.serializer_class(data=data)
-            if serializer.is_valid():
-                serializer.save()
+    def _bulk_save(self, serializers):
+        # Per-row path: serializer.save() runs the serializer's create() (e.g. set_password),
+        # the model save() and the post_save signals. The serializers are already validated.
+        for serializer in serializers:
+            serializer.save()
+        return len(serializers)
+
+    def bulk_create(self, validated_data_list):
+        """Write validated rows with bulk_create in batches of batch_size, returns the saved instances."""
+        opts = self.model._meta
+        many_to_many = {field.name for field in opts.many_to_many}
+        user = get_current_user()
+        audited = issubclass(self.model, BaseModel) and user is not None and user.is_authenticated
+
+        if self.unique_fields:
+            # ON CONFLICT can't touch the same row twice in one statement: last row wins
+            by_key = {tuple(data.get(name) for name in self.unique_fields): data for data in validated_data_list}
+            validated_data_list = list(by_key.values())
+
+        upsert = {}
+        if self.unique_fields:
+            update_fields = self.update_fields
+            if not update_fields:
+                update_fields = {name for data in validated_data_list for name in data}
+                update_fields -= many_to_many | set(self.unique_fields) | {'created_by', 'created_at'}
+                if audited:
+                    update_fields.add('updated_by')
+                if any(field.name == 'updated_at' for field in opts.concrete_fields):
+                    update_fields.add('updated_at')
+            upsert = {'update_conflicts': True, 'unique_fields': self.unique_fields, 'update_fields': sorted(update_fields)}
+
+        saved = []
+        for start in range(0, len(validated_data_list), self.batch_size):
+            instances, relations = [], []
+            for data in validated_data_list[start:start + self.batch_size]:
+                data = dict(data)
+                relations.append({name: data.pop(name) for name in many_to_many if name in data})
+                instance = self.model(**data)
+                if audited:
+                    # BaseModel.save() is skipped by bulk_create
+                    instance.created_by = instance.updated_by = user
+                instances.append(instance)
+
+            instances = self.model.objects.bulk_create(instances, **upsert)
+            for instance, values in zip(instances, relations):
+                for name, value in values.items():
+                    getattr(instance, name).set(value)
+            bulk_saved.send(sender=self.model, instances=instances)
+            saved.extend(instances)
+        return saved
+
+    def _log_import(self, count):
+        """One ActivityLog entry for the whole import instead of one per row."""
+        from activity_logs.signals import IGNORE_MODELS, get_client_ip
+        if self.model.__name__ in IGNORE_MODELS or RuntimeState.disable_activity_logs or not count:
+            return
+        request = get_current_request()
+        user = get_current_user()
+        log_buffer.add(ActivityLog(
+            actor=user if user and user.is_authenticated else None,
+            action_flag=ActivityLog.UPDATE if self.unique_fields else ActivityLog.CREATE,
+            app_label=self.model._meta.app_label,
+            model_name=self.model._meta.model_name,
+            object_repr=f"Import: {count} {self.model._meta.verbose_name_plural}"[:255],
+            changes={'import': {'rows': count, 'mode': self.mode, 'unique_fields': self.unique_fields}},
+            ip_address=get_client_ip(request) if request else None,
+            user_agent=request.META.get('HTTP_USER_AGENT', '')[:255] if request else None
+        ))
@@ -1,10 +1,16 @@
 from django.db.models.signals import post_migrate
 from django.apps import apps
 from django.apps import apps as django_apps
-from django.dispatch import receiver
+from django.dispatch import receiver, Signal
 from .runtime import RuntimeState
 from .models import App, AppVersion, AppType
 from django.conf import settings
+
+# Sent after bulk_create / bulk_update / update() writes, which skip post_save
+# (ImportService batches, bulk endpoints of UnifiedModelViewSet)
+# sender=model, instances=list of saved objects
+bulk_saved = Signal()
+
 @receiver(post_migrate)
 def create_apps_after_migrate(sender, **kwargs):
     if not django_apps.is_installed('apps'):
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from .services.import_jobs import run_import_job
+
+
+@shared_task(name='apps.run_import_job')
+def run_import_job_task(job_id):
+    run_import_job(job_id)
@@ -0,0 +1,237 @@
+import tempfile
+from importlib.util import find_spec
+from io import BytesIO
+from unittest import skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from activity_logs.models import ActivityLog
+from clients.models import Structure
+from clients.serializers import StructureSerializer
+from crm.models import Contact, Customer
+from crm.serializers import ContactSerializer, CustomerSerializer
+from users.models import User
+from users.serializers import UserCreateSerializer
+from .models import ImportJob
+from .validation.parallel import RulesValidator
+from .services.import_service import ImportService
+
+
+def csv_file(*lines):
+    return SimpleUploadedFile("data.csv", "\n".join(lines).encode('utf-8'), content_type='text/csv')
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username="admin", is_superuser=True, is_staff=True)
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, file_obj, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/apps/import/', dict(
+                app_label='crm', model_name='Customer', file=file_obj, **extra
+            ), format='multipart')
+
+    def test_bulk_create_with_one_audit_entry(self):
+        response = self.upload(csv_file("name,code", "شركة الأولى,C1", "شركة الثانية,C2", "شركة الثالثة,C3"))
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['success'], response.data['mode']), (3, 'bulk'))
+
+        customers = Customer.objects.order_by('code')
+        self.assertEqual([c.name for c in customers], ["شركة الأولى", "شركة الثانية", "شركة الثالثة"])
+        self.assertEqual({c.created_by_id for c in customers}, {self.admin.pk})
+
+        log = ActivityLog.objects.get(model_name='customer')
+        self.assertEqual(log.changes['import']['rows'], 3)
+
+    def test_upsert_on_natural_key(self):
+        Customer.objects.create(name="قديم", code="C1")
+        response = self.upload(
+            csv_file("name,code", "محدث,C1", "جديد,C2", "محدث مرتين,C1"),
+            unique_fields='code',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            list(Customer.objects.order_by('code').values_list('code', 'name')),
+            [("C1", "محدث مرتين"), ("C2", "جديد")],
+        )
+
+    def test_batches_are_bounded(self):
+        lines = ["name,code"] + [f"عميل {i},K{i}" for i in range(25)]
+        service = ImportService(Customer, CustomerSerializer, batch_size=10)
+        with CaptureQueriesContext(connection) as queries:
+            result = service.handle_import(csv_file(*lines))
+        self.assertEqual(result['success'], 25)
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "crm_customer"')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_validation_errors_are_reported(self):
+        response = self.upload(csv_file("name,code", "ok name,C1", "ab,C2"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['line'], 3)
+        self.assertFalse(Customer.objects.exists())
+
+    def test_xlsx_upload(self):
+        import openpyxl
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["name", "code"])
+        sheet.append(["شركة الأولى", "C1"])
+        sheet.append([None, None])
+        sheet.append(["شركة الثانية", "C2"])
+        content = BytesIO()
+        workbook.save(content)
+        upload = SimpleUploadedFile("data.xlsx", content.getvalue())
+
+        response = self.upload(upload)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(list(Customer.objects.order_by('code').values_list('name', flat=True)),
+                         ["شركة الأولى", "شركة الثانية"])
+
+    def test_written_batches_are_rolled_back_on_error(self):
+        lines = ["name,code"] + [f"عميل {i},K{i}" for i in range(25)] + ["ab,K99"]
+        result = ImportService(Customer, CustomerSerializer, batch_size=10).handle_import(csv_file(*lines))
+        self.assertEqual((result['status'], result['total']), ('failed', 26))
+        self.assertEqual(result['errors'][0]['line'], 27)
+        self.assertFalse(Customer.objects.exists())
+
+    def test_row_mode_for_custom_create_and_save(self):
+        self.assertEqual(ImportService(User, UserCreateSerializer).mode, ImportService.ROW)
+        self.assertEqual(ImportService(Structure, StructureSerializer).mode, ImportService.ROW)
+        with self.assertRaises(ValueError):
+            ImportService(Structure, StructureSerializer, mode=ImportService.BULK)
+
+
+
+class ForeignKeyResolutionTests(TestCase):
+    def setUp(self):
+        self.acme = Customer.objects.create(name="أكمي")
+        self.globex = Customer.objects.create(name="جلوبكس")
+
+    def test_references_resolved_with_one_query(self):
+        lines = ["full_name,customer"] + [f"جهة اتصال {i},{'أكمي' if i % 2 else 'جلوبكس'}" for i in range(20)]
+        lines.append(f"بالمعرف,{self.acme.pk}")
+        with CaptureQueriesContext(connection) as queries:
+            result = ImportService(Contact, ContactSerializer).handle_import(csv_file(*lines))
+        self.assertEqual(result['success'], 21, result)
+        customer_queries = [q for q in queries.captured_queries if q['sql'].startswith('SELECT') and 'crm_customer' in q['sql']]
+        self.assertEqual(len(customer_queries), 1)
+        self.assertEqual(Contact.objects.filter(customer=self.acme).count(), 11)
+
+    def test_unknown_and_ambiguous_references_are_row_errors(self):
+        Customer.objects.create(name="أكمي")
+        result = ImportService(Contact, ContactSerializer).handle_import(
+            csv_file("full_name,customer", "جهة صحيحة,جلوبكس", "جهة مجهولة,غير موجود", "جهة مكررة,أكمي")
+        )
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual([(e['line'], e['field']) for e in result['errors']], [(3, 'customer'), (4, 'customer')])
+        self.assertFalse(Contact.objects.exists())
+
+
+class ParallelRulesTests(TestCase):
+    def rows(self):
+        return [{'name': "شركة صالحة", 'email': "a@b.com"}, {'name': "ab", 'email': "x"},
+                {'name': "  ", 'email': None}] * 4
+
+    def test_process_pool_matches_inline(self):
+        inline = RulesValidator(CustomerSerializer, workers=1).validate(self.rows())
+        validator = RulesValidator(CustomerSerializer, workers=2, min_rows=0)
+        try:
+            parallel = validator.validate(self.rows())
+        finally:
+            validator.close()
+        self.assertEqual(parallel, inline)
+        self.assertEqual(sorted(inline), [1, 2, 4, 5, 7, 8, 10, 11])
+        self.assertEqual(set(inline[1]), {'name', 'email'})
+
+    def test_errors_keep_line_numbers(self):
+        lines = ["name,email"] + [f"عميل رقم {i},c{i}@example.com" for i in range(6)] + ["ab,ok@example.com", "ab,bad"]
+        result = ImportService(Customer, CustomerSerializer, batch_size=3).handle_import(csv_file(*lines))
+        # Field errors (EmailField) win over RULES, like validate() running after the fields
+        self.assertEqual([(e['line'], e['field']) for e in result['errors']], [(8, 'name'), (9, 'email')])
+
+    def test_xlsx_numeric_cells_are_converted_like_the_serializer(self):
+        import openpyxl
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["name", "code"])
+        sheet.append([0, "C1"])
+        sheet.append([12345, "C2"])
+        content = BytesIO()
+        workbook.save(content)
+        upload = SimpleUploadedFile("data.xlsx", content.getvalue())
+
+        service = ImportService(Customer, CustomerSerializer)
+        rows = list(service._parse_excel(upload))
+        self.assertEqual(rows[0]['name'], 0)
+        serial = {}
+        for index, row in enumerate(rows):
+            serializer = CustomerSerializer(data=row)
+            if not serializer.is_valid():
+                serial[index] = {field: [str(m) for m in messages] for field, messages in serializer.errors.items()}
+
+        inline = RulesValidator(CustomerSerializer, workers=1).validate(rows)
+        validator = RulesValidator(CustomerSerializer, workers=2, min_rows=0)
+        try:
+            parallel = validator.validate(rows)
+        finally:
+            validator.close()
+        self.assertEqual(set(serial), {0})
+        self.assertEqual(inline, serial)
+        self.assertEqual(parallel, serial)
+
+@override_settings(IMPORT_JOB_EXECUTOR='apps.services.import_jobs.InlineImportExecutor', MEDIA_ROOT=tempfile.mkdtemp())
+class ImportJobTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username="importer", is_superuser=True)
+        self.client.force_authenticate(self.user)
+
+    def start(self, *lines, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/apps/import/jobs/', dict(
+                app_label='crm', model_name='Customer', file=csv_file(*lines), batch_size=2, **extra
+            ), format='multipart')
+        self.assertEqual(response.status_code, 202, response.data)
+        return self.client.get(f"/apps/import/jobs/{response.data['id']}/").data
+
+    def test_job_imports_in_background(self):
+        job = self.start("name,code", "شركة الأولى,C1", "شركة الثانية,C2", "شركة الثالثة,C3")
+        self.assertEqual(
+            (job['status'], job['total_rows'], job['processed_rows'], job['success_rows'], job['progress']),
+            ('done', 3, 3, 3, 100),
+        )
+        self.assertEqual(Customer.objects.get(code="C2").created_by_id, self.user.pk)
+
+    def test_failed_job_keeps_row_errors(self):
+        job = self.start("name,code", "ab,C1", "شركة صالحة,C2", "cd,C3")
+        self.assertEqual((job['status'], job['error_rows'], job['success_rows']), ('failed', 2, 0))
+        self.assertEqual([error['line'] for error in job['errors']], [2, 4])
+        self.assertFalse(Customer.objects.exists())
+
+    def test_other_users_cannot_see_the_job(self):
+        job = self.start("name,code", "شركة الأولى,C1")
+        self.client.force_authenticate(User.objects.create(username="other"))
+        self.assertEqual(self.client.get(f"/apps/import/jobs/{job['id']}/").status_code, 404)
+
+    @skipUnless(find_spec('channels'), "channels is not installed")
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_progress_is_pushed_to_the_job_group(self):
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+        from .services.import_jobs import publish_progress
+
+        layer = get_channel_layer()
+        job = ImportJob.objects.create(app_label='crm', model_name='Customer', processed_rows=5)
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(job.group_name, channel)
+
+        publish_progress(job)
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual((message['type'], message['job']['processed_rows']), ('import.progress', 5))
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import AppViewSet, AppTypeViewSet, AppVersionViewSet
-from .import_view import DataImportView
+from .import_view import DataImportView, ImportJobListCreateView, ImportJobDetailView
 
 router = DefaultRouter()
 router.register(r'apps', AppViewSet,     basename='app')
@@ -10,5 +10,7 @@ router.register(r'versions', AppVersionViewSet, basename='app_version')
 
 urlpatterns = [
     path('import/', DataImportView.as_view(), name='data-import'),
+    path('import/jobs/', ImportJobListCreateView.as_view(), name='import-jobs'),
+    path('import/jobs/<int:pk>/', ImportJobDetailView.as_view(), name='import-job-detail'),
     path('', include(router.urls)),
 ]
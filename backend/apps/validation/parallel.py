@@ -0,0 +1,134 @@
+"""
+Parallel RULES validation for large imports.
+
+RULES validators (required, min_len, phone, email, ...) only look at the value, so the
+rows of a batch can be checked column by column (BaseRulesSerializer.validate_many) in
+worker processes. The cells are converted by the serializer fields first (an xlsx number
+reaches a CharField's RULES as text, like in validate()). The serializer then skips those
+fields (context['rules_checked']) and only runs the field conversion, relations and DB
+validators.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.utils import translation
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField, empty
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+from apps.baseserializer import BaseRulesSerializer
+
+
+def convert_rows(serializer_class, rows, fields):
+    """
+    The values validate() gets for raw rows: Field.run_validation without the field
+    validators (no DB queries, their errors are reported by the serializer anyway).
+    """
+    converters = {}
+    for name, field in serializer_class().fields.items():
+        if name in fields:
+            field.validators = []
+            converters[name] = field.run_validation
+    converted = []
+    for row in rows:
+        values = {}
+        for name, convert in converters.items():
+            try:
+                values[name] = convert(row.get(name, empty))
+            except SkipField:
+                values[name] = None
+            except ValidationError:
+                # Field error: the row is rejected by the serializer before validate()
+                pass
+        converted.append(values)
+    return converted
+
+
+def check_rows(serializer_class, rows, fields, language=None):
+    """Worker: {row offset: {field: [message, ...]}} for consecutive rows."""
+    with translation.override(language):
+        values = convert_rows(serializer_class, rows, fields)
+        errors = serializer_class.validate_many(values, fields)
+        # Plain strings travel back to the parent process
+        return {
+            offset: {field: [str(message) for message in messages] for field, messages in row_errors.items()}
+            for offset, row_errors in errors.items()
+        }
+
+
+class RulesValidator:
+    """
+    Checks the RULES of a serializer on raw import rows.
+    Once an import has gone past IMPORT_PARALLEL_MIN_ROWS rows, each batch is split over
+    IMPORT_VALIDATION_WORKERS processes (default: CPU count). Small files stay inline and
+    never pay for starting the pool.
+    """
+
+    def __init__(self, serializer_class, workers=None, min_rows=None):
+        self.serializer_class = serializer_class
+        self.rules = self.checkable_rules(serializer_class)
+        self.workers = workers or getattr(settings, 'IMPORT_VALIDATION_WORKERS', None) or os.cpu_count() or 1
+        self.min_rows = min_rows if min_rows is not None else getattr(settings, 'IMPORT_PARALLEL_MIN_ROWS', 5000)
+        self.seen_rows = 0
+        self._pool = None
+
+    @staticmethod
+    def checkable_rules(serializer_class):
+        """RULES of writable, non relational fields: convert_rows gives them what validate() sees."""
+        if not issubclass(serializer_class, BaseRulesSerializer) or not serializer_class.RULES:
+            return {}
+        fields = serializer_class().fields
+        rules = {}
+        for name, field_rules in serializer_class.RULES.items():
+            field = fields.get(name)
+            if field is None or field.read_only or field.source != name:
+                continue
+            if isinstance(field, (RelatedField, ManyRelatedField)):
+                continue
+            rules[name] = field_rules
+        return rules
+
+    @property
+    def fields(self):
+        return frozenset(self.rules)
+
+    def validate(self, rows):
+        """{row index: {field: [message, ...]}} for the rows of a batch."""
+        if not self.rules or not rows:
+            return {}
+        fields = self.fields
+        # Only the checked columns travel to the workers, missing ones stay missing
+        values = [{field: row[field] for field in fields if field in row} for row in rows]
+        language = translation.get_language()
+        self.seen_rows += len(rows)
+        if self.workers < 2 or self.seen_rows <= self.min_rows:
+            return check_rows(self.serializer_class, values, fields, language)
+
+        size = -(-len(rows) // self.workers)
+        starts = range(0, len(rows), size)
+        futures = [
+            self.pool.submit(check_rows, self.serializer_class, values[start:start + size], fields, language)
+            for start in starts
+        ]
+        errors = {}
+        for start, future in zip(starts, futures):
+            for offset, row_errors in future.result().items():
+                errors[start + offset] = row_errors
+        return errors
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            # spawn, not fork: a forked child must not share the parent's DB connections
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -1,11 +1,15 @@
 import re
 from rest_framework.exceptions import ValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.validators import EmailValidator
 from . import messages
 
 # Regex Patterns
 PHONE_RE = re.compile(r"^\+?\d{7,15}$")
 ALPHANUMERIC_RE = re.compile(r'^[a-zA-Z0-9]*$')
+# Arabic Unicode range: \u0600-\u06FF
+ARABIC_RE = re.compile(r'^[\u0600-\u06FF\s]+$')
+EMAIL_VALIDATOR = EmailValidator()
 
 def required(value, msg=messages.REQUIRED):
     """
@@ -45,10 +49,10 @@ def email(value, msg=messages.INVALID_EMAIL):
     """
     if not value:
         return
-    validator = EmailValidator(message=msg)
     try:
-        validator(value)
-    except ValidationError:
+        EMAIL_VALIDATOR(value)
+    except DjangoValidationError:
+        # EmailValidator raises Django's ValidationError, report it on the field
         raise ValidationError(msg)
 
 def numeric(value, msg=messages.NUMERIC_ONLY):
@@ -107,7 +111,5 @@ def arabic_only(value, msg=messages.ARABIC_ONLY):
     """
     if not value:
         return
-    # Arabic Unicode range: \u0600-\u06FF
-    arabic_re = re.compile(r'^[\u0600-\u06FF\s]+$')
-    if not arabic_re.match(str(value)):
+    if not ARABIC_RE.match(str(value)):
         raise ValidationError(msg)
@@ -2,18 +2,19 @@ from argparse import Action
 from django.shortcuts import render
 from rest_framework import viewsets, permissions
 from rest_framework.authentication import SessionAuthentication
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.authentication import VersionedJWTAuthentication
 from .serializers import *
 from .models import *
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from api.base import UnifiedModelViewSet
 from api.codes import *
+from users.permission_index import get_permission_index
 class AppTypeViewSet(UnifiedModelViewSet):
     queryset = AppType.objects.all()
     serializer_class = AppTypeSerializer
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     created_code = APP_TYPE_CREATED
     updated_code = APP_TYPE_UPDATED
     deleted_code = APP_TYPE_DELETED
@@ -23,7 +24,7 @@ class AppViewSet(UnifiedModelViewSet):
     # queryset = App.objects.all()
     serializer_class = AppSerializer
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     created_code = APP_CREATED
     updated_code = APP_UPDATED
     deleted_code = APP_DELETED
@@ -37,19 +38,9 @@ class AppViewSet(UnifiedModelViewSet):
         if user.is_superuser:
             return App.objects.all()
             
-        # Get all permissions for the user
-        # Returns set of strings: "app_label.codename"
-        user_perms = user.get_all_permissions()
-        
-        # Extract unique app_labels
-        allowed_apps = set()
-        for perm in user_perms:
-            try:
-                app_label = perm.split('.')[0]
-                allowed_apps.add(app_label)
-            except IndexError:
-                continue
-                
+        # Apps the user holds at least one permission in (cached index, no SQL)
+        allowed_apps = get_permission_index(user).app_labels
+
         return App.objects.filter(app_label__in=allowed_apps)
 
    
@@ -59,7 +50,7 @@ class AppVersionViewSet(UnifiedModelViewSet):
     queryset = AppVersion.objects.all().order_by('-release_date')
     serializer_class = AppVersionSerializer
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     created_code = APP_VERSION_CREATED
     updated_code = APP_VERSION_UPDATED
     deleted_code = APP_VERSION_DELETED
@@ -0,0 +1,16 @@
+# clients/management/commands/rebuild_structure_tree.py
+
+from django.core.management.base import BaseCommand
+
+from clients.models import StructureClosure
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء فهرس شجرة الهياكل الإدارية (StructureClosure) من البيانات الحالية"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = StructureClosure.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ تم إعادة بناء الفهرس: {count} سجل."))
@@ -1,4 +1,5 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 
 from django.utils.translation import gettext_lazy as _
 # Create your models here.
@@ -64,3 +65,117 @@ class Structure(BaseModel):
 
     def __str__(self):
         return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Parent as loaded, save() only touches the tree index when it changes
+        instance._loaded_parent_id = instance.__dict__.get('structure_id', _UNKNOWN)
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        moved = not adding and (update_fields is None or 'structure' in update_fields) and (
+            self.structure_id != getattr(self, '_loaded_parent_id', _UNKNOWN)
+        )
+        # Last resort, the API rejects the move earlier (StructureSerializer.validate_structure)
+        if moved and self.structure_id and self.is_ancestor_of(self.structure_id):
+            raise ValidationError(CYCLE_ERROR)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                StructureClosure.insert_node(self)
+            elif moved:
+                StructureClosure.move_subtree(self)
+        self._loaded_parent_id = self.structure_id
+
+    def is_ancestor_of(self, structure_id):
+        """True when structure_id is this structure or one of its descendants."""
+        return StructureClosure.objects.filter(ancestor_id=self.pk, descendant_id=structure_id).exists()
+
+    def get_descendants(self, include_self=False):
+        """كل الفروع (بكل المستويات) باستعلام واحد"""
+        links = {'ancestor_links__ancestor_id': self.pk}
+        if not include_self:
+            links['ancestor_links__depth__gt'] = 0
+        return Structure.objects.filter(**links).order_by('ancestor_links__depth', 'pk')
+
+    def get_ancestors(self, include_self=False):
+        """المسار من الجذر حتى هذا الهيكل باستعلام واحد"""
+        links = {'descendant_links__descendant_id': self.pk}
+        if not include_self:
+            links['descendant_links__depth__gt'] = 0
+        return Structure.objects.filter(**links).order_by('-descendant_links__depth')
+
+    def get_descendant_count(self):
+        return StructureClosure.objects.filter(ancestor_id=self.pk, depth__gt=0).count()
+
+
+_UNKNOWN = object()
+CYCLE_ERROR = _("لا يمكن نقل الهيكل تحت نفسه أو تحت أحد فروعه (حلقة دائرية).")
+
+
+class StructureClosure(models.Model):
+    """
+    Closure table of the Structure tree: one row per (ancestor, descendant) pair,
+    including the node itself with depth 0.
+
+    Maintained by Structure.save() (create / re-parent), rows are removed with the
+    structure (CASCADE). Bulk changes that bypass save() (queryset.update, loaddata)
+    need `manage.py rebuild_structure_tree`.
+    """
+    ancestor = models.ForeignKey(Structure, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Structure, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        indexes = [models.Index(fields=['descendant', 'depth'], name='structure_closure_desc_idx')]
+
+    @classmethod
+    def insert_node(cls, node):
+        rows = [cls(ancestor_id=node.pk, descendant_id=node.pk, depth=0)]
+        if node.structure_id:
+            ancestors = cls.objects.filter(descendant_id=node.structure_id).values_list('ancestor_id', 'depth')
+            rows.extend(
+                cls(ancestor_id=ancestor_id, descendant_id=node.pk, depth=depth + 1)
+                for ancestor_id, depth in ancestors
+            )
+        cls.objects.bulk_create(rows, ignore_conflicts=True)
+
+    @classmethod
+    def move_subtree(cls, node):
+        subtree = list(cls.objects.filter(ancestor_id=node.pk).values_list('descendant_id', 'depth'))
+        if not subtree:
+            # Node missing from the index (created before it / bulk insert)
+            cls.objects.create(ancestor_id=node.pk, descendant_id=node.pk, depth=0)
+            subtree = [(node.pk, 0)]
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+
+        # Detach the subtree from its old ancestors, internal links stay as they are
+        cls.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+        if node.structure_id:
+            ancestors = list(cls.objects.filter(descendant_id=node.structure_id).values_list('ancestor_id', 'depth'))
+            cls.objects.bulk_create([
+                cls(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + depth + 1)
+                for ancestor_id, ancestor_depth in ancestors
+                for descendant_id, depth in subtree
+            ])
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """Recompute the whole table from Structure.structure, returns the number of rows."""
+        parents = dict(Structure.objects.values_list('id', 'structure_id'))
+        rows = []
+        for node_id in parents:
+            ancestor_id, depth, seen = node_id, 0, set()
+            while ancestor_id is not None and ancestor_id not in seen:
+                seen.add(ancestor_id)
+                rows.append(cls(ancestor_id=ancestor_id, descendant_id=node_id, depth=depth))
+                ancestor_id, depth = parents.get(ancestor_id), depth + 1
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(rows, batch_size=batch_size)
+        return len(rows)
@@ -1,5 +1,5 @@
 from apps.validation.validators import min_len, required, no_start_with_number
-from .models import Beneficiary,Level, Structure
+from .models import Beneficiary,Level, Structure, CYCLE_ERROR
 from rest_framework import serializers
 from apps.baseserializer import BaseRulesSerializer
 
@@ -26,6 +26,12 @@ class BeneficiarySerializer(BaseRulesSerializer):
             return request.build_absolute_uri(obj.image.url)
         return None 
 
+    def validate_structure(self, parent):
+        # لا يمكن نقل الهيكل تحت نفسه أو تحت أحد فروعه
+        if parent is not None and self.instance is not None and self.instance.is_ancestor_of(parent.pk):
+            raise serializers.ValidationError(CYCLE_ERROR)
+        return parent
+
     def update(self, instance, validated_data):
         # إذا لم يتم إرسال ملف جديد
         if 'image' not in validated_data or validated_data.get('image') is None:
@@ -68,6 +74,12 @@ class StructureSerializer(BaseRulesSerializer):
             return request.build_absolute_uri(obj.image.url)
         return None
 
+    def validate_structure(self, parent):
+        # لا يمكن نقل الهيكل تحت نفسه أو تحت أحد فروعه
+        if parent is not None and self.instance is not None and self.instance.is_ancestor_of(parent.pk):
+            raise serializers.ValidationError(CYCLE_ERROR)
+        return parent
+
     def update(self, instance, validated_data):
         # إذا لم يتم إرسال ملف جديد
         if 'image' not in validated_data or validated_data.get('image') is None:
@@ -78,6 +90,8 @@ class StructureSerializer(BaseRulesSerializer):
     class Meta:
         model = Structure
         fields = '__all__'
+        # Import files may name the parent structure / level instead of their ids
+        import_lookups = {'structure': 'name', 'level': 'name'}
     
     def get_sub_structures(self, obj):
         return StructureSerializer(obj.sub_structures.all(), many=True).data
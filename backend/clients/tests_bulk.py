@@ -0,0 +1,87 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from activity_logs.models import ActivityLog
+from crm.models import Customer
+from users.models import User
+from .models import Level, Structure
+
+
+class BulkEndpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username="admin", is_superuser=True, is_staff=True)
+        self.client.force_authenticate(self.admin)
+
+    def test_bulk_create_in_one_insert(self):
+        payload = [{'name': f"مستوى رقم {i}"} for i in range(5)]
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/clients/levels/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        results = response.data['data']['results']
+        self.assertEqual([r['status'] for r in results], ['created'] * 5)
+        self.assertEqual([r['data']['name'] for r in results], [item['name'] for item in payload])
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "clients_level"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual({level.created_by_id for level in Level.objects.all()}, {self.admin.pk})
+        self.assertEqual(ActivityLog.objects.filter(model_name='level', action_flag=ActivityLog.CREATE).count(), 5)
+
+    def test_invalid_item_saves_nothing(self):
+        response = self.client.post('/crm/customers/bulk/', [
+            {'name': "شركة الأولى", 'code': "C1"},
+            {'name': "ab"},
+            {'name': "شركة الثالثة", 'code': "C1"},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        results = response.data['data']['results']
+        self.assertEqual([r['status'] for r in results], ['valid', 'invalid', 'invalid'])
+        self.assertEqual(set(results[2]['errors']), {'code'})
+        self.assertFalse(Customer.objects.exists())
+
+    def test_reorder_structures_with_one_update(self):
+        root = Structure.objects.create(name="الجذر")
+        children = [Structure.objects.create(name=f"فرع {i}", structure=root, order=i) for i in range(4)]
+        # RULES check `name` on partial updates too
+        payload = [{'id': child.pk, 'name': child.name, 'order': 10 - i} for i, child in enumerate(children)]
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/clients/structures/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "clients_structure"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            list(Structure.objects.filter(structure=root).order_by('order').values_list('pk', flat=True)),
+            [child.pk for child in reversed(children)],
+        )
+        log = ActivityLog.objects.get(model_name='structure', action_flag=ActivityLog.UPDATE, object_id=str(children[0].pk))
+        self.assertEqual(log.changes['order']['new'], '10')
+
+    def test_unknown_id_fails_the_update(self):
+        level = Level.objects.create(name="مستوى أول")
+        response = self.client.patch('/clients/levels/bulk/', [
+            {'id': level.pk, 'name': "اسم جديد"}, {'id': 99999, 'name': "غير موجود"},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['data']['results'][1]['errors']), {'id'})
+        self.assertEqual(Level.objects.get(pk=level.pk).name, "مستوى أول")
+
+    def test_bulk_delete_freezes_protected_rows(self):
+        used = Level.objects.create(name="مستوى مستخدم")
+        unused = [Level.objects.create(name=f"مستوى حر {i}") for i in range(3)]
+        Structure.objects.create(name="هيكل", level=used)
+
+        ids = [used.pk] + [level.pk for level in unused]
+        response = self.client.delete('/clients/levels/bulk/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([r['status'] for r in response.data['data']['results']],
+                         ['frozen', 'deleted', 'deleted', 'deleted'])
+        self.assertEqual(list(Level.objects.values_list('pk', 'is_active')), [(used.pk, False)])
+
+    def test_bulk_delete_respects_visibility(self):
+        other = Customer.objects.create(name="عميل آخر")
+        self.client.force_authenticate(User.objects.create(username="viewer", data_visibility='self'))
+        response = self.client.delete('/crm/customers/bulk/', [other.pk], format='json')
+        self.assertIn(response.status_code, (400, 403))
+        self.assertTrue(Customer.objects.filter(pk=other.pk).exists())
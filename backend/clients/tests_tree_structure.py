@@ -1,12 +1,21 @@
+from io import StringIO
+
+from django.contrib.auth.models import Permission
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Structure, Level
+from users.models import User
+from .models import Structure, StructureClosure, Level
 
 class StructureTreeTests(TestCase):
     def setUp(self):
         self.client = APIClient()
+        user = User.objects.create(username="employee", data_visibility='all')
+        user.user_permissions.add(Permission.objects.get(codename='view_structure'))
+        self.client.force_authenticate(user)
         # Create levels
         self.level1 = Level.objects.create(name="Level 1")
         self.level2 = Level.objects.create(name="Level 2")
@@ -76,3 +85,60 @@ class StructureTreeTests(TestCase):
         self.assertIn("Root", names)
         self.assertIn("Child 1", names)
         self.assertIn("Grandchild", names)
+
+
+class StructureMoveApiTests(TestCase):
+    def setUp(self):
+        self.root = Structure.objects.create(name="Root")
+        self.child = Structure.objects.create(name="Child", structure=self.root)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_superuser=True, data_visibility='all'))
+
+    def test_move_under_own_child_is_400(self):
+        # RULES require the name on partial updates too
+        response = self.client.patch(
+            f'/clients/structures/{self.root.pk}/', {'name': "Root", 'structure': self.child.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('structure', response.data['data'])
+        self.root.refresh_from_db()
+        self.assertIsNone(self.root.structure_id)
+
+
+class StructureClosureTests(TestCase):
+    def setUp(self):
+        self.level = Level.objects.create(name="Level 1")
+        self.root = Structure.objects.create(name="Root", level=self.level)
+        self.child1 = Structure.objects.create(name="Child 1", structure=self.root, level=self.level)
+        self.child2 = Structure.objects.create(name="Child 2", structure=self.root, level=self.level)
+        self.grandchild = Structure.objects.create(name="Grandchild", structure=self.child1, level=self.level)
+
+    def names(self, queryset):
+        return [structure.name for structure in queryset]
+
+    def test_descendants_and_ancestors(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(self.root.get_descendants()), ["Child 1", "Child 2", "Grandchild"])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(self.grandchild.get_ancestors(include_self=True)), ["Root", "Child 1", "Grandchild"])
+        self.assertEqual(self.root.get_descendant_count(), 3)
+
+    def test_move_subtree(self):
+        self.child1.structure = self.child2
+        self.child1.save()
+        self.assertEqual(self.names(self.grandchild.get_ancestors()), ["Root", "Child 2", "Child 1"])
+        self.assertEqual(self.names(self.child2.get_descendants()), ["Child 1", "Grandchild"])
+
+    def test_move_under_own_descendant_is_rejected(self):
+        self.child1.structure = self.grandchild
+        with self.assertRaises(ValidationError):
+            self.child1.save()
+
+    def test_delete_and_rebuild(self):
+        self.grandchild.delete()
+        self.assertEqual(self.child1.get_descendant_count(), 0)
+        # Bulk update bypasses save(), the command brings the index back in sync
+        Structure.objects.filter(pk=self.child2.pk).update(structure=self.child1)
+        call_command('rebuild_structure_tree', stdout=StringIO())
+        self.assertEqual(self.names(self.child2.get_ancestors()), ["Root", "Child 1"])
+        self.assertEqual(StructureClosure.objects.count(), 6)
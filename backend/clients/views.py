@@ -4,7 +4,7 @@ from django.shortcuts import render
 from django.test import Client
 from django_filters.rest_framework import filters
 from django_filters.rest_framework.backends import DjangoFilterBackend
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.authentication import VersionedJWTAuthentication
 
 from .serializers import *
 from .models import *
@@ -27,17 +27,12 @@ def freeze(self, request, pk=None):
         return standard_response(BENEFICIARY_FROZEN)
     
 def get_all_parent_structure(node):
-    parent=[node]
-    while node.structure is not None:
-        node=node.structure
-        parent.append(node)
-    return reversed(parent)  
+    # Root -> node, one query on the closure table
+    return node.get_ancestors(include_self=True).select_related('structure', 'level')
 
 def get_all_children_structure(node):
-    children=list(node.children.all())
-    for child in node.children.all():
-        children.extend(get_all_children_structure(child))
-    return children 
+    # All descendants, one query on the closure table
+    return list(node.get_descendants().select_related('structure', 'level'))
 
 
 class BeneficiaryViewSet(BaseViewSet):
@@ -48,7 +43,7 @@ class BeneficiaryViewSet(BaseViewSet):
     updated_code = BENEFICIARY_UPDATED
     deleted_code = BENEFICIARY_DELETED
     frozen_code = BENEFICIARY_FROZEN
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['public_name', 'pravite_name', 'order']
     search_fields = ['public_name']
@@ -72,7 +67,7 @@ class LevelViewSet(BaseViewSet):
     updated_code = LEVEL_UPDATED
     deleted_code = LEVEL_DELETED
     frozen_code = LEVEL_FROZEN
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['name']
     search_fields = ['name']
@@ -88,12 +83,14 @@ class StructureViewSet(BaseViewSet):
     updated_code = STRUCTURE_UPDATED
     deleted_code = STRUCTURE_DELETED
     frozen_code = STRUCTURE_FROZEN
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['name', 'order']
     search_fields = ['name']
     ordering_fields = ['order']
     ordering = ['order']
+    # save() only touches the closure table when the parent changes
+    bulk_update_fields = ('name', 'order', 'is_active')
     
   
     def structure(self,request,pk=None):
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CodingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'codings'
+
+    def ready(self):
+        import codings.signals
@@ -17,6 +17,8 @@ class CodingSerializer(BaseRulesSerializer):
     class Meta:
         model = Coding
         fields = '__all__'
+        # Import files may reference the category and parent by name instead of id
+        import_lookups = {'codingCategory': 'specific_name', 'parent': 'name'}
         
     def get_has_children(self, obj):
         return obj.children.exists()
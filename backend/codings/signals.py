@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.signals import bulk_saved
+from .models import Coding
+from .tree import invalidate_coding_trees
+
+
+@receiver(post_save, sender=Coding)
+@receiver(post_delete, sender=Coding)
+def invalidate_trees_on_coding_change(sender, instance, **kwargs):
+    """أي تعديل على الرموز يغير نسخة بيانات الشجرة"""
+    invalidate_coding_trees()
+
+
+@receiver(bulk_saved, sender=Coding)
+def invalidate_trees_on_coding_bulk_save(sender, **kwargs):
+    invalidate_coding_trees()
@@ -1,3 +1,57 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from users.models import User
+from .models import CodingCategory, Coding
+from .serializers import CodingTreeSerializer
+
+
+class CodingTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create(username="admin", is_superuser=True, is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.countries = CodingCategory.objects.create(general_name="Countries", specific_name="countries", type='tree')
+        self.cities = CodingCategory.objects.create(general_name="Cities", specific_name="cities", type='tree')
+
+        self.yemen = self.add("Yemen", self.countries, order=1)
+        self.saudi = self.add("Saudi", self.countries, order=2)
+        self.region = self.add("Region", self.countries, parent=self.yemen)
+        self.add("District", self.countries, parent=self.region)
+        # Cross-category child: a root of the cities tree
+        self.sanaa = self.add("Sanaa", self.cities, parent=self.yemen)
+        self.add("Old city", self.cities, parent=self.sanaa)
+
+    def add(self, name, category, parent=None, order=0):
+        return Coding.objects.create(name=name, codingCategory=category, category=category.specific_name,
+                                     parent=parent, order=order)
+
+    def get_tree(self, category):
+        response = self.client.get('/codings/codings/tree/', {'codingCategory': category.pk})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_same_payload_as_recursive_serializer(self):
+        expected = CodingTreeSerializer(Coding.objects.filter(pk=self.saudi.pk), many=True).data
+        tree = self.get_tree(self.countries)
+        self.assertEqual([node['title'] for node in tree], ["Yemen", "Saudi"])
+        self.assertEqual(tree[1:], expected)
+        yemen = tree[0]
+        self.assertEqual(yemen['children'][0]['title'], "Region")
+        self.assertEqual(yemen['children'][0]['children'][0]['title'], "District")
+
+    def test_cross_category_child_is_a_root(self):
+        tree = self.get_tree(self.cities)
+        self.assertEqual([node['title'] for node in tree], ["Sanaa"])
+        self.assertEqual(tree[0]['children'][0]['title'], "Old city")
+
+    def test_cached_until_data_changes(self):
+        self.get_tree(self.countries)
+        # django-filter category lookup + root ids, the subtrees come from the cache
+        with self.assertNumQueries(2):
+            self.get_tree(self.countries)
+        self.add("Aden", self.countries, parent=self.yemen, order=5)
+        titles = [node['title'] for node in self.get_tree(self.countries)[0]['children']]
+        self.assertEqual(titles, ["Region", "Aden"])
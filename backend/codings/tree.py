@@ -0,0 +1,92 @@
+from django.core.cache import cache
+
+from api.cache import LocalLRU, get_generation, bump_generation
+from .models import Coding
+
+CACHE_NAMESPACE = 'coding_tree'
+CACHE_TIMEOUT = 60 * 60
+
+_local_forests = LocalLRU(maxsize=256)
+
+TREE_FIELDS = ('id', 'name', 'code', 'is_active', 'order', 'parent_id')
+
+
+def _node(row):
+    # Same keys/order as CodingTreeSerializer
+    return {
+        'key': str(row['id']),
+        'title': row['name'],
+        'id': row['id'],
+        'name': row['name'],
+        'code': row['code'],
+        'children': [],
+        'is_active': row['is_active'],
+        'order': row['order'],
+        'parent': row['parent_id'],
+    }
+
+
+def build_category_forest(category_id):
+    """
+    All trees of one category from a single values() query, assembled in O(N).
+    Returns {root_id: nested node} for every root of the category, a root being a
+    coding without parent or whose parent belongs to another category (see `roots`).
+    """
+    rows = Coding.objects.filter(codingCategory_id=category_id).order_by('order', 'name').values(*TREE_FIELDS)
+    nodes = {row['id']: _node(row) for row in rows}
+    forest = {}
+    for node in nodes.values():
+        parent = nodes.get(node['parent'])
+        if parent is None:
+            forest[node['id']] = node
+        else:
+            parent['children'].append(node)
+    return forest
+
+
+def _cache_key(category_id, generation):
+    return f'{CACHE_NAMESPACE}:{generation}:{category_id}'
+
+
+def get_category_forests(category_ids):
+    """
+    {category_id: forest} for the current data version.
+    Lookup order: per-process LRU -> Redis -> database. The forests are shared, read only.
+    """
+    generation = get_generation(CACHE_NAMESPACE)
+    keys = {_cache_key(category_id, generation): category_id for category_id in set(category_ids)}
+    forests = {}
+    for key, category_id in keys.items():
+        forest = _local_forests.get(key)
+        if forest is not None:
+            forests[category_id] = forest
+
+    remote = [key for key, category_id in keys.items() if category_id not in forests]
+    missing = {}
+    if remote:
+        cached = cache.get_many(remote)
+        for key in remote:
+            forest = cached.get(key)
+            if forest is None:
+                forest = missing[key] = build_category_forest(keys[key])
+            forests[keys[key]] = forest
+            _local_forests.set(key, forest)
+    if missing:
+        cache.set_many(missing, CACHE_TIMEOUT)
+    return forests
+
+
+def build_tree(roots):
+    """
+    Nested key/title/children payload for `roots` (pairs of (id, category_id) in the
+    requested order). Children are always the full subtree, like the recursive serializer.
+    """
+    roots = list(roots)
+    forests = get_category_forests(category_id for _, category_id in roots)
+    return [forests[category_id][root_id] for root_id, category_id in roots
+            if root_id in forests[category_id]]
+
+
+def invalidate_coding_trees():
+    bump_generation(CACHE_NAMESPACE)
+    _local_forests.clear()
@@ -5,6 +5,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import CodingCategory, Coding
 from .serializers import CodingCategorySerializer, CodingSerializer, CodingTreeSerializer
+from .tree import build_tree
 from django.db.models import Q, F
 from api.codes import *
 
@@ -19,6 +20,8 @@ class CodingCategoryViewSet(BaseViewSet):
     updated_code = CODING_CATEGORY_UPDATED
     deleted_code = CODING_CATEGORY_DELETED
     frozen_code = CODING_CATEGORY_FROZEN
+    # destroy() refuses protected categories instead of freezing them
+    freeze_protected = False
     
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -48,6 +51,9 @@ class CodingViewSet(BaseViewSet):
     updated_code = CODING_UPDATED
     deleted_code = CODING_DELETED
     frozen_code = CODING_FROZEN
+    # save() only re-checks the parent chain
+    bulk_update_fields = ('name', 'code', 'order', 'is_active')
+    query_budget = {'list': 10, 'retrieve': 10, 'roots': 10, 'tree': 10, 'children': 10}
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -78,8 +84,9 @@ class CodingViewSet(BaseViewSet):
         qs = self.filter_queryset(self.get_queryset())
         # Show if parent is null OR parent is in a different category
         qs = qs.filter(Q(parent__isnull=True) | ~Q(parent__codingCategory=F('codingCategory')))
-        serializer = CodingTreeSerializer(qs, many=True)
-        return Response(serializer.data)
+        # Subtrees are assembled in memory from the cached per-category forests (see tree.py)
+        roots = qs.select_related(None).prefetch_related(None).values_list('id', 'codingCategory_id')
+        return Response(build_tree(roots))
 
     @action(detail=True, methods=['get'])
     def children(self, request, pk=None):
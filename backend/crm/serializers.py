@@ -26,6 +26,8 @@ class ContactSerializer(BaseRulesSerializer):
         model = Contact
         fields = "__all__"
         read_only_fields = ("created_at", "updated_at")
+        # Import files may name the customer instead of its id
+        import_lookups = {"customer": "name"}
 
 
 class LeadSerializer(BaseRulesSerializer):
@@ -54,6 +56,7 @@ class OpportunitySerializer(BaseRulesSerializer):
         model = Opportunity
         fields = "__all__"
         read_only_fields = ("created_at", "updated_at")
+        import_lookups = {"customer": "name"}
 
 
 
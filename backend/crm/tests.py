@@ -1,3 +1,82 @@
+import base64
+import json
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from .models import Customer, Lead, Opportunity
+
+
+class CustomerKeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username="admin", is_superuser=True, is_staff=True)
+        self.client.force_authenticate(self.admin)
+        # Duplicate names force the (name, id) tie breaker
+        for index in range(7):
+            Customer.objects.create(name=f"Customer {index % 3}", code=f"C{index}")
+
+    def collect_pages(self, params):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, page_size=3)
+            if cursor:
+                query['cursor'] = cursor
+            response = self.client.get('/crm/customers/', query)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.data['data']
+            self.assertLessEqual(len(data['results']), 3)
+            ids.extend(item['id'] for item in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_pages_cover_ordering_without_duplicates(self):
+        expected = list(Customer.objects.order_by('-name', '-pk').values_list('id', flat=True))
+        self.assertEqual(self.collect_pages({'ordering': '-name'}), expected)
+
+    def test_default_ordering_uses_pk(self):
+        expected = list(Customer.objects.order_by('pk').values_list('id', flat=True))
+        self.assertEqual(self.collect_pages({}), expected)
+
+    def test_without_page_size_returns_full_list(self):
+        response = self.client.get('/crm/customers/')
+        self.assertEqual(len(response.data), 7)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/crm/customers/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        for ordering, payload in (('-name', ['x', 'abc']), ('created_at', ['not a date', 1])):
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            response = self.client.get('/crm/customers/', {'cursor': cursor, 'ordering': ordering})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class QueryPlanTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username="admin", is_superuser=True, is_staff=True)
+        self.client.force_authenticate(self.admin)
+
+    def add_opportunities(self, count):
+        for index in range(count):
+            customer = Customer.objects.create(name=f"Customer {index}")
+            lead = Lead.objects.create(full_name=f"Lead {index}")
+            Opportunity.objects.create(customer=customer, lead=lead, title=f"Deal {index}")
 
-# Create your tests here.
+    def test_list_query_count_does_not_depend_on_rows(self):
+        self.add_opportunities(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/crm/opportunities/')
+        self.add_opportunities(10)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/crm/opportunities/')
+        self.assertEqual(len(response.data), 12)
+        self.assertEqual(response.data[0]['customer_name'], "Customer 0")
+        self.assertEqual(len(small), len(large))
@@ -6,10 +6,10 @@ from .serializers import (
     OpportunitySerializer, NoteSerializer
 )
 from rest_framework.authentication import SessionAuthentication
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.authentication import VersionedJWTAuthentication
 from apps.baseview import BaseViewSet
 from api.codes import *
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.authentication import VersionedJWTAuthentication
 from rest_framework.authentication import SessionAuthentication
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -17,7 +17,7 @@ class CustomerViewSet(BaseViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     permission_classes = [permissions.DjangoModelPermissions, permissions.IsAuthenticated]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["name", "code", "email", "phone", "website"]
     
@@ -30,7 +30,7 @@ class ContactViewSet(BaseViewSet):
     queryset = Contact.objects.select_related("customer").all()
     serializer_class = ContactSerializer
     permission_classes = [permissions.DjangoModelPermissions, permissions.IsAuthenticated]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["full_name", "email", "phone", "position", "customer__name"]
     filterset_fields = ["customer"]
@@ -52,7 +52,7 @@ class LeadViewSet(BaseViewSet):
     queryset = Lead.objects.select_related("owner", "converted_customer").all()
     serializer_class = LeadSerializer
     permission_classes = [permissions.DjangoModelPermissions, permissions.IsAuthenticated]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["full_name", "company_name", "email", "phone", "status", "source"]
     filterset_fields = ["status", "owner", "source"]
@@ -73,7 +73,7 @@ class OpportunityViewSet(BaseViewSet):
     queryset = Opportunity.objects.select_related("customer", "lead", "owner").all()
     serializer_class = OpportunitySerializer
     permission_classes = [permissions.DjangoModelPermissions, permissions.IsAuthenticated]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["title", "stage", "customer__name", "lead__full_name"]
     filterset_fields = ["stage", "customer", "owner"]
@@ -92,7 +92,7 @@ class NoteViewSet(BaseViewSet):
     queryset = Note.objects.select_related("customer", "lead", "opportunity", "created_by").all()
     serializer_class = NoteSerializer
     permission_classes = [permissions.DjangoModelPermissions, permissions.IsAuthenticated]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["content"]
     filterset_fields = ["customer", "lead", "opportunity"]
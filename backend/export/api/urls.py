@@ -1,10 +1,14 @@
 from django.urls import path
 from ..views.api_views import (
     ExportAPIView,
- 
+    ExportJobListCreateView,
+    ExportJobDetailView,
+    ExportJobDownloadView,
 )
  
 urlpatterns = [
     path('export/', ExportAPIView.as_view(), name='export'),  #     1
-   
-]
\ No newline at end of file
+    path('jobs/', ExportJobListCreateView.as_view(), name='export-jobs'),
+    path('jobs/<int:pk>/', ExportJobDetailView.as_view(), name='export-job-detail'),
+    path('jobs/<int:pk>/download/', ExportJobDownloadView.as_view(), name='export-job-download'),
+]
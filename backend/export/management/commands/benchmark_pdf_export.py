@@ -0,0 +1,54 @@
+# export/management/commands/benchmark_pdf_export.py
+
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from export.services.exporter import ArabicPDFService
+
+
+class Command(BaseCommand):
+    help = "قياس سرعة تصدير PDF العربي لتقارير 1k / 10k / 50k صف (بيانات تجريبية)"
+
+    NAMES = ["محمد أحمد", "علي حسن", "فاطمة علي", "عبدالله صالح", "مريم خالد", "Sara Ahmed"]
+    CITIES = ["صنعاء", "عدن", "تعز", "الحديدة", "إب"]
+    NOTES = ["", "عميل مهم", "متابعة هاتفية الأسبوع القادم مع إرسال عرض سعر محدث للإدارة العامة"]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--memory', action='store_true', help="قياس ذروة الذاكرة (أبطأ)")
+
+    def handle(self, *args, **options):
+        for count in options['rows']:
+            data = self.make_rows(count)
+            if options['memory']:
+                tracemalloc.start()
+            start = time.perf_counter()
+            response = ArabicPDFService.export(data, filename='benchmark.pdf', title="تقرير تجريبي")
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if options['memory'] else None
+            if options['memory']:
+                tracemalloc.stop()
+
+            line = (f"{count:>7} rows: {elapsed:8.2f}s  {count / elapsed:9.0f} rows/s  "
+                    f"{len(response.content) / 1024:9.0f} KB")
+            if peak is not None:
+                line += f"  peak {peak / 1024 / 1024:.1f} MB"
+            self.stdout.write(line)
+
+    def make_rows(self, count):
+        rng = random.Random(count)
+        return [
+            {
+                'id': index,
+                'name': rng.choice(self.NAMES),
+                'city': rng.choice(self.CITIES),
+                'amount': rng.randint(100, 100000),
+                'created_at': datetime(2025, 1, 1 + index % 28),
+                'notes': rng.choice(self.NOTES),
+            }
+            for index in range(count)
+        ]
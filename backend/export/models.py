@@ -1,3 +1,56 @@
 from django.db import models
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+from apps.basemodel import BaseModel
+
+
+class ExportJob(BaseModel):
+    """
+    مهمة تصدير في الخلفية (انظر export/services/jobs.py)
+    الطلبات المتطابقة أثناء التنفيذ تشترك في نفس المهمة عبر fingerprint.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    )
+    ACTIVE_STATUSES = (PENDING, RUNNING)
+
+    fingerprint = models.CharField(max_length=64, db_index=True, verbose_name=_("Fingerprint"))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING, verbose_name=_("Status"))
+    model = models.CharField(max_length=100, verbose_name=_("Model"))
+    export_format = models.CharField(max_length=20, verbose_name=_("Format"))
+    params = models.JSONField(default=dict, blank=True, verbose_name=_("Parameters"))
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name=_("Total rows"))
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name=_("Processed rows"))
+    file = models.FileField(upload_to='exports/', null=True, blank=True, verbose_name=_("File"))
+    error = models.TextField(null=True, blank=True, verbose_name=_("Error"))
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Started at"))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Finished at"))
+
+    class Meta:
+        verbose_name = _("Export job")
+        verbose_name_plural = _("Export jobs")
+        constraints = [
+            # At most one pending/running job per identical request
+            models.UniqueConstraint(
+                fields=['fingerprint'],
+                condition=Q(status__in=['pending', 'running']),
+                name='exportjob_active_fingerprint_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model} ({self.export_format}) - {self.status}"
+
+    @property
+    def progress(self):
+        if not self.total_rows:
+            return 100 if self.status == self.DONE else 0
+        return min(round(self.processed_rows * 100 / self.total_rows), 100)
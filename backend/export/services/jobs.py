@@ -0,0 +1,214 @@
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ..models import ExportJob
+from .exporter import DynamicExporter
+
+logger = logging.getLogger(__name__)
+
+# Export options that change the produced file
+JOB_PARAMS = ('columns', 'filters', 'filename', 'title')
+ENQUEUE_ATTEMPTS = 3
+
+
+def job_fingerprint(user, model_path, export_format, params):
+    payload = json.dumps(
+        [getattr(user, 'pk', None), model_path, export_format, params],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def fail_stale_jobs(jobs=None, now=None):
+    """
+    Mark as failed the jobs pending (since created_at) or running (since started_at) for
+    longer than EXPORT_JOB_TIMEOUT: their process/worker died, and as active jobs they
+    would keep every identical request joining them. Returns the number of jobs failed.
+    """
+    now = now or timezone.now()
+    deadline = now - timedelta(seconds=getattr(settings, 'EXPORT_JOB_TIMEOUT', 60 * 60))
+    stale = (jobs if jobs is not None else ExportJob.objects.all()).filter(
+        Q(status=ExportJob.PENDING, created_at__lt=deadline)
+        | Q(status=ExportJob.RUNNING, started_at__lt=deadline)
+    )
+    return stale.update(status=ExportJob.FAILED, error="Export job timed out", finished_at=now)
+
+
+def enqueue_export(user, model_path, export_format, params):
+    """
+    Create (or join) the export job of this request and hand it to the executor.
+    Returns (job, created). Identical requests still pending/running share one job.
+    """
+    params = {key: params.get(key) for key in JOB_PARAMS if params.get(key) not in (None, '', [], {})}
+    fingerprint = job_fingerprint(user, model_path, export_format, params)
+
+    active = ExportJob.objects.filter(fingerprint=fingerprint, status__in=ExportJob.ACTIVE_STATUSES)
+    fail_stale_jobs(active)
+    for attempt in range(ENQUEUE_ATTEMPTS):
+        job = active.first()
+        if job is not None:
+            return job, False
+        try:
+            with transaction.atomic():
+                job = ExportJob.objects.create(
+                    fingerprint=fingerprint, model=model_path, export_format=export_format, params=params,
+                )
+            break
+        except IntegrityError:
+            # Lost the race against an identical request: join it, or try again if it
+            # already finished meanwhile
+            if attempt == ENQUEUE_ATTEMPTS - 1:
+                raise
+
+    transaction.on_commit(lambda: get_executor().submit(job.pk))
+    return job, True
+
+
+def run_export_job(job_id):
+    """Render the export of a job into media storage, reporting progress on the way."""
+    claimed = ExportJob.objects.filter(pk=job_id, status=ExportJob.PENDING).update(
+        status=ExportJob.RUNNING, started_at=timezone.now(),
+    )
+    if not claimed:
+        return
+    job = ExportJob.objects.get(pk=job_id)
+    jobs = ExportJob.objects.filter(pk=job_id)
+    params = job.params
+    try:
+        user = get_user_model().objects.filter(pk=job.created_by_id).first()
+        queryset = DynamicExporter._get_data(job.model, params.get('filters'), user)
+        total = queryset.count()
+        jobs.update(total_rows=total)
+
+        response = DynamicExporter.export(
+            data_source=queryset,
+            export_format=job.export_format,
+            columns=params.get('columns'),
+            filename=params.get('filename'),
+            title=params.get('title'),
+            progress=lambda done: jobs.update(processed_rows=done),
+        )
+        filename = _response_filename(response) or f"export_{job.pk}.{job.export_format}"
+        with tempfile.TemporaryFile() as output:
+            if response.streaming:
+                for chunk in response.streaming_content:
+                    output.write(chunk)
+            else:
+                output.write(response.content)
+            _close_content(response)
+            output.seek(0)
+            job.file.save(f"{job.pk}/{filename}", File(output), save=False)
+
+        jobs.update(status=ExportJob.DONE, file=job.file.name, processed_rows=total, finished_at=timezone.now())
+    except Exception as e:
+        logger.exception("Export job %s failed", job_id)
+        jobs.update(status=ExportJob.FAILED, error=str(e), finished_at=timezone.now())
+
+
+def _close_content(response):
+    """
+    Release the file behind a FileResponse (the streamed generators are exhausted).
+    Not response.close(): it sends request_finished, whose close_old_connections would
+    close this worker thread's connection before the job's final state is written.
+    """
+    stream = getattr(response, 'file_to_stream', None)
+    if stream is not None:
+        stream.close()
+
+
+def _response_filename(response):
+    disposition = response.get('Content-Disposition', '')
+    if 'filename="' in disposition:
+        return disposition.split('filename="', 1)[1].split('"', 1)[0]
+    return None
+
+
+class InlineJobExecutor:
+    """Runs the job in the calling thread (tests, debugging)."""
+    run_job = staticmethod(run_export_job)
+
+    def submit(self, job_id):
+        self.run_job(job_id)
+
+
+class ThreadPoolJobExecutor:
+    """Local executor: a small per-process thread pool."""
+    run_job = staticmethod(run_export_job)
+    workers_setting = 'EXPORT_JOB_WORKERS'
+
+    def __init__(self, max_workers=None):
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers or getattr(settings, self.workers_setting, 2),
+            thread_name_prefix=self.workers_setting.lower(),
+        )
+
+    def submit(self, job_id):
+        self.pool.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        try:
+            self.run_job(job_id)
+        finally:
+            # Worker threads own their DB connections
+            connections.close_all()
+
+
+class CeleryJobExecutor:
+    """Sends the job to the Celery workers (export.tasks.run_export_job_task)."""
+    task = 'export.tasks.run_export_job_task'
+
+    def submit(self, job_id):
+        import_string(self.task).delay(job_id)
+
+    @staticmethod
+    def is_available():
+        broker_url = getattr(settings, 'CELERY_BROKER_URL', None)
+        if not broker_url:
+            return False
+        try:
+            from kombu import Connection
+            import api.celery  # noqa: F401  configures the Celery app
+            with Connection(broker_url, connect_timeout=1) as connection:
+                connection.ensure_connection(max_retries=1)
+            return True
+        except Exception:
+            return False
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(setting='EXPORT_JOB_EXECUTOR', local_class=ThreadPoolJobExecutor, celery_class=CeleryJobExecutor):
+    """
+    settings.<setting> (dotted path) if set, otherwise Celery when its broker
+    is reachable and the local thread pool as fallback. One instance per process.
+    """
+    path = getattr(settings, setting, None)
+    key = (setting, path)
+    executor = _executors.get(key)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(key)
+            if executor is None:
+                if path:
+                    executor = import_string(path)()
+                elif celery_class.is_available():
+                    executor = celery_class()
+                else:
+                    executor = local_class()
+                _executors[key] = executor
+    return executor
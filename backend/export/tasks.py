@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from .services.jobs import run_export_job
+
+
+@shared_task(name='export.run_export_job')
+def run_export_job_task(job_id):
+    run_export_job(job_id)
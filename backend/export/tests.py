@@ -1,3 +1,171 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import timedelta
+from io import BytesIO
 
-# Create your tests here.
+from django.core.signals import request_finished
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from crm.models import Lead
+from users.models import User
+from .models import ExportJob
+from .services.jobs import enqueue_export, run_export_job
+
+
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username="admin", is_superuser=True, is_staff=True)
+        self.client.force_authenticate(self.admin)
+        for index in range(5):
+            Lead.objects.create(full_name=f"عميل {index}")
+
+    def export(self, **payload):
+        response = self.client.post('/export/api/export/', dict(model='crm.lead', **payload), format='json')
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_is_streamed(self):
+        content = self.export(format='csv', columns=['id', 'full_name'])
+        lines = content.lstrip('\ufeff').splitlines()
+        self.assertEqual(lines[0], 'id,full_name')
+        self.assertEqual(len(lines), 6)
+        self.assertIn('عميل 4', content)
+
+    def test_ndjson(self):
+        content = self.export(format='ndjson', columns=['full_name'])
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(rows[0], {'full_name': "عميل 0"})
+        self.assertEqual(len(rows), 5)
+
+    def test_csv_without_streaming(self):
+        response = self.client.post('/export/api/export/', {
+            'model': 'crm.lead', 'format': 'csv', 'columns': ['full_name'], 'stream': False,
+        }, format='json')
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+        self.assertIn('عميل 0', response.content.decode('utf-8'))
+
+
+class ExcelExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username="admin", is_superuser=True, is_staff=True)
+        self.client.force_authenticate(self.admin)
+        for index in range(3):
+            Lead.objects.create(full_name=f"عميل {index}")
+
+    def load(self, response):
+        import openpyxl
+        self.assertEqual(response.status_code, 200)
+        return openpyxl.load_workbook(BytesIO(b''.join(response.streaming_content))).active
+
+    def test_model_export(self):
+        response = self.client.post('/export/api/export/', {
+            'model': 'crm.lead', 'format': 'excel', 'columns': ['full_name', 'created_at'], 'title': "العملاء",
+        }, format='json')
+        sheet = self.load(response)
+        # Title is merged over A1:D1 like before, so rows are 4 cells wide
+        rows = [row[:2] for row in sheet.values]
+        self.assertEqual(rows[0][0], "العملاء")
+        self.assertEqual(rows[2], ('full_name', 'created_at'))
+        self.assertEqual([row[0] for row in rows[3:]], ["عميل 0", "عميل 1", "عميل 2"])
+        self.assertEqual(sheet.column_dimensions['A'].width, len('full_name') + 2)
+
+    def test_raw_data_export(self):
+        response = self.client.post('/export/api/export/', {
+            'data': [{'name': "أ", 'total': 5}, {'name': "ب", 'total': 7}], 'format': 'excel',
+        }, format='json')
+        self.assertEqual(list(self.load(response).values), [('name', 'total'), ("أ", 5), ("ب", 7)])
+
+
+
+class PDFExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username="admin", is_superuser=True, is_staff=True)
+        self.client.force_authenticate(self.admin)
+        for index in range(60):
+            Lead.objects.create(full_name=f"عميل {index % 3}", notes="ملاحظة طويلة " * 20 if index == 0 else None)
+
+    def test_model_export(self):
+        response = self.client.post('/export/api/export/', {
+            'model': 'crm.lead', 'format': 'pdf', 'columns': ['full_name', 'notes'], 'title': "العملاء",
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+    def test_arabic_shaping_is_memoized(self):
+        from .services.exporter import ArabicPDFService, _shape_arabic
+        _shape_arabic.cache_clear()
+        for _ in range(3):
+            ArabicPDFService.prepare_arabic_text("عميل 1")
+        self.assertEqual(_shape_arabic.cache_info().hits, 2)
+        # نص بدون حروف عربية لا يمر على المعالجة
+        self.assertEqual(ArabicPDFService.prepare_arabic_text("ABC 123"), "ABC 123")
+
+@override_settings(EXPORT_JOB_EXECUTOR='export.services.jobs.InlineJobExecutor', MEDIA_ROOT=tempfile.mkdtemp())
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username="employee")
+        self.client.force_authenticate(self.user)
+        for index in range(3):
+            Lead.objects.create(full_name=f"عميل {index}")
+        self.payload = {'model': 'crm.lead', 'format': 'csv', 'columns': ['full_name']}
+
+    def test_job_runs_and_file_is_downloadable(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/export/api/jobs/', self.payload, format='json')
+        self.assertEqual(response.status_code, 202)
+
+        job = self.client.get(f"/export/api/jobs/{response.data['id']}/").data
+        self.assertEqual((job['status'], job['processed_rows'], job['total_rows'], job['progress']), ('done', 3, 3, 100))
+
+        download = self.client.get(f"/export/api/jobs/{job['id']}/download/")
+        content = b''.join(download.streaming_content).decode('utf-8')
+        self.assertIn('عميل 2', content)
+
+    def test_job_does_not_send_request_finished(self):
+        # close_old_connections on request_finished would close the worker's connection
+        finished = []
+        receiver = lambda **kwargs: finished.append(kwargs)
+        request_finished.connect(receiver)
+        try:
+            for export_format in ('csv', 'excel'):
+                job, _ = enqueue_export(self.user, 'crm.lead', export_format, {'columns': ['full_name']})
+                run_export_job(job.pk)
+                self.assertEqual(ExportJob.objects.get(pk=job.pk).status, ExportJob.DONE)
+        finally:
+            request_finished.disconnect(receiver)
+        self.assertEqual(finished, [])
+
+    def test_identical_requests_share_a_job(self):
+        first = self.client.post('/export/api/jobs/', self.payload, format='json')
+        second = self.client.post('/export/api/jobs/', self.payload, format='json')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertEqual(ExportJob.objects.count(), 1)
+
+    def test_dead_job_is_not_joined(self):
+        first = self.client.post('/export/api/jobs/', self.payload, format='json').data
+        # The worker died: pending for longer than EXPORT_JOB_TIMEOUT
+        ExportJob.objects.filter(pk=first['id']).update(created_at=timezone.now() - timedelta(hours=2))
+        second = self.client.post('/export/api/jobs/', self.payload, format='json')
+        self.assertEqual(second.status_code, 202)
+        self.assertNotEqual(second.data['id'], first['id'])
+        self.assertEqual(ExportJob.objects.get(pk=first['id']).status, ExportJob.FAILED)
+
+        ExportJob.objects.filter(pk=second.data['id']).update(
+            status=ExportJob.RUNNING, started_at=timezone.now() - timedelta(hours=2),
+        )
+        third = self.client.post('/export/api/jobs/', self.payload, format='json')
+        self.assertNotEqual(third.data['id'], second.data['id'])
+
+    def test_other_users_cannot_see_the_job(self):
+        job = self.client.post('/export/api/jobs/', self.payload, format='json').data
+        self.client.force_authenticate(User.objects.create(username="other"))
+        self.assertEqual(self.client.get(f"/export/api/jobs/{job['id']}/").status_code, 404)
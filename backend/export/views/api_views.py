@@ -2,9 +2,18 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+import os
+
 from django.apps import apps
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
 
+from ..models import ExportJob
+from ..serializers import ExportJobSerializer
 from ..services.exporter import DynamicExporter
+from ..services.jobs import enqueue_export
+
+EXPORT_JOB_FORMATS = ('excel', 'pdf', 'csv', 'json', 'ndjson')
 
 class ExportAPIView(APIView):
     """
@@ -40,6 +49,7 @@ class ExportAPIView(APIView):
             filters = data.get('filters', {})
             filename = data.get('filename')
             title = data.get('title')
+            stream = data.get('stream')
             
             try:
                 app_label, model_name = model_path.split('.')
@@ -58,7 +68,8 @@ class ExportAPIView(APIView):
                     filters=filters,
                     user=request.user,
                     filename=filename,
-                    title=title
+                    title=title,
+                    stream=stream
                 )
                 return response
             except Exception as e:
@@ -106,4 +117,76 @@ class ExportAPIView(APIView):
             return Response(
                 {'error': f'خطأ في التصدير: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+class ExportJobListCreateView(APIView):
+    """
+    مهام التصدير في الخلفية
+    POST: إنشاء مهمة (نفس مدخلات ExportAPIView)، الطلبات المتطابقة قيد التنفيذ تعيد نفس المهمة
+    GET: مهام المستخدم الحالي
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        jobs = ExportJob.objects.filter(created_by=request.user).order_by('-created_at')[:50]
+        return Response(ExportJobSerializer(jobs, many=True, context={'request': request}).data)
+
+    def post(self, request):
+        data = request.data
+        model_path = data.get('model')
+        if not model_path:
+            return Response(
+                {'error': 'يجب تحديد نموذج البيانات'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            app_label, model_name = model_path.split('.')
+            apps.get_model(app_label, model_name)
+        except (ValueError, LookupError):
+            return Response(
+                {'error': f'النموذج {model_path} غير موجود'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        export_format = data.get('format', 'excel')
+        if export_format not in EXPORT_JOB_FORMATS:
+            return Response(
+                {'error': f'صيغة {export_format} غير مدعومة'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        job, created = enqueue_export(request.user, model_path, export_format, data)
+        return Response(
+            ExportJobSerializer(job, context={'request': request}).data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+        )
+
+
+class ExportJobDetailView(APIView):
+    """حالة مهمة التصدير: الصفوف المنجزة / الإجمالي"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_job_for_user(request.user, pk)
+        return Response(ExportJobSerializer(job, context={'request': request}).data)
+
+
+class ExportJobDownloadView(APIView):
+    """تحميل ملف المهمة بعد اكتمالها"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_job_for_user(request.user, pk)
+        if job.status != ExportJob.DONE or not job.file:
+            return Response(
+                {'error': 'الملف غير جاهز بعد', 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=os.path.basename(job.file.name))
+
+
+def get_job_for_user(user, pk):
+    jobs = ExportJob.objects.all()
+    if not user.is_staff:
+        jobs = jobs.filter(created_by=user)
+    return get_object_or_404(jobs, pk=pk)
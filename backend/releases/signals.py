@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .update_models import ClientUpdate
+from .update_services import update_statistics
+
+
+@receiver(post_save, sender=ClientUpdate)
+@receiver(post_delete, sender=ClientUpdate)
+def invalidate_update_statistics(sender, **kwargs):
+    """إحصائيات النشر تتغير مع حالة أي ClientUpdate"""
+    update_statistics.invalidate()
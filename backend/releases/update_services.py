@@ -10,10 +10,23 @@ from datetime import datetime
 from django.utils import timezone
 from django.core.files.base import ContentFile
 from django.db import transaction
+from django.db.models import Q
 
 from .update_models import Update, UpdateItem, ClientUpdate, UpdateLog
 from .models import Release, ClientRelease
 from clients.models import Beneficiary
+from api.stats import cached_statistics, conditional_counts
+
+
+@cached_statistics('updates')
+def update_statistics(update_id):
+    """Deployments of an update by status, counted in a single query."""
+    counters = {'total_deployments': None}
+    counters.update(
+        (status, Q(status=status))
+        for status in ('pending', 'in_progress', 'completed', 'failed', 'rolled_back')
+    )
+    return conditional_counts(ClientUpdate.objects.filter(update_id=update_id), counters)
 
 
 class UpdateService:
@@ -396,16 +409,8 @@ class UpdateService:
     
     @staticmethod
     def get_update_stats(update_id):
-        """Get deployment statistics for an update."""
-        update = Update.objects.get(id=update_id)
-        
-        client_updates = update.client_updates.all()
-        
-        return {
-            'total_deployments': client_updates.count(),
-            'pending': client_updates.filter(status='pending').count(),
-            'in_progress': client_updates.filter(status='in_progress').count(),
-            'completed': client_updates.filter(status='completed').count(),
-            'failed': client_updates.filter(status='failed').count(),
-            'rolled_back': client_updates.filter(status='rolled_back').count(),
-        }
+        """Get deployment statistics for an update (one query, cached until a deployment changes)."""
+        stats = update_statistics(update_id)
+        if not stats['total_deployments'] and not Update.objects.filter(id=update_id).exists():
+            raise Update.DoesNotExist(f"Update {update_id} does not exist.")
+        return stats
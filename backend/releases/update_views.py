@@ -6,7 +6,7 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.authentication import SessionAuthentication
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.authentication import VersionedJWTAuthentication
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
@@ -28,7 +28,7 @@ class UpdateViewSet(viewsets.ModelViewSet):
     """
     queryset = Update.objects.all()
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'update_type', 'base_release', 'is_mandatory']
     search_fields = ['name', 'version', 'description']
@@ -127,7 +127,7 @@ class UpdateItemViewSet(viewsets.ModelViewSet):
     queryset = UpdateItem.objects.all()
     serializer_class = UpdateItemSerializer
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['update', 'item_type', 'change_type', 'app']
     ordering = ['order']
@@ -146,7 +146,7 @@ class ClientUpdateViewSet(viewsets.ModelViewSet):
     """
     queryset = ClientUpdate.objects.all()
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['update', 'beneficiary', 'status', 'client_release']
     search_fields = ['beneficiary__public_name', 'update__name']
@@ -215,7 +215,7 @@ class UpdateLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = UpdateLog.objects.all()
     serializer_class = UpdateLogSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['update', 'client_update', 'action', 'performed_by']
     ordering = ['-performed_at']
@@ -226,7 +226,7 @@ class BeneficiaryUpdatesViewSet(viewsets.ViewSet):
     ViewSet for getting updates related to a specific beneficiary.
     """
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     
     def list(self, request, beneficiary_pk=None):
         """Get all updates (pending and applied) for a beneficiary."""
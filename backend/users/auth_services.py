@@ -1,18 +1,85 @@
 # accounts/services/auth_services.py
 
+from django.db import transaction
+from django.utils import timezone
 from rest_framework_simplejwt.token_blacklist.models import (
     OutstandingToken,
     BlacklistedToken,
 )
 
+from .models import User
+from .token_state import bump_token_version
+
+BATCH_SIZE = 1000
+
+
 def force_logout_user(user):
     """
     Logout user from all devices immediately
     """
-   
-    user.token_version += 1
-    user.save(update_fields=["token_version"])
 
-    tokens = OutstandingToken.objects.filter(user=user)
-    for token in tokens:
-        BlacklistedToken.objects.get_or_create(token=token)
+    force_logout_users([user.pk])
+    user.refresh_from_db(fields=["token_version"])
+
+
+def force_logout_users(user_ids):
+    """
+    Logout many users at once (e.g. users_of_structure / users_of_role).
+    Returns (users, blacklisted tokens).
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0, 0
+    with transaction.atomic():
+        # Atomic increment, drops the cached token state
+        bump_token_version(*user_ids)
+        return len(user_ids), revoke_tokens(user_ids)
+
+
+def revoke_tokens(user_ids, batch_size=BATCH_SIZE):
+    """
+    Blacklist the outstanding refresh tokens of the users: one query for the tokens not
+    blacklisted yet, then one INSERT per batch (a token blacklisted meanwhile is skipped).
+    """
+    token_ids = list(OutstandingToken.objects.filter(
+        user_id__in=user_ids, blacklistedtoken__isnull=True, expires_at__gt=timezone.now(),
+    ).values_list('pk', flat=True))
+
+    BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token_id=token_id) for token_id in token_ids],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+    return len(token_ids)
+
+
+def users_of_structure(structure_id, include_children=False):
+    """ids of the members of a structure, with include_children of its whole subtree too."""
+    users = User.objects.all()
+    if include_children:
+        users = users.filter(stractures__ancestor_links__ancestor_id=structure_id)
+    else:
+        users = users.filter(stractures=structure_id)
+    return users.values_list('pk', flat=True).distinct()
+
+
+def users_of_role(role_id):
+    """ids of the users holding a role (roles are groups)."""
+    return User.objects.filter(groups=role_id).values_list('pk', flat=True).distinct()
+
+
+def purge_expired_tokens(batch_size=BATCH_SIZE, now=None):
+    """
+    Delete expired outstanding tokens and their blacklist rows, batch by batch so no
+    statement locks the whole table. Returns the number of outstanding tokens deleted.
+    """
+    now = now or timezone.now()
+    expired = OutstandingToken.objects.filter(expires_at__lte=now).order_by('pk')
+    purged = 0
+    while True:
+        token_ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not token_ids:
+            return purged
+        with transaction.atomic():
+            # Blacklist rows first: the outstanding tokens then have nothing left to cascade to
+            BlacklistedToken.objects.filter(token_id__in=token_ids).delete()
+            purged += OutstandingToken.objects.filter(pk__in=token_ids).delete()[0]
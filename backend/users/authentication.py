@@ -1,18 +1,94 @@
 # accounts/authentication.py
+from django.contrib.auth.models import _user_has_module_perms, _user_has_perm
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework.exceptions import AuthenticationFailed
 
+from .permission_index import get_permission_index
+from .token_claims import read_claims
+from .token_state import get_token_state
+
+
+class LazyUser(SimpleLazyObject):
+    """
+    request.user of a token accepted from the cached TokenState.
+    id, is_active and permission checks (PermissionIndex) are answered without the
+    user row, any other attribute loads it once.
+    With `token_claims` the permission index and visibility scope come from the token.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    token_claims = None
+
+    def __init__(self, user_model, user_id, is_active, token_claims=None):
+        def load():
+            try:
+                return user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        super().__init__(load)
+        # Plain attributes of the proxy, LazyObject would forward setattr to the user
+        self.__dict__.update(id=user_id, pk=user_id, is_active=is_active, token_claims=token_claims)
+        if token_claims is not None:
+            self.__dict__['is_superuser'] = token_claims.permission_index.is_superuser
+
+    def __bool__(self):
+        # `if not request.user` (DRF permissions) must not load the row
+        return True
+
+    def has_perm(self, perm, obj=None):
+        index = get_permission_index(self)
+        if index.is_active and index.is_superuser:
+            return True
+        return _user_has_perm(self, perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return all(self.has_perm(perm, obj) for perm in perm_list)
+
+    def has_module_perms(self, app_label):
+        index = get_permission_index(self)
+        if index.is_active and index.is_superuser:
+            return True
+        return _user_has_module_perms(self, app_label)
+
+
 class VersionedJWTAuthentication(JWTAuthentication):
+    """
+    Rejects tokens whose token_version is older than the user's (force logout) or
+    whose user is inactive. The check reads users.token_state (LRU -> Redis), not the
+    user row. Current `authz` claims (users.token_claims) authorize the request too.
+    """
 
     def get_user(self, validated_token):
-        user = super().get_user(validated_token)
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # The password hash check needs the row anyway
+            user = super().get_user(validated_token)
+            self.check_token_version(validated_token, get_token_state(user.pk))
+            return user
 
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        state = get_token_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not state.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        self.check_token_version(validated_token, state)
+        return LazyUser(self.user_model, user_id, state.is_active, read_claims(validated_token, user_id))
+
+    @staticmethod
+    def check_token_version(validated_token, state):
         token_version = validated_token.get("token_version")
 
-        if token_version != user.token_version:
+        if state is None or token_version != state.token_version:
             raise AuthenticationFailed(
                 "Token revoked. Please login again.",
                 code="token_revoked"
             )
-
-        return user
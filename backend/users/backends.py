@@ -0,0 +1,21 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .permission_index import get_permission_index
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    ModelBackend whose permission checks read the cached PermissionIndex
+    instead of querying user/group permissions on every request.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        return get_permission_index(user_obj).names
+
+    def has_perm(self, user_obj, perm, obj=None):
+        return user_obj.is_active and perm in self.get_all_permissions(user_obj, obj)
+
+    def has_module_perms(self, user_obj, app_label):
+        return user_obj.is_active and app_label in get_permission_index(user_obj).app_labels
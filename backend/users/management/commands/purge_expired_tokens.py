@@ -0,0 +1,17 @@
+# users/management/commands/purge_expired_tokens.py
+# Run it from cron, or let Celery beat run users.purge_expired_tokens (CELERY_BEAT_SCHEDULE)
+
+from django.core.management.base import BaseCommand
+
+from users.auth_services import BATCH_SIZE, purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "حذف رموز JWT المنتهية (OutstandingToken و BlacklistedToken) على دفعات"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = purge_expired_tokens(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ تم حذف {count} رمز منتهي."))
@@ -0,0 +1,194 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db.models import Q
+
+from api.cache import LocalLRU, get_generation, bump_generation
+from .token_state import bump_claims_version
+
+CACHE_NAMESPACE = 'permission_index'
+CACHE_TIMEOUT = 60 * 60
+
+_local_indexes = LocalLRU(maxsize=2048)
+
+PERMISSION_FIELDS = ('content_type__app_label', 'content_type__model', 'codename')
+
+
+def build_permission_tree(perms):
+    """
+    Group (app_label, codename) pairs as {app_label: {model: [actions]}}.
+    'add_customer' -> model 'customer', action 'add' (same split as the old views).
+    """
+    tree = {}
+    for app_label, codename in sorted(perms):
+        parts = codename.split('_')
+        if len(parts) < 2:
+            continue
+        tree.setdefault(app_label, {}).setdefault(parts[1], []).append(parts[0])
+    return tree
+
+
+class PermissionIndex:
+    """
+    Compiled permissions of a single user (direct + groups + roles).
+    Roles are groups (multi-table inheritance) so their permissions come with the groups.
+
+    Same result as ModelBackend.get_all_permissions(): inactive users have none and
+    active superusers have every permission.
+
+    `model_perms` holds (app_label, model, codename): a custom codename may exist on
+    several models of an app. `perms` / `names` are the Django view ('app_label.codename').
+    """
+    __slots__ = ('user_id', 'is_active', 'is_superuser', 'model_perms', 'perms', 'names', '_tree')
+
+    def __init__(self, user_id, is_active, is_superuser, model_perms=()):
+        self.user_id = user_id
+        self.is_active = is_active
+        self.is_superuser = is_superuser
+        self.model_perms = frozenset(model_perms)
+        self.perms = frozenset((app_label, codename) for app_label, _, codename in self.model_perms)
+        self.names = frozenset(f'{app_label}.{codename}' for app_label, codename in self.perms)
+        self._tree = None
+
+    @classmethod
+    def build(cls, user):
+        """Resolve the permissions from the database (cache miss path)."""
+        if not user.is_active:
+            return cls(user.id, False, user.is_superuser)
+        permissions = Permission.objects.all()
+        if not user.is_superuser:
+            permissions = permissions.filter(Q(user=user.id) | Q(group__user=user.id))
+        perms = permissions.values_list(*PERMISSION_FIELDS).distinct()
+        return cls(user.id, True, user.is_superuser, perms)
+
+    @classmethod
+    def build_many(cls, users):
+        """build() for a list of users with set-based queries, not a query per user."""
+        regular = [user.id for user in users if user.is_active and not user.is_superuser]
+        perms = defaultdict(set)
+        if regular:
+            direct = Permission.objects.filter(user__in=regular).values_list('user', *PERMISSION_FIELDS)
+            via_groups = Permission.objects.filter(group__user__in=regular).values_list('group__user', *PERMISSION_FIELDS)
+            for rows in (direct, via_groups):
+                for user_id, *perm in rows:
+                    perms[user_id].add(tuple(perm))
+        all_perms = ()
+        if any(user.is_active and user.is_superuser for user in users):
+            all_perms = Permission.objects.values_list(*PERMISSION_FIELDS).distinct()
+
+        indexes = {}
+        for user in users:
+            if not user.is_active:
+                indexes[user.id] = cls(user.id, False, user.is_superuser)
+            else:
+                indexes[user.id] = cls(user.id, True, user.is_superuser, all_perms if user.is_superuser else perms[user.id])
+        return indexes
+
+    def has(self, app_label, codename, model=None):
+        """With `model` (model_name) only the permission of that model counts."""
+        if model is None:
+            return (app_label, codename) in self.perms
+        return (app_label, model, codename) in self.model_perms
+
+    def has_perm(self, perm):
+        """`perm` in Django format: 'app_label.codename'."""
+        return perm in self.names
+
+    @property
+    def app_labels(self):
+        return {app_label for app_label, _ in self.perms}
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = build_permission_tree(self.perms)
+        return self._tree
+
+    def to_tuple(self):
+        return (self.user_id, self.is_active, self.is_superuser, tuple(self.model_perms))
+
+    @classmethod
+    def from_tuple(cls, value):
+        return cls(*value)
+
+
+def _cache_key(user_id, generation):
+    # 'm': entries hold (app_label, model, codename), older pair entries are not read back
+    return f'{CACHE_NAMESPACE}:{generation}:m:{user_id}'
+
+
+def get_permission_index(user):
+    """
+    Return the PermissionIndex of `user`.
+    Lookup order: token claims -> per-process LRU -> Redis -> database.
+    """
+    claims = getattr(user, 'token_claims', None)
+    if claims is not None:
+        return claims.permission_index
+
+    key = _cache_key(user.id, get_generation(CACHE_NAMESPACE))
+
+    index = _local_indexes.get(key)
+    if index is not None:
+        return index
+
+    cached = cache.get(key)
+    if cached is not None:
+        index = PermissionIndex.from_tuple(cached)
+    else:
+        index = PermissionIndex.build(user)
+        cache.set(key, index.to_tuple(), CACHE_TIMEOUT)
+
+    _local_indexes.set(key, index)
+    return index
+
+
+def get_permission_indexes(users):
+    """
+    {user_id: PermissionIndex} for a page of users.
+    Lookup order: per-process LRU -> one Redis get_many -> PermissionIndex.build_many.
+    """
+    generation = get_generation(CACHE_NAMESPACE)
+    indexes, missing = {}, {}
+    for user in users:
+        key = _cache_key(user.id, generation)
+        index = _local_indexes.get(key)
+        if index is None:
+            missing[key] = user
+        else:
+            indexes[user.id] = index
+    if not missing:
+        return indexes
+
+    cached = cache.get_many(list(missing))
+    built = PermissionIndex.build_many([user for key, user in missing.items() if key not in cached])
+    if built:
+        cache.set_many({_cache_key(user_id, generation): index.to_tuple() for user_id, index in built.items()},
+                       CACHE_TIMEOUT)
+    for key, user in missing.items():
+        index = PermissionIndex.from_tuple(cached[key]) if key in cached else built[user.id]
+        _local_indexes.set(key, index)
+        indexes[user.id] = index
+    return indexes
+
+
+def get_cached_permission_index(user_id):
+    """Return the cached index of a user without touching the database (or None)."""
+    key = _cache_key(user_id, get_generation(CACHE_NAMESPACE))
+    index = _local_indexes.get(key)
+    if index is None:
+        cached = cache.get(key)
+        index = PermissionIndex.from_tuple(cached) if cached is not None else None
+    return index
+
+
+def invalidate_permission_indexes():
+    """
+    Invalidate every index.
+    A group/role permission change affects all of its members, so the whole
+    namespace is rotated instead of single keys.
+    """
+    bump_generation(CACHE_NAMESPACE)
+    _local_indexes.clear()
+    bump_claims_version()
@@ -1,6 +1,8 @@
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import Permission
 
+from .permission_index import get_permission_index
+
 # from users.models import UserRole
 
 
@@ -42,39 +44,16 @@ def role_has_permission(role_or_roles, perm_codename, model):
             return True
     return False
 def has_permission(user, perm_codename, model):
+    """
+    صلاحيات المستخدم المباشرة + المجموعات + الأدوار
+    من الفهرس المخزن مؤقتاً (users.permission_index) بدون أي استعلام.
+    """
     if not user or not user.is_authenticated:
         return False
 
-    # صلاحيات المستخدم المباشرة
-    if user.user_permissions.filter(
-        codename=perm_codename,
-        content_type=ContentType.objects.get_for_model(model)
-    ).exists():
-        return True
-
-    # صلاحيات المجموعات
-    for group in user.groups.all():
-        if group.permissions.filter(
-            codename=perm_codename,
-            content_type=ContentType.objects.get_for_model(model)
-        ).exists():
-            return True
-
-    
-    # صلاحيات الأدوار
-    roles = getattr(user, 'roles', [])
-    if roles:
-        # إذا roles QuerySet فارغ، لن تدخل الحلقة
-        if hasattr(roles, 'all'):
-            roles = roles.all()
-        for role in roles:
-            if role.permissions.filter(
-                codename=perm_codename,
-                content_type=ContentType.objects.get_for_model(model)
-            ).exists():
-                return True
-
-    return False  # هنا فقط نرجع False إذا لا يوجد صلاحية
+    # Permissions of a proxy model belong to its concrete model's content type
+    opts = model._meta.concrete_model._meta
+    return get_permission_index(user).has(opts.app_label, perm_codename, opts.model_name)
 
 def assign_permission_to_user(user, perm_codename, model):
     permissions = get_permissions_for_model(model)
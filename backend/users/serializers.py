@@ -1,5 +1,6 @@
 
 from django.contrib.auth import authenticate, get_user_model
+from django.db import models
 from rest_framework import serializers
 from django.contrib.auth.models import *
 from rest_framework.exceptions import ValidationError
@@ -12,9 +13,19 @@ from activity_logs.signals import get_client_ip
 from activity_logs.models import ActivityLog
 from rest_framework.exceptions import AuthenticationFailed
 from apps.baseserializer import BaseRulesSerializer
+from .annotations import annotate_users
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
 
+class UserListSerializer(serializers.ListSerializer):
+    """Annotates the whole page of users at once before rendering them (users.annotations)."""
+
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child.add_annotations(annotate_users(users))
+        return super().to_representation(users)
+
+
 class UserSerialzer(BaseRulesSerializer):
     
     administrative_structure_name = serializers.CharField(
@@ -34,7 +45,7 @@ class UserSerialzer(BaseRulesSerializer):
      
     roles = serializers.SerializerMethodField()
     groups = serializers.SerializerMethodField()
-    stractures = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    stractures = serializers.SerializerMethodField()
     
 
     all_permissions = serializers.SerializerMethodField()
@@ -51,22 +62,36 @@ class UserSerialzer(BaseRulesSerializer):
         ]
        #  fields='__all__'
         read_only_fields = ['date_joined', 'last_login']
+        list_serializer_class = UserListSerializer
         
 
    #  def get_permission_groups_count(self, obj):
    #      return obj.permissions_group.count()
+
+    def add_annotations(self, annotations):
+        self.__dict__.setdefault('_annotations', {}).update(annotations)
+
+    def get_annotations(self, obj):
+        """Groups, roles, structures and permissions of `obj`, annotated alone outside a list."""
+        annotations = self.__dict__.setdefault('_annotations', {})
+        if obj.pk not in annotations:
+            annotations.update(annotate_users([obj]))
+        return annotations[obj.pk]
    
     def get_user_groups_count(self, obj):
-        return obj.groups.count()
+        return self.get_annotations(obj).groups_count
 
     def get_all_permissions(self, obj):
-         return obj.get_all_permissions()
+         return set(self.get_annotations(obj).permissions)
 
     def get_roles(self, obj):
-        return list(obj.groups.filter(role__isnull=False).values_list('id', flat=True))
+        return self.get_annotations(obj).role_ids
 
     def get_groups(self, obj):
-        return list(obj.groups.values_list('id', flat=True))
+        return self.get_annotations(obj).group_ids
+
+    def get_stractures(self, obj):
+        return self.get_annotations(obj).structure_ids
 
 
 
@@ -129,7 +154,8 @@ class UserCreateSerializer(BaseRulesSerializer):
         
         return user
         
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .token_claims import add_claims, claims_enabled
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     
@@ -177,6 +203,10 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         data["username"] = custom_user.username
         data["user_id"] = custom_user.id
 
+        # صلاحيات ونطاق الرؤية داخل access token (TOKEN_CLAIMS_ENABLED)
+        if claims_enabled():
+            data["access"] = add_claims(data["access"], user)
+
         return data
 
   @classmethod
@@ -196,6 +226,16 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         return token
 
+
+class MyTokenRefreshSerializer(TokenRefreshSerializer):
+    """The new access token gets current claims, not the ones copied from the refresh token."""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if claims_enabled():
+            data["access"] = add_claims(data["access"])
+        return data
+
 class UserUpdateSerializer(BaseRulesSerializer):
     class Meta:
         model = User
@@ -235,6 +275,15 @@ class ChangePasswordSerializer(serializers.Serializer):
         user.save()
         return user
 
+
+class ForceLogoutBulkSerializer(serializers.Serializer):
+    """مدخلات إنهاء جلسات عدة مستخدمين (force_logout_bulk_view)"""
+    user_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    structure = serializers.IntegerField(required=False, allow_null=True)
+    include_children = serializers.BooleanField(required=False, default=False)
+    role = serializers.IntegerField(required=False, allow_null=True)
+
+
 class RoleSerialzer(BaseRulesSerializer):
     class Meta:
         model=Role
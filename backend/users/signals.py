@@ -1,6 +1,15 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 # from .models import UserRole
+from django.contrib.auth.models import Group as BaseGroup, Permission as BasePermission, User as BaseUser
+from clients.models import Structure
+from .models import User, Group, Role, Permission
+from .visibility import get_cached_visibility_scope, invalidate_visibility_scopes
+from .permission_index import get_cached_permission_index, invalidate_permission_indexes
+from .token_state import bump_claims_version, invalidate_token_state
+from .statistics import group_statistics, user_statistics
+from apps.signals import bulk_saved
+from activity_logs.tracking import get_changes
 
 # @receiver(post_save, sender=UserRole)
 # def update_user_groups_after_role_change(sender, instance, **kwargs):
@@ -12,4 +21,135 @@ from django.dispatch import receiver
 #         # حذف المجموعات القديمة وإضافة الجديدة
 #         user.groups.clear()
 #         user.groups.add(role.group)
-#         user.save()
\ No newline at end of file
+#         user.save()
+
+
+@receiver(m2m_changed, sender=User.stractures.through)
+def invalidate_scopes_on_structures_change(sender, action, **kwargs):
+    """تغيير هياكل المستخدم يغير نطاق رؤية كل من يشاركه نفس الهيكل"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_visibility_scopes()
+
+
+@receiver(post_save, sender=User)
+def invalidate_scope_on_visibility_change(sender, instance, created, **kwargs):
+    """إبطال نطاق الرؤية عند تغيير data_visibility أو صلاحية المدير العام"""
+    if created:
+        return
+    scope = get_cached_visibility_scope(instance.pk)
+    if scope is None:
+        return
+    is_unrestricted = instance.is_superuser or instance.data_visibility == 'all'
+    if scope.is_unrestricted != is_unrestricted or (
+        not is_unrestricted and scope.mode != (instance.data_visibility or 'self')
+    ):
+        invalidate_visibility_scopes()
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Structure)
+def invalidate_scopes_on_delete(sender, instance, **kwargs):
+    # Deleting a user or a structure removes membership rows without m2m_changed
+    invalidate_visibility_scopes()
+
+
+@receiver(m2m_changed, sender=BaseUser.user_permissions.through)
+@receiver(m2m_changed, sender=BaseUser.groups.through)
+@receiver(m2m_changed, sender=BaseGroup.permissions.through)
+def invalidate_permissions_on_m2m_change(sender, action, **kwargs):
+    """صلاحيات المستخدم أو مجموعاته أو صلاحيات مجموعة/دور (الأدوار مجموعات)"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_permission_indexes()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=BaseUser)
+def invalidate_permissions_on_user_change(sender, instance, created, **kwargs):
+    """إبطال الصلاحيات عند تفعيل/إيقاف المستخدم أو تغيير صلاحية المدير العام"""
+    if created:
+        return
+    index = get_cached_permission_index(instance.pk)
+    if index is not None and (
+        index.is_active != instance.is_active or index.is_superuser != instance.is_superuser
+    ):
+        invalidate_permission_indexes()
+
+
+@receiver(post_save, sender=BasePermission)
+@receiver(post_save, sender=Permission)
+def invalidate_permissions_on_new_permission(sender, instance, created, **kwargs):
+    # Superusers hold every permission
+    if created:
+        invalidate_permission_indexes()
+
+
+@receiver(post_delete, sender=BasePermission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_delete, sender=BaseGroup)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Role)
+@receiver(post_delete, sender=BaseUser)
+def invalidate_permissions_on_delete(sender, instance, **kwargs):
+    # Cascaded membership/permission rows are removed without m2m_changed
+    invalidate_permission_indexes()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=BaseUser)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=BaseUser)
+def invalidate_token_state_on_user_change(sender, instance, **kwargs):
+    """token_version / is_active قد تتغير مع أي حفظ للمستخدم"""
+    invalidate_token_state(instance.pk)
+
+
+CLAIMED_USER_FIELDS = ('is_superuser', 'data_visibility')
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=BaseUser)
+def detect_claims_change(sender, instance, update_fields=None, **kwargs):
+    """Diff against the load-time snapshot (activity_logs.tracking), no query"""
+    if instance._state.adding:
+        instance._claims_changed = False
+        return
+    changes = get_changes(instance, update_fields)
+    # No snapshot: the old values are unknown
+    instance._claims_changed = changes is None or any(field in changes for field in CLAIMED_USER_FIELDS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=BaseUser)
+@receiver(bulk_saved, sender=User)
+def invalidate_claims_on_user_change(sender, instance=None, **kwargs):
+    """
+    is_superuser / data_visibility are carried by token claims: the receivers above only
+    catch the change when the old value is cached, so an actual change of either bumps
+    the claims version. Bulk saves do not keep the diff and always bump.
+    """
+    if instance is not None and not instance.__dict__.pop('_claims_changed', True):
+        return
+    bump_claims_version()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=BaseUser)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=BaseUser)
+@receiver(bulk_saved, sender=User)
+def invalidate_user_statistics(sender, **kwargs):
+    user_statistics.invalidate()
+
+
+@receiver(m2m_changed, sender=BaseUser.groups.through)
+@receiver(post_save, sender=BaseGroup)
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=BaseGroup)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Role)
+@receiver(post_delete, sender=BaseUser)
+def invalidate_group_statistics(sender, **kwargs):
+    """عدد أعضاء المجموعات"""
+    if kwargs.get('action', 'post_add') in ('post_add', 'post_remove', 'post_clear'):
+        group_statistics.invalidate()
@@ -0,0 +1,30 @@
+from django.db.models import Count, Q
+
+from api.stats import cached_statistics, conditional_counts
+from .models import Group, User
+
+USER_COUNTERS = {
+    'total_users': None,
+    'active_users': Q(is_active=True),
+    'inactive_users': Q(is_active=False),
+    'staff_users': Q(is_staff=True),
+    'superusers': Q(is_superuser=True),
+    'must_change_password': Q(must_change_password=True),
+}
+
+
+@cached_statistics('users')
+def user_statistics():
+    """إحصائيات المستخدمين: استعلام واحد مجمع حسب data_visibility، والإجماليات تجمع منه"""
+    rows = conditional_counts(User.objects.all(), USER_COUNTERS, group_by='data_visibility')
+    stats = {name: sum(row[name] for row in rows) for name in USER_COUNTERS}
+    stats['visibility_stats'] = [
+        {'data_visibility': row['data_visibility'], 'count': row['total_users']} for row in rows
+    ]
+    return stats
+
+
+@cached_statistics('groups')
+def group_statistics():
+    """عدد المستخدمين في كل مجموعة"""
+    return list(Group.objects.annotate(user_count=Count('user')).values('id', 'name', 'user_count'))
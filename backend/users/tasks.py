@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from .auth_services import purge_expired_tokens
+
+
+@shared_task(name='users.purge_expired_tokens')
+def purge_expired_tokens_task():
+    return purge_expired_tokens()
@@ -0,0 +1,220 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+
+from clients.models import Structure
+from .auth_services import force_logout_user, force_logout_users, purge_expired_tokens, users_of_structure
+from .authentication import VersionedJWTAuthentication
+from .models import Role, User
+from .serializers import MyTokenObtainPairSerializer
+from . import permission_index, visibility
+from .token_claims import CLAIM
+from .token_state import get_claims_version
+from api.cache import get_generation
+from .visibility import VisibilityScope
+
+
+class TokenStateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="employee")
+        self.token = str(MyTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        return VersionedJWTAuthentication().authenticate(request)[0]
+
+    def test_version_check_is_served_from_cache(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertTrue(user.is_authenticated)
+        # The row is still there for the rest of the request
+        self.assertEqual(user.username, "employee")
+
+    def test_force_logout_revokes_immediately(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            force_logout_user(self.user)
+        self.assertEqual(self.user.token_version, 2)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivation_is_seen(self):
+        self.authenticate()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_permission_checks_without_the_row(self):
+        self.user.user_permissions.add(Permission.objects.get(codename='view_customer'))
+        self.authenticate().has_perm('crm.view_customer')
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertTrue(user.has_perm('crm.view_customer'))
+            self.assertFalse(user.has_perm('crm.add_customer'))
+
+    def test_api_request_with_token(self):
+        self.user.user_permissions.add(Permission.objects.get(codename='view_customer'))
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.assertEqual(client.get('/crm/customers/').status_code, 200)
+        with self.assertNumQueries(1):
+            # Only the customers, no auth_user lookup
+            self.assertEqual(client.get('/crm/customers/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            force_logout_user(self.user)
+        self.assertEqual(client.get('/crm/customers/').status_code, 401)
+
+
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create(username=f"user{i}") for i in range(3)]
+        for user in self.users:
+            for _ in range(4):
+                RefreshToken.for_user(user)
+
+    def test_revocation_is_set_based(self):
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.filter(user=self.users[0]).first())
+        with self.assertNumQueries(5):
+            # savepoint, token_version UPDATE, token SELECT, blacklist INSERT, release
+            users, tokens = force_logout_users([user.pk for user in self.users])
+        self.assertEqual((users, tokens), (3, 11))
+        self.assertEqual(BlacklistedToken.objects.count(), 12)
+        self.assertEqual(set(User.objects.values_list('token_version', flat=True)), {2})
+
+    def test_structure_subtree_and_role(self):
+        root = Structure.objects.create(name="الإدارة العامة")
+        branch = Structure.objects.create(name="فرع الشمال", structure=root)
+        self.users[0].stractures.add(root)
+        self.users[1].stractures.add(branch)
+        self.assertEqual(set(users_of_structure(root.pk)), {self.users[0].pk})
+        self.assertEqual(set(users_of_structure(root.pk, include_children=True)),
+                         {self.users[0].pk, self.users[1].pk})
+
+        role = Role.objects.create(name="Sales")
+        self.users[2].groups.add(role)
+        admin = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post('/users/users/force-logout/', {'role': role.pk}, format='json')
+        self.assertEqual((response.status_code, response.data['users'], response.data['tokens']), (200, 1, 4))
+        self.assertEqual(User.objects.get(pk=self.users[2].pk).token_version, 2)
+
+    def test_bulk_logout_rejects_bad_ids(self):
+        admin = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        for payload, field in (({'user_ids': ["abc"]}, 'user_ids'), ({'user_ids': 5}, 'user_ids'),
+                               ({'structure': "x"}, 'structure'), ({'role': "x"}, 'role')):
+            response = client.post('/users/users/force-logout/', payload, format='json')
+            self.assertEqual(response.status_code, 400, payload)
+            self.assertIn(field, response.data['data'])
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).token_version, 1)
+
+    def test_purge_expired_tokens_in_batches(self):
+        expired = OutstandingToken.objects.filter(user__in=self.users[:2])
+        expired.update(expires_at=timezone.now() - timedelta(days=1))
+        BlacklistedToken.objects.create(token=expired.first())
+
+        self.assertEqual(purge_expired_tokens(batch_size=3), 8)
+        self.assertEqual(OutstandingToken.objects.count(), 4)
+        self.assertFalse(BlacklistedToken.objects.exists())
+        call_command('purge_expired_tokens', stdout=StringIO())
+
+
+@override_settings(TOKEN_CLAIMS_ENABLED=True)
+class TokenClaimsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.structure = Structure.objects.create(name="المبيعات")
+        self.user = User.objects.create(username="employee", data_visibility='department')
+        self.user.set_password("secret-123")
+        self.user.save()
+        self.user.stractures.add(self.structure)
+        self.colleague = User.objects.create(username="colleague")
+        self.colleague.stractures.add(self.structure)
+        User.objects.create(username="outsider")
+        self.role = Role.objects.create(name="Sales")
+        self.role.permissions.add(Permission.objects.get(codename='view_customer'))
+        self.user.groups.add(self.role)
+
+        response = APIClient().post('/token/', {'username': 'employee', 'password': 'secret-123'}, format='json')
+        self.access, self.refresh = response.data['access'], response.data['refresh']
+
+    def authenticate(self, access=None):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {access or self.access}")
+        return VersionedJWTAuthentication().authenticate(request)[0]
+
+    def test_authorized_from_claims(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertIsNotNone(user.token_claims)
+            self.assertTrue(user.has_perm('crm.view_customer'))
+            self.assertFalse(user.has_perm('crm.add_customer'))
+            self.assertFalse(user.is_superuser)
+            scope = user.token_claims.visibility_scope
+        self.assertEqual(
+            set(scope.filter_queryset(User.objects.all()).values_list('username', flat=True)),
+            {'employee', 'colleague'},
+        )
+
+    def test_role_change_makes_claims_stale(self):
+        self.role.permissions.add(Permission.objects.get(codename='add_customer'))
+        user = self.authenticate()
+        self.assertIsNone(user.token_claims)
+        self.assertTrue(user.has_perm('crm.add_customer'))
+
+        response = APIClient().post('/token/refresh/', {'refresh': self.refresh}, format='json')
+        claims = AccessToken(response.data['access'])[CLAIM]
+        self.assertEqual(claims['v'], get_claims_version())
+        self.assertTrue(self.authenticate(response.data['access']).has_perm('crm.add_customer'))
+
+    def test_visibility_change_makes_claims_stale(self):
+        self.user.data_visibility = 'self'
+        self.user.save()
+        self.assertIsNone(self.authenticate().token_claims)
+
+    def test_profile_edit_keeps_claims(self):
+        version = get_claims_version()
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = "Sami"
+        user.set_password("secret-456")
+        user.save()
+        self.assertEqual(get_claims_version(), version)
+        self.assertIsNotNone(self.authenticate().token_claims)
+
+    def test_api_request_from_claims(self):
+        # Nothing cached left: a fallback would rebuild the index and scope with queries
+        for module in (permission_index, visibility):
+            cache.delete(module._cache_key(self.user.pk, get_generation(module.CACHE_NAMESPACE)))
+        permission_index._local_indexes.clear()
+        visibility._local_scopes.clear()
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        with self.assertNumQueries(2):
+            # token state (first request), then the customers with the department subquery
+            self.assertEqual(client.get('/crm/customers/').status_code, 200)
+        self.assertEqual(client.post('/crm/customers/', {}, format='json').status_code, 403)
+
+    def test_department_scope_matches_cached_scope(self):
+        claimed = VisibilityScope(self.user.pk, 'department', [self.structure.pk], None)
+        built = VisibilityScope.build(self.user)
+        users = User.objects.all()
+        self.assertEqual(set(claimed.filter_queryset(users)), set(built.filter_queryset(users)))
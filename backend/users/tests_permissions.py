@@ -0,0 +1,116 @@
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from clients.models import Structure
+from crm.models import Customer, Lead
+from .models import User, Group, Role
+from .permission_index import get_permission_index
+from .permissions_utils import has_permission
+from .serializers import UserSerialzer
+
+
+class PermissionIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="employee")
+        self.view_customer = Permission.objects.get(codename='view_customer')
+        self.add_customer = Permission.objects.get(codename='add_customer')
+        self.role = Role.objects.create(name="Sales")
+
+    def test_direct_group_and_role_permissions(self):
+        group = Group.objects.create(name="Viewers")
+        group.permissions.add(self.view_customer)
+        self.role.permissions.add(self.add_customer)
+        self.user.groups.add(group, self.role)
+
+        index = get_permission_index(self.user)
+        self.assertEqual(index.perms, {('crm', 'view_customer'), ('crm', 'add_customer')})
+        self.assertEqual(index.tree, {'crm': {'customer': ['add', 'view']}})
+
+    def test_checks_are_served_from_cache(self):
+        self.user.user_permissions.add(self.view_customer)
+        get_permission_index(self.user)
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(has_permission(user, 'view_customer', Customer))
+            self.assertFalse(has_permission(user, 'add_customer', Customer))
+            self.assertTrue(user.has_perm('crm.view_customer'))
+
+    def test_codename_is_checked_per_model(self):
+        approve = {
+            model: Permission.objects.create(
+                codename='approve', name=f'Can approve {model.__name__}',
+                content_type=ContentType.objects.get_for_model(model),
+            )
+            for model in (Customer, Lead)
+        }
+        self.user.user_permissions.add(approve[Customer])
+        self.assertTrue(has_permission(self.user, 'approve', Customer))
+        self.assertFalse(has_permission(self.user, 'approve', Lead))
+
+    def test_role_permission_change_invalidates_index(self):
+        self.user.groups.add(self.role)
+        self.assertFalse(has_permission(self.user, 'add_customer', Customer))
+        self.role.permissions.add(self.add_customer)
+        self.assertTrue(has_permission(self.user, 'add_customer', Customer))
+        self.user.groups.remove(self.role)
+        self.assertFalse(has_permission(self.user, 'add_customer', Customer))
+
+    def test_user_permissions_action(self):
+        self.user.user_permissions.add(self.view_customer, self.add_customer)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/users/users/user_permissions/')
+        self.assertEqual(response.data, {'crm': {'customer': ['add', 'view']}})
+
+
+class UserListRenderingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.role = Role.objects.create(name="Sales")
+        self.group = Group.objects.create(name="Viewers")
+        self.group.permissions.add(Permission.objects.get(codename='view_customer'))
+        self.structure = Structure.objects.create(name="الإدارة العامة")
+        self.admin = User.objects.create(username="admin", is_superuser=True, is_staff=True)
+
+    def add_users(self, count, start=0):
+        for index in range(start, start + count):
+            user = User.objects.create(username=f"employee{index}")
+            user.groups.add(self.group, self.role)
+            user.stractures.add(self.structure)
+            user.user_permissions.add(Permission.objects.get(codename='add_customer'))
+
+    def list_users(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/users/users/')
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def test_payload_is_unchanged(self):
+        self.add_users(2)
+        data, _ = self.list_users()
+        user = next(item for item in data if item['username'] == "employee0")
+        self.assertEqual(user['groups'], sorted([self.group.pk, self.role.pk]))
+        self.assertEqual(user['roles'], [self.role.pk])
+        self.assertEqual(user['stractures'], [self.structure.pk])
+        self.assertEqual(user['user_groups_count'], 2)
+        self.assertEqual(set(user['all_permissions']), {'crm.view_customer', 'crm.add_customer'})
+
+        single = UserSerialzer(User.objects.get(username="employee0")).data
+        self.assertEqual(single['roles'], user['roles'])
+        self.assertEqual(set(single['all_permissions']), set(user['all_permissions']))
+
+    def test_queries_do_not_grow_with_users(self):
+        self.add_users(3)
+        _, few = self.list_users()
+        self.add_users(12, start=3)
+        cache.clear()
+        _, many = self.list_users()
+        self.assertEqual(few, many)
@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Group, User
+from .statistics import group_statistics, user_statistics
+
+
+class StatisticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(
+            username="admin", is_staff=True, is_superuser=True, must_change_password=False, data_visibility='all',
+        )
+        User.objects.create(username="employee", must_change_password=False, data_visibility='self')
+        User.objects.create(username="former", is_active=False, must_change_password=True, data_visibility='self')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_user_statistics_single_query_then_cached(self):
+        with self.assertNumQueries(1):
+            stats = user_statistics()
+        self.assertEqual(
+            (stats['total_users'], stats['active_users'], stats['inactive_users'],
+             stats['staff_users'], stats['superusers'], stats['must_change_password']),
+            (3, 2, 1, 1, 1, 1),
+        )
+        self.assertEqual(
+            {row['data_visibility']: row['count'] for row in stats['visibility_stats']},
+            {'all': 1, 'self': 2},
+        )
+        with self.assertNumQueries(0):
+            user_statistics()
+
+    def test_writes_invalidate(self):
+        user_statistics()
+        User.objects.create(username="new")
+        self.assertEqual(user_statistics()['total_users'], 4)
+
+        group = Group.objects.create(name="Sales")
+        self.assertEqual(group_statistics()[0]['user_count'], 0)
+        self.admin.groups.add(group)
+        self.assertEqual(group_statistics()[0]['user_count'], 1)
+
+    def test_endpoints(self):
+        response = self.client.get('/users/users/statistics/')
+        self.assertEqual((response.status_code, response.data['total_users']), (200, 3))
+        self.assertEqual(self.client.get('/users/group/statistics/').status_code, 200)
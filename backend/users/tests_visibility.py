@@ -0,0 +1,51 @@
+from django.test import TestCase
+from django.core.cache import cache
+
+from clients.models import Structure, Level
+from crm.models import Customer
+from .models import User
+from .visibility import get_visibility_scope
+
+
+class VisibilityScopeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.level = Level.objects.create(name="Level 1")
+        self.structure = Structure.objects.create(name="Department A", level=self.level)
+        self.other_structure = Structure.objects.create(name="Department B", level=self.level)
+
+        self.manager = User.objects.create(username="manager", data_visibility='department')
+        self.colleague = User.objects.create(username="colleague", data_visibility='self')
+        self.outsider = User.objects.create(username="outsider", data_visibility='self')
+        self.manager.stractures.add(self.structure)
+        self.colleague.stractures.add(self.structure)
+        self.outsider.stractures.add(self.other_structure)
+
+        self.own = Customer.objects.create(name="Own", created_by=self.manager)
+        self.colleague_customer = Customer.objects.create(name="Colleague", created_by=self.colleague)
+        self.outsider_customer = Customer.objects.create(name="Outsider", created_by=self.outsider)
+
+    def visible_customers(self, user):
+        return set(get_visibility_scope(user).filter_queryset(Customer.objects.all()))
+
+    def test_department_scope(self):
+        self.assertEqual(self.visible_customers(self.manager), {self.own, self.colleague_customer})
+
+    def test_self_scope(self):
+        self.assertEqual(self.visible_customers(self.colleague), {self.colleague_customer})
+
+    def test_scope_is_cached(self):
+        get_visibility_scope(self.manager)
+        with self.assertNumQueries(0):
+            get_visibility_scope(self.manager)
+
+    def test_structure_change_invalidates_scope(self):
+        self.visible_customers(self.manager)
+        self.outsider.stractures.add(self.structure)
+        self.assertIn(self.outsider_customer, self.visible_customers(self.manager))
+
+    def test_visibility_change_invalidates_scope(self):
+        self.visible_customers(self.colleague)
+        self.colleague.data_visibility = 'all'
+        self.colleague.save()
+        self.assertEqual(len(self.visible_customers(self.colleague)), 3)
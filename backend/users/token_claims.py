@@ -0,0 +1,124 @@
+"""
+Authorization claims carried by access tokens (TOKEN_CLAIMS_ENABLED).
+
+The access token gets an `authz` claim:
+    {"v": claims version, "su": is_superuser, "p": permission bitmap,
+     "dv": data visibility mode, "s": structure ids}
+Bit n of the bitmap is the Permission with pk n, the names come from a permission table
+cached per claims version. Any role/permission/structure/visibility change bumps the
+version (users.token_state.bump_claims_version): older claims are then ignored and the
+request falls back to the cached PermissionIndex / VisibilityScope until the client
+refreshes its access token.
+"""
+import base64
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.cache import LocalLRU
+from .permission_index import PERMISSION_FIELDS, PermissionIndex, get_permission_index
+from .token_state import CLAIMS_NAMESPACE, get_claims_version
+from .visibility import VisibilityScope, get_visibility_scope
+
+CLAIM = 'authz'
+CACHE_TIMEOUT = 60 * 60
+
+_local_tables = LocalLRU(maxsize=4)
+# Decoded bitmaps, many users share the same permissions
+_local_perms = LocalLRU(maxsize=2048)
+
+
+class TokenClaims(NamedTuple):
+    """What the request needs to authorize a user, rebuilt from its access token."""
+    permission_index: PermissionIndex
+    visibility_scope: VisibilityScope
+
+
+def claims_enabled():
+    return getattr(settings, 'TOKEN_CLAIMS_ENABLED', False)
+
+
+def get_permission_table(version):
+    """{permission pk: (app_label, model, codename)} as of a claims version."""
+    table = _local_tables.get(version)
+    if table is None:
+        key = f'{CLAIMS_NAMESPACE}:{version}:model_permissions'
+        rows = cache.get(key)
+        if rows is None:
+            rows = tuple(Permission.objects.values_list('pk', *PERMISSION_FIELDS))
+            cache.set(key, rows, CACHE_TIMEOUT)
+        table = {pk: tuple(perm) for pk, *perm in rows}
+        _local_tables.set(version, table)
+    return table
+
+
+def encode_bitmap(pks):
+    bits = 0
+    for pk in pks:
+        bits |= 1 << pk
+    return base64.urlsafe_b64encode(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')).rstrip(b'=').decode()
+
+
+def decode_bitmap(value):
+    bits = int.from_bytes(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)), 'little')
+    return [pk for pk, bit in enumerate(reversed(bin(bits)[2:])) if bit == '1']
+
+
+def build_claims(user):
+    """The `authz` claim of a user, from its cached PermissionIndex and VisibilityScope."""
+    # Read the version first: a change made meanwhile leaves the claims already stale
+    version = get_claims_version()
+    index = get_permission_index(user)
+    scope = get_visibility_scope(user)
+    claims = {'v': version, 'su': index.is_superuser, 'dv': scope.mode, 's': sorted(scope.structure_ids)}
+    if not index.is_superuser:
+        pks = {perm: pk for pk, perm in get_permission_table(version).items()}
+        claims['p'] = encode_bitmap(pks[perm] for perm in index.model_perms if perm in pks)
+    return claims
+
+
+def add_claims(access, user=None):
+    """Return the encoded access token `access` with the `authz` claim of its user."""
+    token = AccessToken(access)
+    if user is None:
+        user = get_user_model().objects.get(**{api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]})
+    token[CLAIM] = build_claims(user)
+    return str(token)
+
+
+def _decode_perms(version, claims):
+    if claims.get('su'):
+        return frozenset(get_permission_table(version).values())
+    key = (version, claims.get('p', ''))
+    perms = _local_perms.get(key)
+    if perms is None:
+        table = get_permission_table(version)
+        pks = decode_bitmap(claims['p']) if claims.get('p') else []
+        if any(pk not in table for pk in pks):
+            return None
+        perms = frozenset(table[pk] for pk in pks)
+        _local_perms.set(key, perms)
+    return perms
+
+
+def read_claims(validated_token, user_id):
+    """TokenClaims of an access token, None when it has none or they are stale."""
+    claims = validated_token.get(CLAIM)
+    if not claims or not claims_enabled() or claims.get('v') != get_claims_version():
+        return None
+    perms = _decode_perms(claims['v'], claims)
+    if perms is None:
+        return None
+
+    mode, structure_ids = claims.get('dv', 'self'), claims.get('s', ())
+    creator_ids = {'all': (), 'department': None}.get(mode, {user_id})
+    return TokenClaims(
+        # Tokens of inactive users are rejected before the claims are read
+        permission_index=PermissionIndex(user_id, True, bool(claims.get('su')), perms),
+        visibility_scope=VisibilityScope(user_id, mode, structure_ids, creator_ids),
+    )
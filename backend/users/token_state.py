@@ -0,0 +1,93 @@
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth.models import User as BaseUser
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from api.cache import LocalLRU, bump_generation, get_generation
+from .models import User as CustomUser
+
+CACHE_NAMESPACE = 'token_state'
+CACHE_TIMEOUT = 60 * 60
+
+# Other processes notice a force logout once their local copy expires
+_local_states = LocalLRU(maxsize=4096, ttl=getattr(settings, 'TOKEN_STATE_LOCAL_TTL', 0.5))
+
+# Version of the authorization claims carried by access tokens (users/token_claims.py)
+CLAIMS_NAMESPACE = 'token_claims'
+_local_claims_version = LocalLRU(maxsize=1, ttl=getattr(settings, 'TOKEN_STATE_LOCAL_TTL', 0.5))
+
+
+class TokenState(NamedTuple):
+    """What VersionedJWTAuthentication needs to accept a token: no user row required."""
+    token_version: int
+    is_active: bool
+
+
+def _cache_key(user_id):
+    return f'{CACHE_NAMESPACE}:{user_id}'
+
+
+def _load(user_id):
+    """(token_version, is_active) from the database, () when the user does not exist."""
+    row = CustomUser.objects.filter(pk=user_id).values_list('token_version', 'is_active').first()
+    if row is None:
+        # Legacy user without extended row: its tokens carry no token_version
+        is_active = BaseUser.objects.filter(pk=user_id).values_list('is_active', flat=True).first()
+        row = (None, is_active) if is_active is not None else ()
+    return tuple(row)
+
+
+def get_token_state(user_id):
+    """
+    TokenState of a user, None when it does not exist.
+    Lookup order: per-process LRU (short TTL) -> Redis -> database.
+    """
+    key = _cache_key(user_id)
+    state = _local_states.get(key)
+    if state is None:
+        state = cache.get(key)
+        if state is None:
+            state = _load(user_id)
+            cache.set(key, state, CACHE_TIMEOUT)
+        _local_states.set(key, state)
+    return TokenState(*state) if state else None
+
+
+def invalidate_token_state(*user_ids):
+    """
+    Drop the cached state now and again after commit: a request reading the row before
+    the commit may have cached the old version in between.
+    """
+    keys = [_cache_key(user_id) for user_id in user_ids]
+
+    def drop():
+        cache.delete_many(keys)
+        for key in keys:
+            _local_states.delete(key)
+
+    drop()
+    transaction.on_commit(drop)
+
+
+def bump_token_version(*user_ids):
+    """Revoke every token of the users: +1 in one UPDATE (no lost increment), cache dropped."""
+    CustomUser.objects.filter(pk__in=user_ids).update(token_version=F('token_version') + 1)
+    invalidate_token_state(*user_ids)
+
+
+def get_claims_version():
+    """Current claims version, tokens stamped with an older one are no longer trusted."""
+    version = _local_claims_version.get(CLAIMS_NAMESPACE)
+    if version is None:
+        version = get_generation(CLAIMS_NAMESPACE)
+        _local_claims_version.set(CLAIMS_NAMESPACE, version)
+    return version
+
+
+def bump_claims_version():
+    """A role, permission, structure or visibility change: every issued claim becomes stale."""
+    bump_generation(CLAIMS_NAMESPACE)
+    _local_claims_version.clear()
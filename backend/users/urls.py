@@ -7,6 +7,8 @@ router.register(r'role', RoleViewSet, basename='role')
 router.register(r'group', GroupViewSet, basename='group')
 router.register(r'permissions', PermissionsViewSet, basename='permissions')
 urlpatterns = [
+    # Before the router, users/<pk>/ would match it
+    path("users/force-logout/", force_logout_bulk_view),
     path('', include(router.urls)), 
     path("users/<int:user_id>/force-logout/", force_logout_view),
 
@@ -8,7 +8,7 @@ from .models import *
 from rest_framework.response import Response
 from django.http import JsonResponse
 from rest_framework.authentication import SessionAuthentication
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .authentication import VersionedJWTAuthentication
 from rest_framework import generics, viewsets, status, permissions, filters
 from django.db.models import Q, Count
 from django.contrib.contenttypes.models import ContentType
@@ -17,16 +17,18 @@ from apps.baseview import BaseViewSet
 from api.codes import *
 from api.utils import standard_response
 from django_filters.rest_framework.backends import DjangoFilterBackend
-from collections import defaultdict
+from .permission_index import get_permission_index
+from .statistics import group_statistics, user_statistics
 
 # User ViewSet with comprehensive functionality
 #
 
 class UserViewSet(BaseViewSet):
 
-    queryset = User.objects.all().select_related('direct_manager').prefetch_related('stractures', 'groups')
+    # Groups, roles, structures and permissions are annotated per page by UserSerialzer
+    queryset = User.objects.all().select_related('direct_manager')
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
-    authentication_classes = [JWTAuthentication,SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_active', 'is_staff', 'is_superuser', 'data_visibility', 'must_change_password']
     search_fields = ['username', 'first_name', 'last_name', 'email']
@@ -37,9 +39,9 @@ class UserViewSet(BaseViewSet):
     deleted_code = USER_DELETED
     
     def get_serializer_class(self):
-        if self.action == 'create':
+        if self.action in ['create', 'bulk_create']:
             return UserCreateSerializer
-        elif self.action in ['update', 'partial_update']:
+        elif self.action in ['update', 'partial_update', 'bulk_update', 'bulk_partial_update']:
             return UserUpdateSerializer
         # elif self.action == 'change_password':
         #     return ChangePasswordSerializer
@@ -171,52 +173,12 @@ class UserViewSet(BaseViewSet):
     @action(detail=False, methods=['get'])
     def user_permissions(self, request):
         """الحصول على صلاحيات المستخدم"""
-        user = self.request.user
-        user_permission = user.get_all_permissions()
-        print(user_permission) 
-        app = defaultdict(lambda: defaultdict(list))
-        for row in user_permission:
-            items = row.split('.')
-            app_label = items[0]
-            sub_items = items[1].split('_')
-            model_name = sub_items[1]
-            permission_name = sub_items[0]
-            if(app.get(app_label)):
-                if(app[app_label].get(model_name)):
-                    app[app_label][model_name].append(permission_name)
-                else:app[app_label][model_name] = [permission_name]
-            else:app[app_label] = {model_name:[permission_name]}
-                                                
-        return Response(
-            app
-        
-        )
-  
+        return Response(get_permission_index(request.user).tree)
+
     @action(detail=False, methods=['get'])
     def user_per(self, request):
-        user = request.user
-        user_permissions = user.get_all_permissions()
-        print(user_permissions) 
-        res={}
-        for row in user_permissions:
-            items = row.split('.')
-            app_label = items[0]
-            sub_items = items[1].split('_')
-            model_name = sub_items[1]
-            permission_name = sub_items[0]
-            if(res.get(app_label)):
-                if(res[app_label].get(model_name)):
-                    res[app_label][model_name].append(permission_name)
-                else:res[app_label][model_name] = [permission_name]
-            else:res[app_label] = {model_name:[permission_name]}
-
-
-        
-        
-        
+        return Response(get_permission_index(request.user).tree)
 
-        return Response(res)
-    
     @action(detail=True, methods=['post'])
     def assign_structures(self, request, pk=None):
         """تعيين هياكل إدارية للمستخدم"""
@@ -232,25 +194,7 @@ class UserViewSet(BaseViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """إحصائيات المستخدمين"""
-        total_users = User.objects.count()
-        active_users = User.objects.filter(is_active=True).count()
-        inactive_users = User.objects.filter(is_active=False).count()
-        staff_users = User.objects.filter(is_staff=True).count()
-        superusers = User.objects.filter(is_superuser=True).count()
-        must_change_password = User.objects.filter(must_change_password=True).count()
-        
-        # Data visibility statistics
-        visibility_stats = User.objects.values('data_visibility').annotate(count=Count('id'))
-        
-        return Response({
-            'total_users': total_users,
-            'active_users': active_users,
-            'inactive_users': inactive_users,
-            'staff_users': staff_users,
-            'superusers': superusers,
-            'must_change_password': must_change_password,
-            'visibility_stats': list(visibility_stats)
-        })
+        return Response(user_statistics())
     
     @action(detail=True, methods=['get'])
     def subordinates_list(self, request, pk=None):
@@ -259,19 +203,22 @@ class UserViewSet(BaseViewSet):
         subordinates = user.subordinates.all()
         return Response(UserSerialzer(subordinates, many=True).data)
 
-from rest_framework_simplejwt.views import TokenObtainPairView
-from .serializers import MyTokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .serializers import MyTokenObtainPairSerializer, MyTokenRefreshSerializer
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
+class MyTokenRefreshView(TokenRefreshView):
+    serializer_class = MyTokenRefreshSerializer
+
 
 # Role ViewSet with enhanced functionality
 class RoleViewSet(BaseViewSet):
     queryset = Role.objects.all().prefetch_related('permissions', 'codingCategory', 'coding')
     serializer_class = RoleSerialzer
     permission_classes = [permissions.IsAuthenticated,permissions.DjangoModelPermissions]
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name']
     ordering_fields = ['name']
@@ -353,7 +300,7 @@ class RoleViewSet(BaseViewSet):
 class GroupViewSet(BaseViewSet):
     queryset = Group.objects.all().prefetch_related('permissions')
     serializer_class = GroupSerialzer
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [VersionedJWTAuthentication, SessionAuthentication]
     permission_classes = [permissions.IsAuthenticated,permissions.DjangoModelPermissions]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name']
@@ -397,8 +344,7 @@ class GroupViewSet(BaseViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """إحصائيات المجموعات"""
-        groups_with_users = Group.objects.annotate(user_count=Count('user')).values('id', 'name', 'user_count')
-        return Response(list(groups_with_users))
+        return Response(group_statistics())
 
 from django.conf import settings
 # Permission ViewSet with enhanced functionality
@@ -531,7 +477,7 @@ class PermissionsViewSet(BaseViewSet):
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
 from .models import User
-from .auth_services import force_logout_user
+from .auth_services import force_logout_user, force_logout_users, users_of_role, users_of_structure
 @api_view(["POST"])
 @permission_classes([permissions.IsAdminUser])
 def force_logout_view(request, user_id):
@@ -551,4 +497,49 @@ def force_logout_view(request, user_id):
 
     return Response({
         "detail": "تم إنهاء جلسات المستخدم بنجاح"
-    })
\ No newline at end of file
+    })
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAdminUser])
+def force_logout_bulk_view(request):
+    """
+    Logout many users at once: `user_ids` and/or every member of a `structure`
+    (`include_children` for its whole subtree) or of a `role`.
+    """
+    serializer = ForceLogoutBulkSerializer(data=request.data)
+    if not serializer.is_valid():
+        return standard_response(VALIDATION_ERROR, serializer.errors, success=False,
+                                 status_code=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    users = User.objects.filter(pk__in=data['user_ids'])
+    if data.get('structure'):
+        users |= User.objects.filter(pk__in=users_of_structure(
+            data['structure'], include_children=data['include_children'],
+        ))
+    if data.get('role'):
+        users |= User.objects.filter(pk__in=users_of_role(data['role']))
+    users = list(users.distinct())
+
+    count, tokens = force_logout_users([user.pk for user in users])
+    ip_address = get_client_ip(request)
+    user_agent = request.META.get('HTTP_USER_AGENT', '')[:255]
+    ActivityLog.objects.bulk_create([
+        ActivityLog(
+            actor=request.user,
+            action_flag=ActivityLog.FORCE_LOGOUT,
+            app_label='auth',
+            model_name='user',
+            object_id=str(user.id),
+            object_repr=str(user),
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+        for user in users
+    ])
+
+    return Response({
+        "detail": "تم إنهاء جلسات المستخدمين بنجاح",
+        "users": count,
+        "tokens": tokens,
+    })
@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+
+from api.cache import LocalLRU, get_generation, bump_generation
+from .models import User as CustomUser
+from .token_state import bump_claims_version
+
+CACHE_NAMESPACE = 'visibility_scope'
+CACHE_TIMEOUT = 60 * 60
+
+_local_scopes = LocalLRU(maxsize=2048)
+
+
+class VisibilityScope:
+    """
+    Resolved data-visibility of a single user.
+
+    - mode: 'all', 'department' or 'self' (superusers are always 'all')
+    - structure_ids: structures the user belongs to
+    - creator_ids: users whose records are visible (always includes the user).
+      None for a 'department' scope read from token claims: the members of the
+      structures are then resolved by a subquery of the filtered query itself.
+    """
+    __slots__ = ('user_id', 'mode', 'structure_ids', 'creator_ids')
+
+    def __init__(self, user_id, mode, structure_ids=(), creator_ids=()):
+        self.user_id = user_id
+        self.mode = mode
+        self.structure_ids = frozenset(structure_ids)
+        self.creator_ids = frozenset(creator_ids) if creator_ids is not None else None
+
+    @property
+    def is_unrestricted(self):
+        return self.mode == 'all'
+
+    @classmethod
+    def build(cls, user):
+        """Resolve the scope from the database (cache miss path)."""
+        # Work on the extended user row, request.user may be the base auth user (MTI)
+        row = CustomUser.objects.filter(id=user.id).values('is_superuser', 'data_visibility').first()
+        if row is None:
+            # Legacy user without extended row: no data_visibility field -> 'self'
+            is_superuser, visibility = user.is_superuser, None
+        else:
+            is_superuser, visibility = row['is_superuser'], row['data_visibility']
+
+        if is_superuser or visibility == 'all':
+            return cls(user.id, 'all')
+
+        memberships = CustomUser.stractures.through.objects
+        structure_ids = set(memberships.filter(user_id=user.id).values_list('structure_id', flat=True))
+
+        if visibility == 'department' and structure_ids:
+            creator_ids = set(
+                memberships.filter(structure_id__in=structure_ids).values_list('user_id', flat=True)
+            )
+            creator_ids.add(user.id)
+            return cls(user.id, 'department', structure_ids, creator_ids)
+
+        # 'self', empty visibility, or department user without any structure
+        return cls(user.id, visibility if visibility == 'department' else 'self', structure_ids, {user.id})
+
+    def filter_queryset(self, queryset):
+        """Apply the scope to a queryset with a single `IN` filter."""
+        if self.is_unrestricted:
+            return queryset
+
+        model = queryset.model
+        # Case A: querying the User model itself
+        if issubclass(model, get_user_model()) or model == CustomUser:
+            return queryset.filter(self._creators('id'))
+
+        # Case B: business model (BaseModel) with a created_by field
+        if hasattr(model, 'created_by'):
+            return queryset.filter(self._creators('created_by_id'))
+
+        # Case C: model has no owner field
+        return queryset
+
+    def _creators(self, field):
+        if self.creator_ids is not None:
+            return Q(**{f'{field}__in': self.creator_ids})
+        members = CustomUser.stractures.through.objects.filter(structure_id__in=self.structure_ids)
+        return Q(**{f'{field}__in': members.values('user_id')}) | Q(**{field: self.user_id})
+
+    def to_tuple(self):
+        return (self.user_id, self.mode, tuple(self.structure_ids), tuple(self.creator_ids))
+
+    @classmethod
+    def from_tuple(cls, value):
+        return cls(*value)
+
+
+def _cache_key(user_id, generation):
+    return f'{CACHE_NAMESPACE}:{generation}:{user_id}'
+
+
+def get_visibility_scope(user):
+    """
+    Return the VisibilityScope of `user`.
+    Lookup order: token claims -> per-process LRU -> Redis -> database.
+    """
+    claims = getattr(user, 'token_claims', None)
+    if claims is not None:
+        return claims.visibility_scope
+
+    key = _cache_key(user.id, get_generation(CACHE_NAMESPACE))
+
+    scope = _local_scopes.get(key)
+    if scope is not None:
+        return scope
+
+    cached = cache.get(key)
+    if cached is not None:
+        scope = VisibilityScope.from_tuple(cached)
+    else:
+        scope = VisibilityScope.build(user)
+        cache.set(key, scope.to_tuple(), CACHE_TIMEOUT)
+
+    _local_scopes.set(key, scope)
+    return scope
+
+
+def get_cached_visibility_scope(user_id):
+    """Return the cached scope of a user without touching the database (or None)."""
+    key = _cache_key(user_id, get_generation(CACHE_NAMESPACE))
+    scope = _local_scopes.get(key)
+    if scope is None:
+        cached = cache.get(key)
+        scope = VisibilityScope.from_tuple(cached) if cached is not None else None
+    return scope
+
+
+def invalidate_visibility_scopes():
+    """
+    Invalidate all scopes.
+    A membership change affects every user sharing the structure (their creator_ids),
+    so the whole namespace is rotated instead of single keys.
+    """
+    bump_generation(CACHE_NAMESPACE)
+    _local_scopes.clear()
+    bump_claims_version()